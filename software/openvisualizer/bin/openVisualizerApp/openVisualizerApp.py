@@ -21,6 +21,7 @@ from openvisualizer.eventBus        import eventBusMonitor
 from openvisualizer.moteProbe       import moteProbe
 from openvisualizer.moteConnector   import moteConnector
 from openvisualizer.moteState       import moteState
+from openvisualizer.moteState       import moteIndex
 from openvisualizer.RPL             import RPL
 from openvisualizer.JRC             import JRC
 from openvisualizer.openLbr         import openLbr
@@ -40,7 +41,7 @@ class OpenVisualizerApp(object):
     top-level functionality for several UI clients.
     '''
 
-    def __init__(self,confdir,datadir,logdir,simulatorMode,numMotes,trace,debug,usePageZero,simTopology,iotlabmotes, pathTopo, markov, roverMode):
+    def __init__(self,confdir,datadir,logdir,simulatorMode,numMotes,trace,debug,usePageZero,simTopology,iotlabmotes, pathTopo, markov, roverMode, useTun=True, turbo=False):
         
         # store params
         self.confdir              = confdir
@@ -53,7 +54,8 @@ class OpenVisualizerApp(object):
         self.usePageZero           = usePageZero
         self.iotlabmotes          = iotlabmotes
         self.pathTopo             = pathTopo
-        self.errModel             = 'standard'    # tested by YYS 2016/8/30
+        # the Markov error model is used when a definition file is given
+        self.errModel             = 'markov2' if markov!='default' else 'standard'    # tested by YYS 2016/8/30
         self.markov               = markov
         #self.errModel             = ''             
         self.roverMode            = roverMode
@@ -69,11 +71,13 @@ class OpenVisualizerApp(object):
         self.hurricane            = Hurricane.Hurricane()    # YYS 2015/11/19
         self.DAGrootList          = []
         # create openTun call last since indicates prefix
-        self.openTun              = openTun.create() 
+        self.openTun              = openTun.create(useTun) 
         if self.simulatorMode:
             from openvisualizer.SimEngine import SimEngine, MoteHandler
             
             self.simengine        = SimEngine.SimEngine(simTopology)
+            self.simengine.setTurbo(turbo)
+            self.simengine.propagation.errModel = self.errModel
             self.simengine.start()
         
         # import the number of motes from json file given by user (if the pathTopo option is enabled)
@@ -128,10 +132,13 @@ class OpenVisualizerApp(object):
             moteConnector.moteConnector(mp.getPortName()) for mp in self.moteProbes
         ]
         
-        # create a moteState for each moteConnector
+        # create a moteState for each moteConnector, and index them
+        self.moteIndex            = moteIndex.moteIndex()
         self.moteStates           = [
             moteState.moteState(mc) for mc in self.moteConnectors
         ]
+        for ms in self.moteStates:
+            self.moteIndex.add(ms)
 
         if self.roverMode :
             self.remoteConnectorServer = remoteConnectorServer.remoteConnectorServer()
@@ -220,6 +227,9 @@ class OpenVisualizerApp(object):
         self.jrc.close()
         for probe in self.moteProbes:
             probe.close()
+        if self.simulatorMode:
+            from openvisualizer.BspEmulator import VcdLogger
+            VcdLogger.VcdLogger().close()
                 
     def getMoteState(self, moteid):
         '''
@@ -228,14 +238,7 @@ class OpenVisualizerApp(object):
         :param moteid: 16-bit ID of mote
         :rtype:        moteState or None if not found
         '''
-        for ms in self.moteStates:
-            idManager = ms.getStateElem(ms.ST_IDMANAGER)
-            if idManager and idManager.get16bAddr():
-                addr = ''.join(['%02x'%b for b in idManager.get16bAddr()])
-                if addr == moteid:
-                    return ms
-        else:
-            return None
+        return self.moteIndex.getBy16bId(moteid)
 
     def getMotesConnectivity(self):
         motes  = []
@@ -243,10 +246,11 @@ class OpenVisualizerApp(object):
         edges  = []
 
         for ms in self.moteStates:
-            idManager = ms.getStateElem(ms.ST_IDMANAGER)
-            if idManager and idManager.get16bAddr():
-                src_s = ''.join(['%02X'%b for b in idManager.get16bAddr()])
-                motes.append(src_s)
+            src_s = self.moteIndex.getMoteId(ms.moteConnector.serialport)
+            if not src_s:
+                continue
+            src_s = src_s.upper()
+            motes.append(src_s)
             neighborTable = ms.getStateElem(ms.ST_NEIGHBORS)
             for neighbor in neighborTable.data:
                 if len(neighbor.data)==0:
@@ -280,6 +284,7 @@ class OpenVisualizerApp(object):
                             moc = moteConnector.moteConnector(rm)
                             self.moteConnectors       += [moc]
                             self.moteStates += [moteState.moteState(moc)]
+                            self.moteIndex.add(self.moteStates[-1])
         self.remoteConnectorServer.initRoverConn(roverMotes)
 
     def removeRoverMotes(self, roverIP, moteList):
@@ -290,14 +295,12 @@ class OpenVisualizerApp(object):
 
         for moteid in moteList:
             ms = self.getMoteState(moteid)
+            if not ms:
+                ms = self.moteIndex.getBySerialPort(moteid)
             if ms:
                 self.moteConnectors.remove(ms.moteConnector)
                 self.moteStates.remove(ms)
-            else:
-                for mss in self.moteStates:
-                    if moteid == mss.moteConnector.serialport:
-                        self.moteConnectors.remove(mss.moteConnector)
-                        self.moteStates.remove(mss)
+                self.moteIndex.remove(ms)
         self.remoteConnectorServer.closeRoverConn(roverIP)
 
 
@@ -308,9 +311,9 @@ class OpenVisualizerApp(object):
         '''
         moteDict = {}
         for ms in self.moteStates:
-            addr = ms.getStateElem(moteState.moteState.ST_IDMANAGER).get16bAddr()
-            if addr:
-                moteDict[''.join(['%02x' % b for b in addr])] = ms.moteConnector.serialport
+            moteid = self.moteIndex.getMoteId(ms.moteConnector.serialport)
+            if moteid:
+                moteDict[moteid] = ms.moteConnector.serialport
             else:
                 moteDict[ms.moteConnector.serialport] = None
         return moteDict
@@ -362,6 +365,7 @@ def main(parser=None, roverMode=False):
                            'simCount    = {0}'.format(argspace.numMotes),
                            'trace       = {0}'.format(argspace.trace),
                            'debug       = {0}'.format(argspace.debug),
+                           'turbo       = {0}'.format(argspace.turbo),
                            'usePageZero = {0}'.format(argspace.usePageZero)],
             )))
     log.info('Using external dirs:\n\t{0}'.format(
@@ -384,7 +388,8 @@ def main(parser=None, roverMode=False):
         iotlabmotes     = argspace.iotlabmotes,
         pathTopo        = argspace.pathTopo,
         markov          = argspace.markov,
-        roverMode       = roverMode
+        roverMode       = roverMode,
+        turbo           = argspace.turbo,
     )
 
 def _addParserArgs(parser):
@@ -418,6 +423,12 @@ def _addParserArgs(parser):
         action     = 'store',
         help       = 'force a certain toplogy (simulation mode only)'
     )
+    parser.add_argument('--turbo',
+        dest       = 'turbo',
+        default    = False,
+        action     = 'store_true',
+        help       = 'run the simulation as fast as possible (simulation mode only)'
+    )
     parser.add_argument('-d', '--debug',
         dest       = 'debug',
         default    = False,
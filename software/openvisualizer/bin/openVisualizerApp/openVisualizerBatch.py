@@ -0,0 +1,257 @@
+#!/usr/bin/python
+# Copyright (c) 2010-2013, Regents of the University of California.
+# All rights reserved.
+#
+# Released under the BSD 3-Clause license as published at the link below.
+# https://openwsn.atlassian.net/wiki/display/OW/License
+
+'''
+Runs a batch of independent simulations, in parallel, and collects their
+statistics into a single JSON results file.
+
+The SimEngine, the TimeLine and the VcdLogger are singletons, so each
+simulation runs in its own process of a pool, which is not reused for
+another simulation. A simulation runs headless, without TUN interface nor
+web server and in turbo mode, until it reaches the requested simulated
+time or number of events.
+
+One simulation is run for each combination of topology file, Markov error
+model file and random seed. For example::
+
+    python openVisualizerBatch.py -a build/runui \\
+        -i topology_data_3motes.json -i topology_data_6motes.json \\
+        --seeds 1,2,3 --simTime 600 -o results.json
+'''
+
+import sys
+import os
+
+if __name__=="__main__":
+    # Update pythonpath if running in in-tree development mode
+    basedir  = os.path.dirname(__file__)
+    confFile = os.path.join(basedir, "openvisualizer.conf")
+    if os.path.exists(confFile):
+        import pathHelper
+        pathHelper.updatePath()
+
+import logging
+log = logging.getLogger('openVisualizerBatch')
+
+import itertools
+import json
+import multiprocessing
+import random
+import time
+from   argparse    import ArgumentParser
+
+import openVisualizerApp
+
+#============================ defines =========================================
+
+POLL_PERIOD   = 0.5 # seconds between checks for an interruption while waiting for a simulation
+
+#============================ run =============================================
+
+def runSimulation(run):
+    '''
+    Runs a single simulation, in the calling process.
+
+    :param run: Dictionary with the parameters of the simulation: appdir,
+                numMotes, simTopology, pathTopo, markov, seed, simTime and
+                numEvents.
+    :returns:   Dictionary with the parameters and statistics of the run.
+    '''
+
+    random.seed(run['seed'])
+
+    confdir, datadir, logdir = openVisualizerApp._initExternalDirs(run['appdir'], False)
+
+    from openvisualizer.SimEngine import SimEngine
+
+    # create the engine first, so it stops at the requested time
+    engine = SimEngine.SimEngine(run['simTopology'])
+    engine.setStopCondition(
+        simTime      = run['simTime'],
+        numEvents    = run['numEvents'],
+    )
+
+    startTime = time.time()
+    app = openVisualizerApp.OpenVisualizerApp(
+        confdir         = confdir,
+        datadir         = datadir,
+        logdir          = logdir,
+        simulatorMode   = True,
+        numMotes        = run['numMotes'],
+        trace           = False,
+        debug           = False,
+        usePageZero     = False,
+        simTopology     = run['simTopology'],
+        iotlabmotes     = '',
+        pathTopo        = run['pathTopo'],
+        markov          = run['markov'],
+        roverMode       = False,
+        useTun          = False,
+        turbo           = True,
+    )
+
+    # wait for the stop condition, or the end of the timeline; the engine is
+    # also paused briefly when writing to the serial port of a mote
+    while not engine.waitStopped(POLL_PERIOD):
+        pass
+    duration = time.time()-startTime
+
+    propagation = engine.propagation
+    returnVal = {
+        'run':             dict((k,v) for (k,v) in run.items() if k!='appdir'),
+        'stats': {
+            'numEvents':   engine.timeline.getStats().getNumEvents(),
+            'simTime':     engine.timeline.getCurrentTime(),
+            'wallTime':    duration,
+            'simSpeed':    engine.getSimSpeed(),
+            'txTotal':     propagation.txTotal,
+            'txGood':      propagation.txGood,
+            'collisions':  propagation.retrieveCollisions(),
+            'links':       propagation.retrieveLinkStats(),
+        },
+        'motes':           dict(
+            (ms.moteConnector.serialport,_snapshotMoteState(ms)) for ms in app.moteStates
+        ),
+    }
+
+    app.close()
+
+    return returnVal
+
+def runBatch(runs,numProcesses=None):
+    '''
+    Runs simulations in a pool of processes.
+
+    :param runs:         List of parameter dictionaries, see runSimulation()
+    :param numProcesses: Number of simulations run in parallel, by default
+                         the number of CPUs
+    :returns:            List of results, in the order of runs
+    '''
+
+    # each process runs a single simulation, as the engine is a singleton
+    pool = multiprocessing.Pool(processes=numProcesses,maxtasksperchild=1)
+    try:
+        returnVal = pool.map(runSimulation,runs,chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    return returnVal
+
+#============================ helpers =========================================
+
+def _snapshotMoteState(ms):
+    returnVal = {}
+    for name in ms.getStateElemNames():
+        returnVal[name] = json.loads(ms.getStateElemJson(name,'data'))
+    return returnVal
+
+def _listRuns(argspace):
+    returnVal = []
+    for (pathTopo,markov,seed) in itertools.product(
+            argspace.pathTopo or [''],
+            argspace.markov   or ['default'],
+            [int(s) for s in argspace.seeds.split(',')],
+        ):
+        returnVal += [
+            {
+                'appdir':       argspace.appdir,
+                # as in openVisualizerApp.main(), a topology file defines
+                # the motes and their connections
+                'numMotes':     0 if pathTopo else argspace.numMotes,
+                'simTopology':  'fully-meshed' if pathTopo else argspace.simTopology,
+                'pathTopo':     pathTopo,
+                'markov':       markov,
+                'seed':         seed,
+                'simTime':      argspace.simTime,
+                'numEvents':    argspace.numEvents,
+            }
+        ]
+    return returnVal
+
+def _addParserArgs(parser):
+    parser.add_argument('-a', '--appDir',
+        dest       = 'appdir',
+        default    = '.',
+        action     = 'store',
+        help       = 'working directory'
+    )
+    parser.add_argument('-n', '--simCount',
+        dest       = 'numMotes',
+        type       = int,
+        default    = openVisualizerApp.DEFAULT_MOTE_COUNT,
+        help       = 'mote count, when no topology file is given'
+    )
+    parser.add_argument('-st', '--simTopology',
+        dest       = 'simTopology',
+        default    = '',
+        action     = 'store',
+        help       = 'force a certain toplogy, when no topology file is given'
+    )
+    parser.add_argument('-i', '--pathTopo',
+        dest       = 'pathTopo',
+        default    = [],
+        action     = 'append',
+        help       = 'topology json file, can be repeated'
+    )
+    parser.add_argument('-m', '--markov',
+        dest       = 'markov',
+        default    = [],
+        action     = 'append',
+        help       = 'markov definition file, can be repeated'
+    )
+    parser.add_argument('--seeds',
+        dest       = 'seeds',
+        default    = '0',
+        action     = 'store',
+        help       = 'comma-separated list of random seeds'
+    )
+    parser.add_argument('--simTime',
+        dest       = 'simTime',
+        type       = float,
+        default    = None,
+        help       = 'simulated time after which each simulation stops, in seconds'
+    )
+    parser.add_argument('--numEvents',
+        dest       = 'numEvents',
+        type       = int,
+        default    = None,
+        help       = 'number of events after which each simulation stops'
+    )
+    parser.add_argument('-j', '--processes',
+        dest       = 'numProcesses',
+        type       = int,
+        default    = None,
+        help       = 'number of simulations run in parallel (default: number of CPUs)'
+    )
+    parser.add_argument('-o', '--output',
+        dest       = 'output',
+        default    = 'results.json',
+        action     = 'store',
+        help       = 'results file'
+    )
+
+#============================ main ============================================
+
+def main():
+    parser = ArgumentParser()
+    _addParserArgs(parser)
+    argspace = parser.parse_args()
+
+    if argspace.simTime is None and argspace.numEvents is None:
+        parser.error('one of --simTime and --numEvents is required')
+
+    logging.basicConfig(level=logging.WARNING)
+
+    runs    = _listRuns(argspace)
+    print 'running {0} simulations'.format(len(runs))
+    results = runBatch(runs,argspace.numProcesses)
+
+    with open(argspace.output,'w') as f:
+        json.dump(results,f,indent=4,sort_keys=True)
+
+if __name__=="__main__":
+    main()
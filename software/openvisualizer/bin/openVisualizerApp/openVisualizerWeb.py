@@ -44,12 +44,15 @@ sys.path.insert(0, coapDir)
 
 import openVisualizerApp
 from openvisualizer.eventBus      import eventBusClient
+from openvisualizer.liveUpdates   import liveUpdates
 from openvisualizer.SimEngine     import SimEngine
 from openvisualizer.BspEmulator   import VcdLogger
 from openvisualizer import ovVersion
 from coap import coap
 import time
 
+DEFAULT_PUSH_PERIOD = 1.0 # seconds
+
 # add default parameters to all bottle templates
 view = functools.partial(view, ovVersion='.'.join(list([str(v) for v in ovVersion.VERSION])))
 
@@ -59,10 +62,12 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
     server.
     '''
 
-    def __init__(self,app,websrv,roverMode):
+    def __init__(self,app,websrv,roverMode,pushPeriod=DEFAULT_PUSH_PERIOD):
         '''
-        :param app:    OpenVisualizerApp
-        :param websrv: Web server
+        :param app:        OpenVisualizerApp
+        :param websrv:     Web server
+        :param pushPeriod: Minimum time between two batches of events
+                           pushed to a client, in seconds
         '''
         log.info('Creating OpenVisualizerWeb')
 
@@ -71,6 +76,9 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
         self.engine          = SimEngine.SimEngine()
         self.websrv          = websrv
         self.roverMode       = roverMode
+        self.liveUpdates     = liveUpdates.LiveUpdates(app,pushPeriod)
+        # tells ETags of a previous run apart, as numbers of updates restart from 0
+        self.etagPrefix      = '{0:x}'.format(int(time.time()))
 
         # command support
         Cmd.__init__(self)
@@ -105,7 +113,6 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
             time.sleep(1)
             for moteid in app.DAGrootList:
                 self._showMoteview(moteid)
-                self._getMoteData(moteid)
                 self._toggleDAGroot(moteid)
 
 
@@ -122,6 +129,8 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
         self.websrv.route(path='/moteview',                               callback=self._showMoteview)
         self.websrv.route(path='/moteview/:moteid',                       callback=self._showMoteview)
         self.websrv.route(path='/motedata/:moteid',                       callback=self._getMoteData)
+        self.websrv.route(path='/motehistory/:moteid',                    callback=self._getMoteHistorySeries)
+        self.websrv.route(path='/motehistory/:moteid/:elem/:field',       callback=self._getMoteHistory)
         self.websrv.route(path='/toggleDAGroot/:moteid',                  callback=self._toggleDAGroot)
         self.websrv.route(path='/eventBus',                               callback=self._showEventBus)
         self.websrv.route(path='/routing',                                callback=self._showRouting)
@@ -129,6 +138,7 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
         self.websrv.route(path='/connectivity',                           callback=self._showConnectivity)
         self.websrv.route(path='/connectivity/motes',                     callback=self._showMotesConnectivity)
         self.websrv.route(path='/eventdata',                              callback=self._getEventData)
+        self.websrv.route(path='/events',                                 callback=self._streamEvents)
         self.websrv.route(path='/wiresharkDebug/:enabled',                callback=self._setWiresharkDebug)
         self.websrv.route(path='/gologicDebug/:enabled',                  callback=self._setGologicDebug)
         self.websrv.route(path='/topology',                               callback=self._topologyPage)
@@ -139,6 +149,7 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
         self.websrv.route(path='/topology/connections',   method='POST',  callback=self._topologyConnectionsUpdate)
         self.websrv.route(path='/topology/connections',   method='DELETE',callback=self._topologyConnectionsDelete)
         self.websrv.route(path='/topology/route',         method='GET',   callback=self._topologyRouteRetrieve)
+        self.websrv.route(path='/topology/links',         method='GET',   callback=self._topologyLinksRetrieve)
         self.websrv.route(path='/static/<filepath:path>',                 callback=self._serverStatic)
         if self.roverMode:
             self.websrv.route(path='/rovers',                             callback=self._showrovers)
@@ -268,31 +279,98 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
         '''
         Collects data for the provided mote.
 
+        The ETag of the response changes with the number of updates of the
+        state elements, so a client which already has their current state
+        gets a 304 response.
+
         :param moteid: 16-bit ID of mote
         '''
         log.debug('Get JSON data for moteid {0}'.format(moteid))
         ms = self.app.getMoteState(moteid)
         if ms:
             log.debug('Found mote {0} in moteStates'.format(moteid))
-            states = {
-                ms.ST_IDMANAGER   : ms.getStateElem(ms.ST_IDMANAGER).toJson('data'),
-                ms.ST_ASN         : ms.getStateElem(ms.ST_ASN).toJson('data'),
-                ms.ST_ISSYNC      : ms.getStateElem(ms.ST_ISSYNC).toJson('data'),
-                ms.ST_MYDAGRANK   : ms.getStateElem(ms.ST_MYDAGRANK).toJson('data'),
-                ms.ST_KAPERIOD    : ms.getStateElem(ms.ST_KAPERIOD).toJson('data'),
-                ms.ST_OUPUTBUFFER : ms.getStateElem(ms.ST_OUPUTBUFFER).toJson('data'),
-                ms.ST_BACKOFF     : ms.getStateElem(ms.ST_BACKOFF).toJson('data'),
-                ms.ST_MACSTATS    : ms.getStateElem(ms.ST_MACSTATS).toJson('data'),
-                ms.ST_SCHEDULE    : ms.getStateElem(ms.ST_SCHEDULE).toJson('data'),
-                ms.ST_QUEUE       : ms.getStateElem(ms.ST_QUEUE).toJson('data'),
-                ms.ST_NEIGHBORS   : ms.getStateElem(ms.ST_NEIGHBORS).toJson('data'),
-                ms.ST_JOINED      : ms.getStateElem(ms.ST_JOINED).toJson('data'),
-            }
+
+            # read before the state, so an update in between changes the next ETag
+            etag = '"{0}-{1}-{2}"'.format(
+                self.etagPrefix,
+                moteid,
+                '.'.join([str(ms.getStateElem(name).getNumUpdates()) for name in ms.ST_ALL]),
+            )
+            if self._isNotModified(etag):
+                return bottle.HTTPResponse(status=304, headers={'ETag': etag})
+            response.headers['ETag'] = etag
+
+            states = {}
+            for name in ms.ST_ALL:
+                states[name] = ms.getStateElemJson(name,'data')
         else:
             log.debug('Mote {0} not found in moteStates'.format(moteid))
             states = {}
         return states
 
+    def _isNotModified(self, etag):
+        '''
+        Whether the If-None-Match header of the request matches the given
+        ETag, i.e. the client already has the current content.
+        '''
+        ifNoneMatch = bottle.request.headers.get('If-None-Match')
+        if not ifNoneMatch:
+            return False
+        return ifNoneMatch.strip()=='*' or etag in [e.strip() for e in ifNoneMatch.split(',')]
+
+    def _getMoteHistorySeries(self, moteid):
+        '''
+        Lists the tiers and the series of the history of the provided mote.
+
+        :param moteid: 16-bit ID of mote
+        '''
+        ms = self.app.getMoteState(moteid)
+        if not ms:
+            log.debug('Mote {0} not found in moteStates'.format(moteid))
+            return {}
+        history = ms.getHistory()
+        return {
+            'tiers'          : history.getTierNames(),
+            'series'         : [
+                {'elem': elem, 'field': field} for (elem,field) in history.getSeriesNames()
+            ],
+        }
+
+    def _getMoteHistory(self, moteid, elem, field):
+        '''
+        Retrieve the values of a field of a state element of the provided
+        mote, over time. Optional query parameters: tier, from and to (UNIX
+        timestamps) and format (json, the default, or csv).
+
+        :param moteid: 16-bit ID of mote
+        '''
+        ms = self.app.getMoteState(moteid)
+        if not ms:
+            log.debug('Mote {0} not found in moteStates'.format(moteid))
+            return {}
+        query = bottle.request.query
+        try:
+            tsFrom  = float(query['from']) if query.get('from') else None
+            tsTo    = float(query['to'])   if query.get('to')   else None
+            samples = ms.getHistory().query(
+                elem,
+                field,
+                tier   = query.get('tier') or ms.getHistory().TIER_RAW,
+                tsFrom = tsFrom,
+                tsTo   = tsTo,
+            )
+        except ValueError as err:
+            return bottle.HTTPError(400, str(err))
+
+        if query.get('format')=='csv':
+            response.headers['Content-type'] = 'text/csv'
+            return ''.join(['ts,value\n']+['{0!r},{1!r}\n'.format(ts,v) for (ts,v) in samples])
+        return {
+            'elem'           : elem,
+            'field'          : field,
+            'samples'        : samples,
+        }
+
     def _setWiresharkDebug(self, enabled):
         '''
         Selects whether eventBus must export debug packets.
@@ -349,22 +427,15 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
 
         # motes
         motes = []
-        rank  = 0
-        while True:
-            try:
-                mh            = self.engine.getMoteHandler(rank)
-                id            = mh.getId()
-                (lat,lon)     = mh.getLocation()
-                motes += [
-                    {
-                        'id':    id,
-                        'lat':   lat,
-                        'lon':   lon,
-                    }
-                ]
-                rank+=1
-            except IndexError:
-               break
+        for mh in self.engine.getMoteHandlers():
+            (lat,lon)     = mh.getLocation()
+            motes += [
+                {
+                    'id':    mh.getId(),
+                    'lat':   lat,
+                    'lon':   lon,
+                }
+            ]
 
         # connections
         connections = self.engine.propagation.retrieveConnections()
@@ -451,6 +522,18 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
 
         return data
 
+    def _topologyLinksRetrieve(self):
+        '''
+        Retrieve the number of frames sent and delivered over each link of
+        the Markov error model, in JSON format.
+        '''
+
+        data = {
+            'links'          : self.engine.propagation.retrieveLinkStats(),
+        }
+
+        return data
+
     def _topologyDownload(self):
         '''
         Retrieve the topology data, in JSON format, and download it.
@@ -475,9 +558,29 @@ class OpenVisualizerWeb(eventBusClient.eventBusClient,Cmd):
         response = {
             'isDebugPkts' : 'true' if self.app.eventBusMonitor.wiresharkDebugEnabled else 'false',
             'stats'       : self.app.eventBusMonitor.getStats(),
+            'cacheStats'  : json.dumps([
+                self.app.openLbr.getStats(),
+                self.app.rpl.sourceRoute.getStats(),
+            ]),
+            'jrcStats'    : json.dumps(self.app.jrc.getStats()),
         }
         return response
 
+    def _streamEvents(self):
+        '''
+        Streams the changes of the mote states, of the DAG and of the event
+        bus counters, as Server-Sent Events. Optional query parameter:
+        period, the time between two batches of events, in seconds.
+        '''
+        try:
+            period = float(bottle.request.query.get('period') or 0)
+        except ValueError as err:
+            return bottle.HTTPError(400, str(err))
+
+        response.headers['Content-type']  = 'text/event-stream'
+        response.headers['Cache-Control'] = 'no-cache'
+        return self.liveUpdates.subscribe(period or None).stream()
+
     #===== callbacks
     
     def do_state(self, arg):
@@ -610,6 +713,36 @@ def _addParserArgs(parser):
         action     = 'store_true',
         help       = 'rover mode, to access motes connected on rovers'
     )
+    parser.add_argument('--pushPeriod',
+        dest       = 'pushPeriod',
+        type       = float,
+        default    = DEFAULT_PUSH_PERIOD,
+        action     = 'store',
+        help       = 'minimum time between two batches of events pushed to a client, in seconds'
+    )
+
+class ThreadingWSGIRefServer(bottle.ServerAdapter):
+    '''
+    The wsgiref server of Bottle, serving each request in its own thread,
+    so that the streams of events do not block the other requests.
+    '''
+
+    def run(self, app):
+        from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+        import SocketServer
+
+        class Server(SocketServer.ThreadingMixIn, WSGIServer):
+            daemon_threads = True
+
+        handlerClass = WSGIRequestHandler
+        if self.quiet:
+            class QuietHandler(WSGIRequestHandler):
+                def log_request(*args, **kw):
+                    pass
+            handlerClass = QuietHandler
+
+        srv = make_server(self.host, int(self.port), app, Server, handlerClass)
+        srv.serve_forever()
 
 webapp = None
 if __name__=="__main__":
@@ -634,7 +767,7 @@ if __name__=="__main__":
     
     #===== add a web interface
     websrv   = bottle.Bottle()
-    webapp   = OpenVisualizerWeb(app, websrv, argspace.roverMode)
+    webapp   = OpenVisualizerWeb(app, websrv, argspace.roverMode, argspace.pushPeriod)
 
     # start web interface in a separate thread
     webthread = threading.Thread(
@@ -642,6 +775,7 @@ if __name__=="__main__":
         kwargs = {
             'host'          : argspace.host,
             'port'          : argspace.port,
+            'server'        : ThreadingWSGIRefServer,
             'quiet'         : not app.debug,
             'debug'         : app.debug,
         }
@@ -47,7 +47,7 @@ setup(
                         'openvisualizer.openLbr', 'openvisualizer.openTun', 
                         'openvisualizer.openType', 'openvisualizer.openUI', 
                         'openvisualizer.RPL', 'openvisualizer.SimEngine', 
-                        'openvisualizer.JRC'],
+                        'openvisualizer.JRC', 'openvisualizer.liveUpdates'],
     package_dir      = {'': '.', 'openvisualizer': 'openvisualizer'},
     scripts          = appdirGlob('openVisualizer*.py'),
     # Copy simdata files by extension so don't copy .gitignore in that directory.
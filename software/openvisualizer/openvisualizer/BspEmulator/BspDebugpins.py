@@ -35,6 +35,9 @@ class BspDebugpins(BspModule.BspModule):
         self.debugPinHigh         = False
         self.vcdLogger            = VcdLogger.VcdLogger()
         
+        # declare this mote's pins before any is logged
+        self.vcdLogger.addMote(self.motehandler.getId())
+        
         # initialize the parent
         BspModule.BspModule.__init__(self,'BspDebugpins')
     
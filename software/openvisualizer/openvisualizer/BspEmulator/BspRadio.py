@@ -54,6 +54,7 @@ class BspRadio(BspModule.BspModule,eventBusClient.eventBusClient):
         self.isRfOn      = False  # radio is off
         self.txBuf       = []
         self.rxBuf       = []
+        self.rxFrom      = None   # moteId of the frame being received
         self.delayTx     = 0.000214
         
         # initialize the parents
@@ -336,17 +337,22 @@ class BspRadio(BspModule.BspModule,eventBusClient.eventBusClient):
     
     #======================== indication from Propagation =====================
     
-    def indicateTxStart(self,moteId,packet,channel):
+    def indicateTxStart(self,moteId,packet,channel,rssi=-50):
+        '''
+        :returns: whether the radio started receiving the frame, i.e. it
+            was listening on its channel.
+        '''
         
         if self.log.isEnabledFor(logging.DEBUG):
-            self.log.debug('_indicateTxStart from moteId={0} channel={1} len={2}'.format(moteId,channel,len(packet)))
+            self.log.debug('_indicateTxStart from moteId={0} channel={1} len={2} rssi={3}'.format(moteId,channel,len(packet),rssi))
     
         if (self.isInitialized==True         and
             self.state==RadioState.LISTENING and
             self.frequency==channel):
             self._changeState(RadioState.RECEIVING)
+            self.rxFrom      = moteId
             self.rxBuf       = packet
-            self.rssi        = -50
+            self.rssi        = int(round(rssi))
             self.lqi         = 100
             self.crcPasses   = True
             
@@ -361,15 +367,24 @@ class BspRadio(BspModule.BspModule,eventBusClient.eventBusClient):
                 self.intr_startOfFrame_fromPropagation,
                 self.INTR_STARTOFFRAME_PROPAGATION,
             )
+            return True
+        return False
     
-    def indicateTxEnd(self,moteId):
+    def indicateTxEnd(self,moteId,crcPasses=True):
+        '''
+        :returns: whether the radio was receiving the frame.
+        '''
         
         if self.log.isEnabledFor(logging.DEBUG):
-            self.log.debug('_indicateTxEnd from moteId={0}'.format(moteId))
+            self.log.debug('_indicateTxEnd from moteId={0} crcPasses={1}'.format(moteId,crcPasses))
         
-        if (self.isInitialized==True and
-            self.state==RadioState.RECEIVING):
+        # only the end of the frame being received, not of one which
+        # started while receiving
+        if (self.isInitialized==True            and
+            self.state==RadioState.RECEIVING    and
+            self.rxFrom==moteId):
             self._changeState(RadioState.LISTENING)
+            self.crcPasses   = crcPasses
             
             # schedule end of frame
             self.timeline.scheduleEvent(
@@ -378,6 +393,8 @@ class BspRadio(BspModule.BspModule,eventBusClient.eventBusClient):
                 self.intr_endOfFrame_fromPropagation,
                 self.INTR_ENDOFFRAME_PROPAGATION,
             )
+            return True
+        return False
     
     #======================== private =========================================
     
@@ -13,17 +13,26 @@ import BspModule
 class BspUart(BspModule.BspModule):
     '''
     Emulates the 'uart' BSP module
+    
+    In batched mode, the bytes the mote writes one at a time are handed over
+    to the moteProbe when an HDLC flag closes a frame, rather than one by
+    one, and the bytes written to the mote are delivered by a single event,
+    scheduled when the last one is done being received. In both modes, each
+    byte takes 1/BAUDRATE seconds of simulated time.
     '''
     
-    INTR_TX   = 'uart.tx'
-    INTR_RX   = 'uart.rx'
-    BAUDRATE  = 115200
+    INTR_TX         = 'uart.tx'
+    INTR_RX         = 'uart.rx'
+    BAUDRATE        = 115200
+    HDLC_FLAG       = 0x7e
+    MAX_BATCH_SIZE  = 1024    # bytes buffered before handing over, with no flag
     
-    def __init__(self,motehandler):
+    def __init__(self,motehandler,batched=True):
         
         # store params
         self.engine               = SimEngine.SimEngine()
         self.motehandler          = motehandler
+        self.batched              = batched
         
         # local variables
         self.timeline             = self.engine.timeline
@@ -58,7 +67,7 @@ class BspUart(BspModule.BspModule):
         # copy uartRxBuffer
         with self.uartRxBufferLock:
             assert len(self.uartRxBuffer)>0
-            returnVal             = [chr(b) for b in self.uartRxBuffer]
+            returnVal             = str(bytearray(self.uartRxBuffer))
             self.uartRxBuffer     = []
         
         # return that element
@@ -75,7 +84,10 @@ class BspUart(BspModule.BspModule):
             self.uartTxBuffer     = [ord(b) for b in bytesToWrite]
         
         self.engine.pause()
-        self._scheduleNextTx()
+        if self.batched:
+            self._scheduleNextTx(len(bytesToWrite))
+        else:
+            self._scheduleNextTx()
         self.engine.resume()
     
     def doneReading(self):
@@ -144,7 +156,7 @@ class BspUart(BspModule.BspModule):
         
         # log the activity
         if self.log.isEnabledFor(logging.DEBUG):
-            self.log.debug('cmd_writeByte byteToWrite='+str(self.byteToWrite))
+            self.log.debug('cmd_writeByte byteToWrite='+str(byteToWrite))
         
         # set tx interrupt flag
         self.txInterruptFlag      = True
@@ -163,6 +175,14 @@ class BspUart(BspModule.BspModule):
         # add to receive buffer
         with self.uartRxBufferLock:
             self.uartRxBuffer    += [byteToWrite]
+            if self.batched:
+                # hand over complete frames only
+                endOfBatch        = (
+                    (byteToWrite==self.HDLC_FLAG and len(self.uartRxBuffer)>1) or
+                    len(self.uartRxBuffer)>=self.MAX_BATCH_SIZE
+                )
+                if not endOfBatch:
+                    return
         
         # release the semaphore indicating there is something in RX buffer
         self.uartRxBufferSem.release()
@@ -247,12 +267,32 @@ class BspUart(BspModule.BspModule):
     def intr_rx(self):
         '''
         Interrupt to indicate to mote it received a byte from the UART.
+        
+        In batched mode, the mote is interrupted for each of the bytes
+        written.
         '''
         
         # log the activity
         if self.log.isEnabledFor(logging.DEBUG):
             self.log.debug('intr_rx')
         
+        if self.batched:
+            
+            with self.uartTxBufferLock:
+                bytesToRx         = self.uartTxBuffer
+                self.uartTxBuffer = []
+            
+            for b in bytesToRx:
+                
+                with self.uartTxBufferLock:
+                    self.uartTxNext = b
+                
+                # send RX interrupt to mote
+                self.motehandler.mote.uart_isr_rx()
+            
+            # do *not* kick the scheduler
+            return False
+        
         with self.uartTxBufferLock:
             
             # make sure there is a byte to TX
@@ -273,10 +313,10 @@ class BspUart(BspModule.BspModule):
     
     #======================== private =========================================
     
-    def _scheduleNextTx(self):
+    def _scheduleNextTx(self,numBytes=1):
         
-        # calculate time at which byte will get out
-        timeNextTx           = self.timeline.getCurrentTime()+float(1.0/float(self.BAUDRATE))
+        # calculate time at which the (last) byte will get out
+        timeNextTx           = self.timeline.getCurrentTime()+float(numBytes)/float(self.BAUDRATE)
         
         # schedule that event
         self.timeline.scheduleEvent(
@@ -1,140 +1,254 @@
 import os
-import traceback
+import gzip
+import shutil
 import threading
+import time
 
 class VcdLogger(object):
-    
+    '''
+    Logs the debug pins of the emulated motes to a VCD file.
+
+    Motes are declared as their BspDebugpins is created, which is before any
+    pin is logged, so the header is written once, at the first logged value.
+    Only declaring a mote after that rewrites the file. The file of a previous
+    run is removed when the logger is created, so that it is not mistaken for
+    the file of this run if nothing is logged.
+    '''
+
     ACTIVITY_DUR   = 1000 # 1000ns=1us
     FILENAME       = 'debugpins.vcd'
-    FILENAME_SWAP  = 'debugpins.vcd.swap'
+    SWAP_SUFFIX    = '.swap'
+    GZIP_SUFFIX    = '.gz'
     ENDVAR_LINE    = '$upscope $end\n'
     ENDDEF_LINE    = '$enddefinitions $end\n'
-    
+    BUFFER_SIZE    = 1024*1024 # bytes
+    FLUSH_PERIOD   = 1.0 # seconds
+    COPY_SIZE      = 1024*1024 # bytes copied at once when rewriting the file
+
     #======================== singleton pattern ===============================
-    
+
     _instance = None
     _init     = False
-    
+
     SIGNAMES  = ['frame','slot','fsm','task','isr','radio','ka','syncPacket','syncAck','debug']
-    
+
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
             cls._instance = super(VcdLogger, cls).__new__(cls, *args, **kwargs)
         return cls._instance
-    
+
     #======================== main ============================================
-    
+
     def __init__(self):
-        
+
         # don't re-initialize an instance (singleton pattern)
         if self._init:
             return
         self._init = True
-        
+
         # local variables
-        self.f          = open(self.FILENAME,'w')
+        self.f          = None  # opened at the first logged value
+        self.compress   = False
+        self.bodyOffset = None  # length of the header, once written
+        self.lastFlush  = 0
+        self.motes      = []    # in declaration order
         self.signame    = {}
         self.lastTs     = {}
-        self.dataLock   = threading.RLock()
+        self.dataLock   = threading.Lock()
         self.enabled    = False
-        self.sigChar    = ord('!')
-        
-        # create header
-        header          = []
-        header         += ['$timescale 1ns $end\n']
-        header         += ['$scope module logic $end\n']
-        # variables will be declared here by self._addMote()
-        header         += [self.ENDVAR_LINE]
-        header         += [self.ENDDEF_LINE]
-        header          = ''.join(header)
-        
-        # write header
-        self.f.write(header)
-    
+        self.moteFilter = None
+        self.sigFilter  = None
+        self.numSigs    = 0
+
+        # remove the file of a previous run, compressed or not
+        for filename in [self.FILENAME,self.FILENAME+self.GZIP_SUFFIX]:
+            if os.path.exists(filename):
+                os.remove(filename)
+
     #======================== public ==========================================
-    
+
     def setEnabled(self,enabled):
         assert enabled in [True,False]
-        
+
         with self.dataLock:
             self.enabled = enabled
-    
+            if not enabled and self.f:
+                self.f.flush()
+
+    def setCompress(self,compress):
+        '''
+        Selects whether the file is written gzip-compressed, as FILENAME.gz.
+        Must be called before the first value is logged.
+        '''
+        assert compress in [True,False]
+
+        with self.dataLock:
+            assert self.f is None
+            self.compress = compress
+
+    def setFilter(self,motes=None,signals=None):
+        '''
+        Only logs the given motes and signals; None logs them all. All motes
+        and signals remain declared.
+        '''
+        assert signals is None or set(signals)<=set(self.SIGNAMES)
+
+        with self.dataLock:
+            self.moteFilter = None if motes   is None else set(motes)
+            self.sigFilter  = None if signals is None else set(signals)
+
+    def getFilename(self):
+        if self.compress:
+            return self.FILENAME+self.GZIP_SUFFIX
+        return self.FILENAME
+
+    def addMote(self,mote):
+        '''
+        Declares the variables of a mote.
+        '''
+
+        with self.dataLock:
+            if mote not in self.signame:
+                self._addMote(mote)
+
     def log(self,ts,mote,signal,state):
-        
+
         assert signal in self.SIGNAMES
         assert state in [True,False]
-        
-        # stop here if not enables
-        with self.dataLock:
-            if not self.enabled:
-                return
-        
+
+        # stop here if not enabled
+        if not self.enabled:
+            return
+        if self.moteFilter is not None and mote not in self.moteFilter:
+            return
+        if self.sigFilter is not None and signal not in self.sigFilter:
+            return
+
         # translate state to val
         if state:
             val = 1
         else:
             val = 0
-        
+
         with self.dataLock:
-            
+
             # add mote if needed
             if mote not in self.signame:
                 self._addMote(mote)
-            
+
+            # write header if needed
+            if self.f is None:
+                self._open()
+
             # format
-            output  = []
             tsTemp = int(ts*1000000)*1000
-            if ((mote,signal) in self.lastTs) and self.lastTs[(mote,signal)]==ts:
+            if self.lastTs.get((mote,signal))==ts:
                 tsTemp += self.ACTIVITY_DUR
-            output += ['#{0}\n'.format(tsTemp)]
-            output += ['{0}{1}\n'.format(val,self.signame[mote][signal])]
-            output  = ''.join(output)
-            
+
             # write
-            self.f.write(output)
-            
+            self.f.write('#{0}\n{1}{2}\n'.format(tsTemp,val,self.signame[mote][signal]))
+
             # remember ts
             self.lastTs[(mote,signal)] = ts
-    
+
+            # flush periodically
+            now = time.time()
+            if now-self.lastFlush>self.FLUSH_PERIOD:
+                self.f.flush()
+                self.lastFlush = now
+
+    def close(self):
+
+        with self.dataLock:
+            if self.f:
+                self.f.close()
+                self.f = None
+
     #======================== private =========================================
-    
+
     def _addMote(self,mote):
         assert mote not in self.signame
-        
+
         #=== populate signame
         self.signame[mote] = {}
         for signal in self.SIGNAMES:
-            self.signame[mote][signal] = chr(self.sigChar)
-            self.sigChar += 1
-        
-        #=== close FILENAME
-        self.f.close()
-        
-        #=== FILENAME -> FILENAME_SWAP
-        fswap = open(self.FILENAME_SWAP,'w')
-        for line in open(self.FILENAME,'r'):
-            # declare variables
-            if line==self.ENDVAR_LINE:
-                for signal in self.SIGNAMES:
-                    fswap.write(
-                        '$var wire 1 {0} {1}_{2} $end\n'.format(
-                            self.signame[mote][signal],
-                            mote,
-                            signal,
-                        )
+            self.signame[mote][signal] = self._identifier(self.numSigs)
+            self.numSigs += 1
+        self.motes += [mote]
+
+        #=== the header is already written, rewrite the file
+        if self.f:
+            self._rewrite()
+
+    def _identifier(self,num):
+        '''
+        Returns the VCD identifier of the num-th variable, made of the
+        printable ASCII characters, '!' to '~'.
+        '''
+        returnVal = ''
+        while True:
+            returnVal += chr(ord('!')+num%94)
+            num        = num//94
+            if not num:
+                return returnVal
+            num       -= 1
+
+    def _header(self):
+        output  = []
+        output += ['$timescale 1ns $end\n']
+        output += ['$scope module logic $end\n']
+        for mote in self.motes:
+            for signal in self.SIGNAMES:
+                output += [
+                    '$var wire 1 {0} {1}_{2} $end\n'.format(
+                        self.signame[mote][signal],
+                        mote,
+                        signal,
                     )
-            # print line
-            fswap.write(line)
-            # initialize variables
-            if line==self.ENDDEF_LINE:
-                for signal in self.SIGNAMES:
-                    fswap.write('#0\n')
-                    fswap.write('0{0}\n'.format(self.signame[mote][signal]))
+                ]
+        output += [self.ENDVAR_LINE]
+        output += [self.ENDDEF_LINE]
+
+        # initialize variables
+        for mote in self.motes:
+            for signal in self.SIGNAMES:
+                output += ['#0\n']
+                output += ['0{0}\n'.format(self.signame[mote][signal])]
+
+        return ''.join(output)
+
+    def _openFile(self,filename,mode):
+        if self.compress:
+            return gzip.open(filename,mode)
+        return open(filename,mode,self.BUFFER_SIZE)
+
+    def _open(self):
+        header          = self._header()
+        self.f          = self._openFile(self.getFilename(),'w')
+        self.f.write(header)
+        self.bodyOffset = len(header)
+
+    def _rewrite(self):
+        '''
+        Writes the file again with the current header, followed by the values
+        logged so far.
+        '''
+
+        filename = self.getFilename()
+
+        self.f.close()
+
+        header   = self._header()
+        fswap    = self._openFile(filename+self.SWAP_SUFFIX,'w')
+        fswap.write(header)
+        fold     = self._openFile(filename,'r')
+        fold.seek(self.bodyOffset)
+        shutil.copyfileobj(fold,fswap,self.COPY_SIZE)
+        fold.close()
         fswap.close()
-        
-        #=== FILENAME_SWAP -> FILENAME
-        os.remove(self.FILENAME)
-        os.rename(self.FILENAME_SWAP, self.FILENAME)
-        
-        #=== re-open FILENAME
-        self.f = open(self.FILENAME,'a')
+
+        os.remove(filename)
+        os.rename(filename+self.SWAP_SUFFIX,filename)
+
+        self.f          = self._openFile(filename,'a')
+        self.bodyOffset = len(header)
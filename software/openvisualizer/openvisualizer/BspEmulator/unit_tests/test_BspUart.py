@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # BspEmulator/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import logging.handlers
+import threading
+
+import pytest
+
+import BspUart
+from   openvisualizer.SimEngine import TimeLine
+from   openvisualizer.moteProbe import OpenHdlc
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_BspUart.log'
+
+import logging
+log = logging.getLogger('test_BspUart')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_BspUart',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ defines =========================================
+
+# two HDLC frames, the second one with an escaped byte
+MOTE_TO_PC    = [0x7e,0x44,0x01,0x02,0x03,0xaa,0xbb,0x7e,
+                 0x7e,0x52,0x7d,0x5e,0x10,0xcc,0xdd,0x7e]
+PC_TO_MOTE    = '~\x44\x11\x22\x33\x44\x55\x66\xee\xff~'
+
+#============================ helpers =========================================
+
+class FakeMote(object):
+
+    def __init__(self):
+        self.uart      = None
+        self.rxBytes   = []
+
+    def uart_isr_rx(self):
+        self.rxBytes  += [self.uart.cmd_readByte()]
+
+    def uart_isr_tx(self):
+        pass
+
+class FakeMoteHandler(object):
+
+    def __init__(self):
+        self.mote      = FakeMote()
+
+    def getId(self):
+        return 1
+
+def createUart(batched):
+    moteHandler        = FakeMoteHandler()
+    uart               = BspUart.BspUart(moteHandler,batched=batched)
+    moteHandler.mote.uart = uart
+    # run on a private timeline, driven by the test
+    uart.timeline      = TimeLine.TimeLine()
+    uart.timeline.firstEventPassed = True
+    return uart
+
+def runTimeline(timeline):
+    '''
+    Execute the events of a timeline until it is empty.
+
+    :returns: The number of events executed.
+    '''
+    numEvents = 0
+    while True:
+        event = timeline._popEvent()
+        if event is None:
+            return numEvents
+        timeline.currentTime = event.atTime
+        event.cb()
+        numEvents += 1
+
+def readFromMote(uart):
+    '''
+    Write MOTE_TO_PC from the mote, read it from a moteProbe-like thread.
+
+    :returns: The chunks read, and the frames the deframer found in them.
+    '''
+    chunks   = []
+    frames   = []
+    deframer = OpenHdlc.OpenHdlcDeframer()
+
+    def probe():
+        while True:
+            rxBytes = uart.read()
+            chunks.append(rxBytes)
+            frames.extend(deframer.feed(rxBytes))
+            uart.doneReading()
+
+    reader = threading.Thread(target=probe)
+    reader.daemon = True
+    reader.start()
+
+    for b in MOTE_TO_PC:
+        uart.cmd_writeByte(b)
+
+    return (chunks,frames)
+
+#============================ fixtures ========================================
+
+@pytest.fixture(params=[False,True])
+def batched(request):
+    return request.param
+
+#============================ tests ===========================================
+
+def test_moteToPc(batched):
+
+    log.debug("\n---------- test_moteToPc (batched={0})".format(batched))
+
+    uart              = createUart(batched)
+    (chunks,frames)   = readFromMote(uart)
+
+    # the same bytes, hence the same frames, make it to the moteProbe
+    assert ''.join(chunks)==str(bytearray(MOTE_TO_PC))
+    assert frames==[
+        str(bytearray(MOTE_TO_PC[0:8])),
+        str(bytearray(MOTE_TO_PC[8:16])),
+    ]
+
+    if batched:
+        # one hand-over per frame
+        assert len(chunks)==2
+    else:
+        assert len(chunks)==len(MOTE_TO_PC)
+
+def test_pcToMote(batched):
+
+    log.debug("\n---------- test_pcToMote (batched={0})".format(batched))
+
+    uart              = createUart(batched)
+    uart.write(PC_TO_MOTE)
+    numEvents         = runTimeline(uart.timeline)
+
+    assert uart.motehandler.mote.rxBytes==[ord(c) for c in PC_TO_MOTE]
+
+    # the last byte is received once all bytes have been on the line
+    expectedTime      = float(len(PC_TO_MOTE))/float(uart.BAUDRATE)
+    assert abs(uart.timeline.getCurrentTime()-expectedTime)<1e-12
+
+    if batched:
+        assert numEvents==1
+    else:
+        assert numEvents==len(PC_TO_MOTE)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # BspEmulator/
+
+import gzip
+import logging
+import logging.handlers
+
+import pytest
+
+import VcdLogger
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_VcdLogger.log'
+
+import logging
+log = logging.getLogger('test_VcdLogger')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_VcdLogger',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ fixtures ========================================
+
+@pytest.fixture
+def vcdLogger(tmpdir,monkeypatch):
+    '''
+    A fresh VcdLogger (singleton), writing in a temporary directory.
+    '''
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setattr(VcdLogger.VcdLogger,'_instance',None)
+    monkeypatch.setattr(VcdLogger.VcdLogger,'_init',False)
+    returnVal = VcdLogger.VcdLogger()
+    returnVal.setEnabled(True)
+    return returnVal
+
+#============================ helpers =========================================
+
+def parse(lines):
+    '''
+    Returns the declared variables, as {code: name}, and the values, as a
+    list of (ts,name,value), of a VCD file.
+    '''
+    variables = {}
+    values    = []
+    ts        = None
+    for line in lines:
+        if line.startswith('$var'):
+            (_,_,_,code,name,_) = line.split()
+            variables[code] = name
+        elif line.startswith('#'):
+            ts = int(line[1:])
+        elif line[0] in '01':
+            values += [(ts,variables[line[1:].strip()],int(line[0]))]
+    return (variables,values)
+
+def readFile(vcdLogger):
+    vcdLogger.close()
+    if vcdLogger.compress:
+        f = gzip.open(vcdLogger.getFilename(),'r')
+    else:
+        f = open(vcdLogger.getFilename(),'r')
+    returnVal = parse(f.readlines())
+    f.close()
+    return returnVal
+
+#============================ tests ===========================================
+
+def test_declaredUpFront(vcdLogger):
+
+    log.debug("\n---------- test_declaredUpFront")
+
+    vcdLogger.addMote(1)
+    vcdLogger.addMote(2)
+    vcdLogger.log(0.001,1,'frame',True)
+    vcdLogger.log(0.001,1,'frame',False)
+    vcdLogger.log(0.002,2,'radio',True)
+
+    (variables,values) = readFile(vcdLogger)
+
+    assert len(variables)==2*len(VcdLogger.VcdLogger.SIGNAMES)
+    assert values[-3:]==[
+        (1000000,'1_frame',1),
+        (1001000,'1_frame',0),
+        (2000000,'2_radio',1),
+    ]
+
+@pytest.mark.parametrize('compress',[False,True])
+def test_lateMote(vcdLogger,compress):
+    '''
+    A mote added after values were logged is declared, and the values
+    logged before are kept.
+    '''
+
+    log.debug("\n---------- test_lateMote (compress={0})".format(compress))
+
+    vcdLogger.setCompress(compress)
+    vcdLogger.addMote(1)
+    for i in range(1000):
+        vcdLogger.log(i*0.001,1,'slot',bool(i%2))
+    vcdLogger.log(1.0,2,'isr',True)
+
+    (variables,values) = readFile(vcdLogger)
+
+    assert sorted(variables.values())==sorted(
+        ['{0}_{1}'.format(m,s) for m in [1,2] for s in VcdLogger.VcdLogger.SIGNAMES]
+    )
+    assert [(ts,name,val) for (ts,name,val) in values if ts]==[
+        (i*1000000,'1_slot',i%2) for i in range(1,1000)
+    ]+[(1000000000,'2_isr',1)]
+
+def test_filter(vcdLogger):
+
+    log.debug("\n---------- test_filter")
+
+    vcdLogger.setFilter(motes=[2],signals=['radio'])
+    vcdLogger.addMote(1)
+    vcdLogger.addMote(2)
+    vcdLogger.log(0.001,1,'radio',True)
+    vcdLogger.log(0.001,2,'frame',True)
+    vcdLogger.log(0.001,2,'radio',True)
+
+    (variables,values) = readFile(vcdLogger)
+
+    assert [v for v in values if v[0]]==[(1000000,'2_radio',1)]
+
+def test_disabled(vcdLogger):
+
+    log.debug("\n---------- test_disabled")
+
+    vcdLogger.setEnabled(False)
+    vcdLogger.addMote(1)
+    vcdLogger.log(0.001,1,'radio',True)
+
+    assert not os.path.exists(vcdLogger.getFilename())
+
+def test_previousRunRemoved(tmpdir,monkeypatch):
+
+    log.debug("\n---------- test_previousRunRemoved")
+
+    monkeypatch.chdir(str(tmpdir))
+    for filename in ['debugpins.vcd','debugpins.vcd.gz']:
+        open(filename,'w').close()
+    monkeypatch.setattr(VcdLogger.VcdLogger,'_instance',None)
+    monkeypatch.setattr(VcdLogger.VcdLogger,'_init',False)
+    VcdLogger.VcdLogger()
+
+    assert not os.path.exists('debugpins.vcd')
+    assert not os.path.exists('debugpins.vcd.gz')
+
+def test_manyMotes(vcdLogger):
+
+    log.debug("\n---------- test_manyMotes")
+
+    for mote in range(1,201):
+        vcdLogger.addMote(mote)
+    vcdLogger.log(0.001,200,'debug',True)
+
+    (variables,values) = readFile(vcdLogger)
+
+    assert len(variables)==200*len(VcdLogger.VcdLogger.SIGNAMES)
+    assert values[-1]==(1000000,'200_debug',1)
@@ -1,4 +1,7 @@
 import threading
+import collections
+import functools
+import time
 from   coap   import    coap,                    \
                         coapResource,            \
                         coapDefines as d,        \
@@ -31,6 +34,9 @@ class JRC():
     def close(self):
         self.coapServer.close()
 
+    def getStats(self):
+        return self.coapServer.getStats()
+
 # ======================== Security Context Handler =========================
 class contextHandler():
     MASTERSECRET = binascii.unhexlify('000102030405060708090A0B0C0D0E0F')
@@ -68,8 +74,22 @@ class contextHandler():
 
 # ======================== Interface with OpenVisualizer ======================================
 class coapServer(eventBusClient.eventBusClient):
+    '''
+    Forwards the CoAP messages from the mesh to the CoAP server, and back.
+
+    The messages of a mote are forwarded through a CoAP endpoint at its
+    address, kept open for its next messages, so that the responses to
+    concurrent requests of several motes are told apart. Requests are
+    matched with their response by token, or by message ID when they have
+    no token, to measure the latency of the joins.
+    '''
+
     # link-local prefix
     LINK_LOCAL_PREFIX = [0xfe, 0x80, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
+    MAX_FORWARDERS = 1024     # endpoints kept open; the least recently used one is closed beyond
+    MAX_PENDING = 4096        # requests awaiting a response; beyond, the oldest ones are dropped as timed out
+    PENDING_TIMEOUT = 60      # seconds after which a request is not expected to be answered
+    NUM_LATENCIES = 1000      # latencies of the last responses, kept for the statistics
 
     def __init__(self, coapResource, contextHandler):
         # log
@@ -85,8 +105,6 @@ class coapServer(eventBusClient.eventBusClient):
         self.coapServer.addSecurityContextHandler(contextHandler)
         self.coapServer.maxRetransmit = 1
 
-        self.coapClient = None
-
         self.dagRootEui64 = None
 
         # store params
@@ -116,12 +134,48 @@ class coapServer(eventBusClient.eventBusClient):
 
         # local variables
         self.stateLock = threading.Lock()
+        self.forwarders = collections.OrderedDict()  # mote address -> CoAP endpoint, least recently used first
+        self.pending = collections.OrderedDict()  # (mote address, token or message ID) -> time the request was forwarded, oldest first
+        self.latencies = collections.deque(maxlen=self.NUM_LATENCIES)
+        self.numRequests = 0
+        self.numResponses = 0
+        self.numTimedOut = 0
+        self.firstRequestTime = None
+        self.lastResponseTime = None
 
     # ======================== public ==========================================
 
     def close(self):
-        # nothing to do
-        pass
+        with self.stateLock:
+            forwarders = self.forwarders.values()
+            self.forwarders.clear()
+        for forwarder in forwarders:
+            forwarder.close()
+
+    def getStats(self):
+        '''
+        Returns the counters of the forwarded requests and responses, the
+        number of responses per second since the first request, and the
+        percentiles of the latency of the last responses, in seconds.
+        '''
+        with self.stateLock:
+            latencies = sorted(self.latencies)
+            if self.numResponses and self.lastResponseTime > self.firstRequestTime:
+                responsesPerSecond = self.numResponses / (self.lastResponseTime - self.firstRequestTime)
+            else:
+                responsesPerSecond = None
+            return {
+                'name': 'JRC',
+                'numForwarders': len(self.forwarders),
+                'numRequests': self.numRequests,
+                'numResponses': self.numResponses,
+                'numPending': len(self.pending),
+                'numTimedOut': self.numTimedOut,
+                'responsesPerSecond': responsesPerSecond,
+                'latency': dict(
+                    ('p{0}'.format(p), self._percentile(latencies, p)) for p in [50, 90, 99, 100]
+                ),
+            }
 
     # ======================== private =========================================
 
@@ -187,30 +241,54 @@ class coapServer(eventBusClient.eventBusClient):
         Receive packet from the mesh destined for JRC's CoAP server.
         Forwards the packet to the virtual CoAP server running in test mode (PyDispatcher).
         '''
-        sender = openvisualizer.openvisualizer_utils.formatIPv6Addr(data[0])
+        moteAddress = openvisualizer.openvisualizer_utils.formatIPv6Addr(data[0])
+        key = self._correlationKey(moteAddress, data[1])
+        now = time.time()
+
+        with self.stateLock:
+            forwarder = self._getForwarder(moteAddress)
+            self.numRequests += 1
+            if self.firstRequestTime is None:
+                self.firstRequestTime = now
+            # a retransmission keeps the time of the original request
+            if key and key not in self.pending:
+                if len(self.pending) >= self.MAX_PENDING:
+                    self._dropTimedOut(now)
+                self.pending[key] = now
+
+        # the server may answer from within sendUdp, so the lock is released
         # FIXME pass source port within the signal and open coap client at this port
-        self.coapClient = coap.coap(ipAddress=sender, udpPort=d.DEFAULT_UDP_PORT, testing=True, receiveCallback=self._receiveFromCoAP)
-        self.coapClient.socketUdp.sendUdp(destIp='', destPort=d.DEFAULT_UDP_PORT, msg=data[1]) # low level forward of the CoAP message
+        forwarder.socketUdp.sendUdp(destIp='', destPort=d.DEFAULT_UDP_PORT, msg=data[1]) # low level forward of the CoAP message
         return True
 
-    def _receiveFromCoAP(self, timestamp, sender, data):
+    def _receiveFromCoAP(self, moteAddress, timestamp, sender, data):
         '''
         Receive CoAP response and forward it to the mesh network.
         Appends UDP and IPv6 headers to the CoAP message and forwards it on the Eventbus towards the mesh.
+
+        :param moteAddress: Address of the mote the response is for, bound to the callback of its endpoint.
         '''
-        self.coapClient.close()
+        key = self._correlationKey(moteAddress, data)
+        now = time.time()
+
+        with self.stateLock:
+            requestTime = self.pending.pop(key, None) if key else None
+            if requestTime is not None:
+                self.numResponses += 1
+                self.lastResponseTime = now
+                self.latencies.append(now - requestTime)
 
         # UDP
         udplen = len(data) + 8
 
-        udp = u.int2buf(self.coapClient.udpPort,2)  # src port
+        udp = u.int2buf(d.DEFAULT_UDP_PORT,2)  # src port
         udp += u.int2buf(sender[1],2) # dest port
         udp += [udplen >> 8, udplen & 0xff]  # length
         udp += [0x00, 0x00]  # checksum
         udp += data
 
         # destination address of the packet is CoAP client's IPv6 address (address of the mote)
-        dstIpv6Address = u.ipv6AddrString2Bytes(self.coapClient.ipAddress)
+        dstIpv6Address = u.ipv6AddrString2Bytes(moteAddress)
         assert len(dstIpv6Address)==16
         # source address of the packet is DAG root's IPV6 address
         # use the same prefix (link-local or global) as in the destination address
@@ -244,6 +322,58 @@ class coapServer(eventBusClient.eventBusClient):
             data          = ip
         )
 
+    # ==== forwarding
+
+    def _getForwarder(self, moteAddress):
+        '''
+        Returns the CoAP endpoint forwarding the messages of a mote, opened at
+        its address. Called with the state lock held.
+        '''
+        forwarder = self.forwarders.pop(moteAddress, None)
+        if forwarder is None:
+            forwarder = coap.coap(
+                ipAddress=moteAddress,
+                udpPort=d.DEFAULT_UDP_PORT,
+                testing=True,
+                receiveCallback=functools.partial(self._receiveFromCoAP, moteAddress),
+            )
+            if len(self.forwarders) >= self.MAX_FORWARDERS:
+                (_, oldest) = self.forwarders.popitem(last=False)
+                oldest.close()
+        self.forwarders[moteAddress] = forwarder
+        return forwarder
+
+    def _correlationKey(self, moteAddress, message):
+        '''
+        Returns the key matching a CoAP request with its response: its token,
+        or its message ID if it has no token. Returns None for an empty
+        message, such as the acknowledgment of a separate response.
+        '''
+        if len(message) < 4 or message[1] == 0x00:  # code 0.00, empty message
+            return None
+        tokenLength = message[0] & 0x0f
+        if tokenLength:
+            return (moteAddress, 'token', tuple(message[4:4 + tokenLength]))
+        return (moteAddress, 'mid', (message[2] << 8) | message[3])
+
+    def _dropTimedOut(self, now):
+        '''
+        Drops the requests which were not answered in time, then the oldest
+        ones until there is room for a new request. Called with the state
+        lock held.
+        '''
+        while self.pending:
+            (key, requestTime) = next(self.pending.iteritems())
+            if now - requestTime <= self.PENDING_TIMEOUT and len(self.pending) < self.MAX_PENDING:
+                break
+            del self.pending[key]
+            self.numTimedOut += 1
+
+    def _percentile(self, values, p):
+        if not values:
+            return None
+        return values[int(round(p / 100.0 * (len(values) - 1)))]
+
 # ==================== Implementation of CoAP join resource =====================
 class joinResource(coapResource.coapResource):
     def __init__(self):
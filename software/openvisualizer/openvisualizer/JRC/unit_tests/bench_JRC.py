@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+'''
+Benchmark of the joins forwarded by the JRC.
+
+Simulates the mesh: each mote is a CoAP client, which sends an OSCORE join
+request to the JRC. The requests are handed to the JRC as if received from
+the DAG root, and the IPv6 packets of the responses the JRC sends towards
+the mesh are handed back to the client of their destination mote. All the
+motes join at once, from their own thread, as in a network-wide rejoin.
+Reports the number of joins per second and the JRC statistics for several
+network sizes. Requires the coap and cbor packages. Run directly::
+
+    python bench_JRC.py
+'''
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # JRC/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import threading
+import time
+
+from pydispatch import dispatcher
+from coap       import coap,                    \
+                       coapDefines as d,        \
+                       coapOption as o,         \
+                       coapUtils as u,          \
+                       coapObjectSecurity as oscoap
+
+import openvisualizer.openvisualizer_utils as ovu
+import JRC
+
+#============================ defines =========================================
+
+NUM_MOTES      = [10,50,200]
+PREFIX         = [0xbb,0xbb,0x00,0x00,0x00,0x00,0x00,0x00]
+DAGROOT_EUI64  = [0x14,0x15,0x92,0xcc,0x00,0x00,0x00,0x01]
+MESH_PORT      = 6000 # clients of the motes are at MESH_PORT+n, not to collide with the JRC endpoints
+
+#============================ helpers =========================================
+
+def moteEui64(n):
+    return [0x14,0x15,0x92,0xcc,0x00,0x00,(n>>8)&0xff,n&0xff]
+
+class SimulatedMesh(object):
+    '''
+    Carries the UDP payloads between the clients of the motes and the JRC,
+    in place of the DAG root.
+    '''
+
+    def __init__(self,jrc):
+        self.jrc        = jrc
+        self.motes      = {}  # IPv6 address of a mote -> (address of its client, port of its client)
+        dispatcher.connect(self._fromMote, signal=(ovu.formatIPv6Addr(PREFIX+DAGROOT_EUI64),d.DEFAULT_UDP_PORT))
+        dispatcher.connect(self._toMesh,   signal='v6ToMesh')
+
+    def addMote(self,n,client):
+        self.motes[tuple(PREFIX+moteEui64(n))] = (client.ipAddress,client.udpPort)
+
+    def close(self):
+        dispatcher.disconnect(self._fromMote, signal=(ovu.formatIPv6Addr(PREFIX+DAGROOT_EUI64),d.DEFAULT_UDP_PORT))
+        dispatcher.disconnect(self._toMesh,   signal='v6ToMesh')
+
+    def _fromMote(self,signal,sender,data):
+        # as openLbr dispatches the UDP payload of a packet, with its source address
+        self.jrc.coapServer._receiveFromMesh(
+            sender = 'bench',
+            signal = signal,
+            data   = (u.ipv6AddrString2Bytes(sender[0]),data),
+        )
+
+    def _toMesh(self,signal,sender,data):
+        dst = tuple(data[24:40])
+        dispatcher.send(
+            sender = (ovu.formatIPv6Addr(PREFIX+DAGROOT_EUI64),d.DEFAULT_UDP_PORT),
+            signal = self.motes[dst],
+            data   = data[48:],
+        )
+
+def join(client,n,latencies):
+    eui64   = moteEui64(n)
+    context = oscoap.SecurityContext(
+        masterSecret  = JRC.contextHandler.MASTERSECRET,
+        senderID      = u.buf2str(eui64+[0x00]),
+        recipientID   = u.buf2str(eui64+[0x01]),
+        aeadAlgorithm = oscoap.AES_CCM_16_64_128(),
+    )
+    start = time.time()
+    client.GET(
+        'coap://[{0}]/j'.format(ovu.formatIPv6Addr(PREFIX+DAGROOT_EUI64)),
+        confirmable = True,
+        options     = [o.ObjectSecurity(context=context)],
+    )
+    latencies[n] = time.time()-start
+
+#============================ main ============================================
+
+def main():
+    logging.disable(logging.CRITICAL)
+
+    for numMotes in NUM_MOTES:
+
+        jrc  = JRC.JRC()
+        jrc.coapServer._registerDagRoot_notif(
+            sender = 'bench',
+            signal = 'registerDagRoot',
+            data   = {'prefix': PREFIX, 'host': DAGROOT_EUI64},
+        )
+        mesh = SimulatedMesh(jrc)
+
+        clients = []
+        for n in range(numMotes):
+            client = coap.coap(
+                ipAddress = ovu.formatIPv6Addr(PREFIX+moteEui64(n)),
+                udpPort   = MESH_PORT+n,
+                testing   = True,
+            )
+            mesh.addMote(n,client)
+            clients += [client]
+
+        latencies = {}
+        threads   = [
+            threading.Thread(target=join,args=(clients[n],n,latencies)) for n in range(numMotes)
+        ]
+        start = time.time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duration = time.time()-start
+
+        stats = jrc.getStats()
+        for (p,v) in stats['latency'].items():
+            if v is None:
+                stats['latency'][p] = float('nan')
+        print '{0:>4} motes: {1:>4} joined in {2:.2f}s, {3:.1f} joins/s, JRC latency p50 {4:.3f}s p90 {5:.3f}s p99 {6:.3f}s'.format(
+            numMotes,
+            len(latencies),
+            duration,
+            len(latencies)/duration,
+            stats['latency']['p50'],
+            stats['latency']['p90'],
+            stats['latency']['p99'],
+        )
+
+        for client in clients:
+            client.close()
+        mesh.close()
+        jrc.close()
+        jrc.coapServer.coapServer.close()
+        jrc.coapServer._unregisterDagRoot_notif(
+            sender = 'bench',
+            signal = 'unregisterDagRoot',
+            data   = {'prefix': PREFIX, 'host': DAGROOT_EUI64},
+        )
+
+if __name__=="__main__":
+    main()
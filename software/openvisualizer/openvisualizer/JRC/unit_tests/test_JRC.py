@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import logging.handlers
+import socket
+import threading
+import types
+
+import pytest
+
+#============================ stubs ===========================================
+
+# the JRC imports the coap and cbor packages at load time; when they are not
+# installed, stand-ins provide what the forwarding uses. The CoAP endpoints
+# themselves are always replaced by FakeCoap, see the server fixture.
+
+def _stubModule(name,**attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    if '.' in name:
+        (parent,child) = name.rsplit('.',1)
+        setattr(sys.modules[parent],child,module)
+    return module
+
+try:
+    import coap.coap
+except ImportError:
+    _stubModule('coap')
+    _stubModule('coap.coap',            coap=None)
+    _stubModule('coap.coapResource',    coapResource=type('coapResource',(object,),{}))
+    _stubModule('coap.coapDefines',
+        DEFAULT_UDP_PORT     = 5683,
+        METHOD_GET           = 'GET',
+        COAP_RC_2_05_CONTENT = 69,
+    )
+    _stubModule('coap.coapOption')
+    _stubModule('coap.coapUtils',
+        int2buf              = lambda val,length: [(val>>(8*i))&0xff for i in reversed(range(length))],
+        ipv6AddrString2Bytes = lambda addr: [ord(b) for b in socket.inet_pton(socket.AF_INET6,addr)],
+        str2buf              = lambda s: [ord(b) for b in s],
+        buf2str              = lambda buf: ''.join([chr(b) for b in buf]),
+    )
+    _stubModule('coap.coapObjectSecurity')
+
+try:
+    import cbor
+except ImportError:
+    _stubModule('cbor')
+
+from   openvisualizer.JRC      import JRC
+from   openvisualizer.eventBus import eventBusClient
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_JRC.log'
+
+import logging
+log = logging.getLogger('test_JRC')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_JRC',
+                   'JRC',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ defines =========================================
+
+PREFIX        = [0xbb,0xbb,0x00,0x00,0x00,0x00,0x00,0x00]
+DAGROOT       = [0x14,0x15,0x92,0xcc,0x00,0x00,0x00,0x01]
+COAP_PORT     = 5683
+MOTE_PORT     = 61616
+
+#============================ helpers =========================================
+
+class FakeCoap(object):
+    '''
+    Stands for a CoAP endpoint in testing mode; records what the JRC sends
+    through it.
+    '''
+
+    def __init__(self,ipAddress='',udpPort=COAP_PORT,testing=False,receiveCallback=None):
+        self.ipAddress       = ipAddress
+        self.udpPort         = udpPort
+        self.receiveCallback = receiveCallback
+        self.socketUdp       = self
+        self.sent            = []
+        self.closed          = False
+
+    def addResource(self,resource):
+        pass
+
+    def addSecurityContextHandler(self,handler):
+        pass
+
+    def sendUdp(self,destIp,destPort,msg):
+        self.sent += [msg]
+
+    def close(self):
+        self.closed = True
+
+class FakeResource(object):
+    networkKeyIndex = [0x01]
+    networkKey      = [0x00]*16
+
+class Clock(object):
+    '''
+    Replaces the time module of the JRC.
+    '''
+
+    def __init__(self,now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+class RecordingClient(eventBusClient.eventBusClient):
+
+    def __init__(self):
+        self.received  = []
+        eventBusClient.eventBusClient.__init__(
+            self,
+            name             = 'RecordingClient',
+            registrations    = [
+                {
+                    'sender'   : self.WILDCARD,
+                    'signal'   : 'v6ToMesh',
+                    'callback' : self._record,
+                },
+            ]
+        )
+
+    def _record(self,sender,signal,data):
+        self.received += [data]
+
+def mote(n):
+    return PREFIX+[0x14,0x15,0x92,0xcc,0x00,0x00,0x00,n]
+
+def request(mid,token=[]):
+    # confirmable GET
+    return [0x40|len(token),0x01,mid>>8,mid&0xff]+token
+
+def response(mid,token=[]):
+    # piggybacked 2.05 Content
+    return [0x60|len(token),0x45,mid>>8,mid&0xff]+token+[0xff,0x2a]
+
+def emptyAck(mid):
+    return [0x60,0x00,mid>>8,mid&0xff]
+
+def fromMesh(server,n,msg):
+    server._receiveFromMesh(
+        sender = 'test',
+        signal = (tuple(PREFIX+DAGROOT),JRC.coapServer.PROTO_UDP,COAP_PORT),
+        data   = (mote(n),msg),
+    )
+
+def forwarderOf(server,n):
+    return server.forwarders[JRC.openvisualizer.openvisualizer_utils.formatIPv6Addr(mote(n))]
+
+#============================ fixtures ========================================
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(JRC,'time',clock)
+    return clock
+
+@pytest.fixture
+def server(monkeypatch,clock):
+    monkeypatch.setattr(JRC.coap,'coap',FakeCoap)
+    server = JRC.coapServer(FakeResource(),None)
+    server.dagRootEui64 = DAGROOT
+    return server
+
+#============================ tests ===========================================
+
+def test_correlationKey(server):
+    addr = 'bbbb::1'
+
+    assert server._correlationKey(addr,request(0x1234,[0xab,0xcd])) == (addr,'token',(0xab,0xcd))
+    assert server._correlationKey(addr,request(0x1234))             == (addr,'mid',0x1234)
+    assert server._correlationKey(addr,emptyAck(0x1234))            is None
+    assert server._correlationKey(addr,[0x40,0x01])                 is None
+
+    # the response carries the token of the request, its own message ID
+    assert server._correlationKey(addr,response(0x9999,[0xab,0xcd])) == server._correlationKey(addr,request(0x1234,[0xab,0xcd]))
+
+def test_emptyAckIgnored(server):
+    fromMesh(server,2,request(0x0001,[0x01]))
+    fromMesh(server,2,emptyAck(0x0002))
+    assert len(server.pending) == 1
+
+    # the empty ACK of a separate response does not answer the request
+    forwarderOf(server,2).receiveCallback(0,('bbbb::1',MOTE_PORT),emptyAck(0x0001))
+    assert len(server.pending)  == 1
+    assert server.numResponses  == 0
+
+    # all the messages are forwarded to the server
+    assert forwarderOf(server,2).sent == [request(0x0001,[0x01]),emptyAck(0x0002)]
+
+def test_retransmissionKeepsRequestTime(server,clock):
+    fromMesh(server,2,request(0x0001,[0x01]))
+    clock.now += 2
+    fromMesh(server,2,request(0x0001,[0x01]))
+    assert len(server.pending) == 1
+
+    clock.now += 3
+    forwarderOf(server,2).receiveCallback(0,('bbbb::1',MOTE_PORT),response(0x0001,[0x01]))
+
+    assert list(server.latencies) == [5]
+    assert not server.pending
+    assert server.getStats()['numRequests']  == 2
+    assert server.getStats()['numResponses'] == 1
+
+def test_maxPending(server,clock):
+    server.MAX_PENDING = 3
+
+    for mid in range(5):
+        fromMesh(server,2,request(mid))
+    assert len(server.pending)  == 3
+    assert server.numTimedOut   == 2
+    assert [key[2] for key in server.pending] == [2,3,4]
+
+    # once full, the requests which timed out are dropped first
+    clock.now += server.PENDING_TIMEOUT+1
+    fromMesh(server,2,request(5))
+    assert [key[2] for key in server.pending] == [5]
+    assert server.numTimedOut   == 5
+
+def test_maxForwarders(server):
+    server.MAX_FORWARDERS = 2
+
+    fromMesh(server,2,request(0x0001))
+    fromMesh(server,3,request(0x0001))
+    forwarder2 = forwarderOf(server,2)
+    forwarder3 = forwarderOf(server,3)
+
+    # mote 2 was used last, mote 3's endpoint is closed
+    fromMesh(server,2,request(0x0002))
+    fromMesh(server,4,request(0x0001))
+    assert len(server.forwarders) == 2
+    assert forwarder3.closed
+    assert not forwarder2.closed
+    assert forwarderOf(server,2) is forwarder2
+
+    server.close()
+    assert forwarder2.closed
+    assert not server.forwarders
+
+def test_concurrentResponses(server):
+    recorder = RecordingClient()
+    motes    = range(2,12)
+
+    # all the motes use the same token
+    for n in motes:
+        fromMesh(server,n,request(0x0001,[0x01]))
+    assert len(server.pending) == len(motes)
+
+    # the server answers from several threads at once, in reverse order
+    start   = threading.Event()
+    def answer(n):
+        start.wait()
+        forwarderOf(server,n).receiveCallback(0,('bbbb::1',MOTE_PORT),response(0x0100+n,[0x01]))
+    threads = [threading.Thread(target=answer,args=(n,)) for n in reversed(motes)]
+    for t in threads:
+        t.start()
+    start.set()
+    for t in threads:
+        t.join()
+
+    assert sorted([tuple(ip[24:40]) for ip in recorder.received]) == sorted([tuple(mote(n)) for n in motes])
+    for ip in recorder.received:
+        n = ip[39]
+        assert ip[8:24]  == PREFIX+DAGROOT                    # source
+        assert ip[42:44] == [MOTE_PORT>>8,MOTE_PORT&0xff]     # destination port
+        assert ip[48:]   == response(0x0100+n,[0x01])
+    assert not server.pending
+    assert server.numResponses == len(motes)
@@ -23,18 +23,38 @@ from openvisualizer.eventBus import eventBusClient
 
 
 class SourceRoute(eventBusClient.eventBusClient):
+    '''
+    Computes source routes from the parents announced in DAOs.
+    
+    Routes are cached per destination, as tuples of EUI64 tuples. A cached
+    route is dropped when the topology announces, through the
+    'parentsChanged' signal, that one of its hops changed parents or timed
+    out.
+    '''
        
     def __init__(self):
         
         # local variables
         self.dataLock        = threading.Lock()
         self.parents         = {}
+        self.routes          = {} # destination -> route, both as tuples
+        self.routesThrough   = {} # node -> destinations routed through it
+        self.numHits         = 0
+        self.numMisses       = 0
+        self.numInvalidated  = 0
+        self.numLoops        = 0
         
         # initialize parent class
         eventBusClient.eventBusClient.__init__(
             self,
             name             = 'SourceRoute',
-            registrations =  []
+            registrations =  [
+                {
+                    'sender'   : self.WILDCARD,
+                    'signal'   : 'parentsChanged',
+                    'callback' : self._parentsChanged_notif,
+                },
+            ]
         )
     
     #======================== public ==========================================
@@ -49,45 +69,101 @@ class SourceRoute(eventBusClient.eventBusClient):
             destination to source.
         '''
         
-        sourceRoute = []
+        destination = tuple(destAddr)
+        
         with self.dataLock:
-            try:
-                parents=self._dispatchAndGetResult(signal='getParents',data=None)
-                self._getSourceRoute_internal(destAddr,sourceRoute,parents)
-            except Exception as err:
-                log.error(err)
-                raise
+            route = self.routes.get(destination)
+            if route is None:
+                self.numMisses += 1
+                try:
+                    parents=self._dispatchAndGetResult(signal='getParents',data=None)
+                    route = self._getSourceRoute_internal(destination,parents)
+                except Exception as err:
+                    log.error(err)
+                    raise
+                self._cacheRoute(destination,route)
+            else:
+                self.numHits   += 1
         
-        return sourceRoute
+        return [list(hop) for hop in route]
+    
+    def getStats(self):
+        '''
+        Returns the counters of the route cache.
+        '''
+        with self.dataLock:
+            return {
+                'name':           self.name,
+                'size':           len(self.routes),
+                'numHits':        self.numHits,
+                'numMisses':      self.numMisses,
+                'numInvalidated': self.numInvalidated,
+                'numLoops':       self.numLoops,
+            }
     
     #======================== private =========================================
     
-    def _getSourceRoute_internal(self,destAddr,sourceRoute,parents):
-        
-        if not destAddr:
-            # no more parents
-            return
+    def _parentsChanged_notif(self,sender,signal,data):
+        '''
+        Drops the cached routes through the nodes whose parents changed.
+        '''
+        with self.dataLock:
+            for node in data:
+                for destination in self.routesThrough.pop(tuple(node),()):
+                    self._uncacheRoute(destination)
+    
+    def _getSourceRoute_internal(self,destination,parents):
         
-        if not parents.get(tuple(destAddr)):
+        if not parents.get(destination):
             # this node does not have a list of parents
-            return
-        
-        # first time add destination address
-        if destAddr not in sourceRoute:
-            sourceRoute     += [destAddr]
+            return ()
         
-        # pick a parent
-        parent               = parents.get(tuple(destAddr))[0]
-        
-        # avoid loops
-        if parent not in sourceRoute:
+        sourceRoute          = [destination]
+        visited              = set(sourceRoute)
+        node                 = destination
+        while True:
+            
+            # pick a parent
+            parent           = tuple(parents[node][0])
+            
+            # avoid loops
+            if parent in visited:
+                self.numLoops += 1
+                log.warning('loop in source route to {0} at {1}'.format(
+                        u.formatAddr(destination),
+                        u.formatAddr(parent),
+                    )
+                )
+                break
+            
             sourceRoute     += [parent]
+            visited.add(parent)
             
-            # add non empty parents recursively
-            nextparent       = self._getSourceRoute_internal(parent,sourceRoute,parents)
+            if not parents.get(parent):
+                # no more parents
+                break
             
-            if nextparent:
-                sourceRoute += [nextparent]
+            node             = parent
+        
+        return tuple(sourceRoute)
     
     #======================== helpers =========================================
-    
\ No newline at end of file
+    
+    def _cacheRoute(self,destination,route):
+        self.routes[destination] = route
+        # the destination itself is indexed when it has no route yet, so the
+        # route is recomputed once it announces parents
+        for node in set(route+(destination,)):
+            self.routesThrough.setdefault(node,set()).add(destination)
+    
+    def _uncacheRoute(self,destination):
+        route = self.routes.pop(destination,None)
+        if route is None:
+            return
+        self.numInvalidated += 1
+        for node in set(route+(destination,)):
+            destinations = self.routesThrough.get(node)
+            if destinations is not None:
+                destinations.discard(destination)
+                if not destinations:
+                    del self.routesThrough[node]
@@ -76,22 +76,45 @@ class topology(eventBusClient.eventBusClient):
         return states, edges
         
     def updateParents(self,sender,signal,data):
-        ''' inserts parent information into the parents dictionary '''
+        '''
+        inserts parent information into the parents dictionary
+        
+        The nodes whose parents changed, or which timed out, are announced
+        with a 'parentsChanged' signal, so source routes through them can be
+        recomputed.
+        '''
         with self.dataLock:
             #data[0] == source address, data[1] == list of parents
+            changedNodes = []
+            if self.parents.get(data[0])!=data[1]:
+                changedNodes += [data[0]]
             self.parents.update({data[0]:data[1]})
             self.parentsLastSeen.update({data[0]: time.time()})
 
-        self._clearNodeTimeout()
+        changedNodes += self._clearNodeTimeout()
+        
+        if changedNodes:
+            self.dispatch(
+                signal      = 'parentsChanged',
+                data        = changedNodes,
+            )
 
     def _clearNodeTimeout(self):
+        '''
+        removes the nodes not heard from for NODE_TIMEOUT_THRESHOLD seconds
+        
+        :returns: the list of removed nodes.
+        '''
         threshold = time.time() - self.NODE_TIMEOUT_THRESHOLD
+        removedNodes = []
         with self.dataLock:
             for node in self.parentsLastSeen.keys():
                 if self.parentsLastSeen[node] < threshold:
                     if node in self.parents:
                         del self.parents[node]
                     del self.parentsLastSeen[node]
+                    removedNodes += [node]
+        return removedNodes
     
     #======================== private =========================================
     
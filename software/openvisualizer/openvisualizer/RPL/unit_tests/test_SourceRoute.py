@@ -101,3 +101,113 @@ def test_sourceRoute(expectedSourceRoute):
         log.debug(output)
     
     assert calculatedRoute==expectedRoute
+
+def test_sourceRouteCache():
+    '''
+    This tests that routes are cached, and recomputed when a hop changes
+    parents.
+    
+    MOTE_A <- MOTE_B <- MOTE_C <- MOTE_D, then MOTE_A <- MOTE_C
+    '''
+    
+    sourceRoute = SourceRoute.SourceRoute()
+    topo        = topology.topology()
+    
+    for (node,parent) in [(MOTE_B,MOTE_A),(MOTE_C,MOTE_B),(MOTE_D,MOTE_C)]:
+        sourceRoute.dispatch(
+            signal      = 'updateParents',
+            data        =  (tuple(node),[parent]),
+        )
+    
+    assert sourceRoute.getSourceRoute(MOTE_D)==[MOTE_D,MOTE_C,MOTE_B,MOTE_A]
+    assert sourceRoute.getSourceRoute(MOTE_D)==[MOTE_D,MOTE_C,MOTE_B,MOTE_A]
+    assert sourceRoute.getSourceRoute(MOTE_B)==[MOTE_B,MOTE_A]
+    stats = sourceRoute.getStats()
+    assert stats['numMisses']==2
+    assert stats['numHits']==1
+    
+    # the returned route can be modified by the caller
+    sourceRoute.getSourceRoute(MOTE_D).pop()
+    assert sourceRoute.getSourceRoute(MOTE_D)==[MOTE_D,MOTE_C,MOTE_B,MOTE_A]
+    
+    # the same parents do not invalidate the cache
+    sourceRoute.dispatch(
+        signal          = 'updateParents',
+        data            =  (tuple(MOTE_C),[MOTE_B]),
+    )
+    assert sourceRoute.getStats()['numInvalidated']==0
+    
+    # a new parent for MOTE_C only invalidates the routes through it
+    sourceRoute.dispatch(
+        signal          = 'updateParents',
+        data            =  (tuple(MOTE_C),[MOTE_A]),
+    )
+    stats = sourceRoute.getStats()
+    assert stats['numInvalidated']==1
+    assert stats['size']==1
+    assert sourceRoute.getSourceRoute(MOTE_D)==[MOTE_D,MOTE_C,MOTE_A]
+    assert sourceRoute.getSourceRoute(MOTE_B)==[MOTE_B,MOTE_A]
+
+def test_sourceRouteUnknownDestination():
+    '''
+    This tests that a destination without parents gets a route once it
+    announces some.
+    '''
+    
+    sourceRoute = SourceRoute.SourceRoute()
+    topo        = topology.topology()
+    mote        = [0xee]*8
+    
+    assert sourceRoute.getSourceRoute(mote)==[]
+    
+    sourceRoute.dispatch(
+        signal          = 'updateParents',
+        data            =  (tuple(mote),[MOTE_A]),
+    )
+    
+    assert sourceRoute.getSourceRoute(mote)==[mote,MOTE_A]
+
+def test_sourceRouteTimeout(monkeypatch):
+    '''
+    This tests that the routes through a node which timed out are dropped.
+    '''
+    
+    sourceRoute = SourceRoute.SourceRoute()
+    topo        = topology.topology()
+    
+    for (node,parent) in [(MOTE_B,MOTE_A),(MOTE_C,MOTE_B),(MOTE_D,MOTE_C)]:
+        sourceRoute.dispatch(
+            signal      = 'updateParents',
+            data        =  (tuple(node),[parent]),
+        )
+    assert sourceRoute.getSourceRoute(MOTE_D)==[MOTE_D,MOTE_C,MOTE_B,MOTE_A]
+    
+    # all nodes but MOTE_B time out
+    now = topology.time.time()
+    monkeypatch.setattr(topology.time,'time',lambda: now+topo.NODE_TIMEOUT_THRESHOLD+1)
+    sourceRoute.dispatch(
+        signal          = 'updateParents',
+        data            =  (tuple(MOTE_B),[MOTE_A]),
+    )
+    
+    assert sourceRoute.getSourceRoute(MOTE_D)==[]
+    assert sourceRoute.getSourceRoute(MOTE_B)==[MOTE_B,MOTE_A]
+
+def test_sourceRouteLoop():
+    '''
+    This tests the following topology, which contains a loop
+    
+    MOTE_B <- MOTE_C <- MOTE_D <- MOTE_B
+    '''
+    
+    sourceRoute = SourceRoute.SourceRoute()
+    topo        = topology.topology()
+    
+    for (node,parent) in [(MOTE_B,MOTE_D),(MOTE_C,MOTE_B),(MOTE_D,MOTE_C)]:
+        sourceRoute.dispatch(
+            signal      = 'updateParents',
+            data        =  (tuple(node),[parent]),
+        )
+    
+    assert sourceRoute.getSourceRoute(MOTE_D)==[MOTE_D,MOTE_C,MOTE_B]
+    assert sourceRoute.getStats()['numLoops']==1
@@ -231,6 +231,7 @@ class MoteHandler(threading.Thread):
     
     def setLocation(self,lat,lon):
         self.location = (lat,lon)
+        self.engine.propagation.indicateMoteMoved(self.id)
     
     def handleEvent(self,functionToCall):
         
@@ -9,12 +9,192 @@ import logging
 import threading
 import copy
 import random
-from math import radians, cos, sin, asin, sqrt, log10
+import array
+from math import radians, degrees, cos, sin, asin, sqrt, log10, floor, ceil
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from openvisualizer.eventBus      import eventBusClient
 
 import SimEngine
 
+class LinkTable(object):
+    '''
+    The links of a mote, as parallel arrays of neighbor IDs, PDRs and
+    received powers.
+    '''
+    
+    DEFAULT_RSSI_dBm              = -50.0
+    
+    def __init__(self):
+        self.moteIds              = array.array('l')
+        self.pdrs                 = array.array('d')
+        self.rssis                = array.array('d')
+        self.powers               = array.array('d')    # rssis, in mW
+    
+    def __len__(self):
+        return len(self.moteIds)
+    
+    def __contains__(self,moteId):
+        return moteId in self.moteIds
+    
+    def append(self,moteId,pdr,rssi=None):
+        '''
+        Add a link to a neighbor which is not in the table yet.
+        '''
+        if rssi is None:
+            rssi = self.DEFAULT_RSSI_dBm
+        self.moteIds.append(moteId)
+        self.pdrs.append(pdr)
+        self.rssis.append(rssi)
+        self.powers.append(10**(rssi/10))
+    
+    def set(self,moteId,pdr,rssi=None):
+        '''
+        Add or update a link, keeping its received power if rssi is None.
+        '''
+        try:
+            i = self.moteIds.index(moteId)
+        except ValueError:
+            self.append(moteId,pdr,rssi)
+        else:
+            self.pdrs[i] = pdr
+            if rssi is not None:
+                self.rssis[i] = rssi
+                self.powers[i] = 10**(rssi/10)
+    
+    def get(self,moteId):
+        try:
+            return self.pdrs[self.moteIds.index(moteId)]
+        except ValueError:
+            return None
+    
+    def delete(self,moteId):
+        '''
+        Remove the link to a neighbor, raises ValueError if there is none.
+        '''
+        i = self.moteIds.index(moteId)
+        del self.moteIds[i]
+        del self.pdrs[i]
+        del self.rssis[i]
+        del self.powers[i]
+    
+    def items(self):
+        return zip(self.moteIds,self.pdrs)
+    
+    def itemsWithPower(self):
+        return zip(self.moteIds,self.pdrs,self.rssis,self.powers)
+
+class Reception(object):
+    '''
+    A frame being received, which collides if, at any time, the power of
+    the other frames on the air drowns it.
+    '''
+    
+    __slots__ = ['fromMote','toMote','channel','power_mW','collided']
+    
+    def __init__(self,fromMote,toMote,channel,power_mW):
+        self.fromMote             = fromMote
+        self.toMote               = toMote
+        self.channel              = channel
+        self.power_mW             = power_mW
+        self.collided             = False
+    
+    def checkSinr(self,totalPower_mW):
+        '''
+        Mark the frame as collided if its SINR is below the threshold, given
+        the total power on the air at the receiver, this frame included.
+        '''
+        interference = Propagation.NOISE_FLOOR_mW+totalPower_mW-self.power_mW
+        if self.power_mW<Propagation.SINR_THRESHOLD*interference:
+            self.collided         = True
+
+class MarkovLinks(object):
+    '''
+    The 2nd order Markov error model of the links, as parallel arrays
+    indexed by link ID.
+    
+    The state of a link is 2*last2+last, where last and last2 are the
+    outcomes of its last two transmissions, 0 for a success and 1 for a
+    failure, and selects one of its 4 delivery probabilities, p00_0, p01_0,
+    p10_0 and p11_0. Random numbers are drawn BLOCK_SIZE at a time, with
+    NumPy if available, from a generator of the model's own which, unless
+    seeded, is seeded from the random module at the first draw.
+    '''
+    
+    BLOCK_SIZE                    = 4096
+    
+    def __init__(self):
+        self.linkIds              = {}    # (fromMote,toMote) -> link ID
+        self.motes                = []    # link ID -> (fromMote,toMote)
+        self.probs                = array.array('d')    # 4 per link, by state
+        self.states               = array.array('B')
+        self.numTx                = array.array('l')
+        self.numGood              = array.array('l')
+        self.rng                  = None
+        self.randoms              = []
+        self.nextRandom           = 0
+    
+    def seed(self,seed):
+        if numpy:
+            self.rng              = numpy.random.RandomState(seed)
+        else:
+            self.rng              = random.Random(seed)
+        self.randoms              = []
+        self.nextRandom           = 0
+    
+    def set(self,fromMote,toMote,p00_0,p01_0,p10_0,p11_0):
+        '''
+        Add or update a directed link, a new link starts after 2 successes.
+        '''
+        linkId = self.linkIds.get((fromMote,toMote))
+        if linkId is None:
+            linkId = len(self.motes)
+            self.linkIds[(fromMote,toMote)] = linkId
+            self.motes.append((fromMote,toMote))
+            self.probs.extend([p00_0,p01_0,p10_0,p11_0])
+            self.states.append(0)
+            self.numTx.append(0)
+            self.numGood.append(0)
+        else:
+            self.probs[4*linkId:4*linkId+4] = array.array('d',[p00_0,p01_0,p10_0,p11_0])
+    
+    def transmit(self,linkId):
+        '''
+        Draw whether a frame sent over a link is delivered, and update the
+        state and statistics of the link.
+        '''
+        if self.nextRandom==len(self.randoms):
+            self._drawBlock()
+        r                         = self.randoms[self.nextRandom]
+        self.nextRandom          += 1
+        
+        state                     = self.states[linkId]
+        self.numTx[linkId]       += 1
+        if r>self.probs[4*linkId+state]:
+            self.states[linkId]   = ((state&1)<<1)|1
+            return False
+        else:
+            self.states[linkId]   = (state&1)<<1
+            self.numGood[linkId] += 1
+            return True
+    
+    def items(self):
+        return zip(self.motes,self.numTx,self.numGood)
+    
+    def _drawBlock(self):
+        if self.rng is None:
+            self.seed(random.getrandbits(32))
+        if numpy:
+            self.randoms          = self.rng.random_sample(self.BLOCK_SIZE).tolist()
+        else:
+            rand                  = self.rng.random
+            self.randoms          = [rand() for _ in xrange(self.BLOCK_SIZE)]
+        self.nextRandom           = 0
+
 class Propagation(eventBusClient.eventBusClient):
     '''
     The propagation model of the engine.
@@ -23,6 +203,28 @@ class Propagation(eventBusClient.eventBusClient):
     SIGNAL_WIRELESSTXSTART        = 'wirelessTxStart'
     SIGNAL_WIRELESSTXEND          = 'wirelessTxEnd'
     
+    EARTH_RADIUS_km               = 6367.0
+    FREQUENCY_GHz                 =    2.4
+    TX_POWER_dBm                  =    0.0
+    PISTER_HACK_LOSS              =   40.0
+    SENSITIVITY_dBm               = -101.0
+    GREY_AREA_dB                  =   15.0
+    NOISE_FLOOR_dBm               = -105.0
+    SINR_THRESHOLD_dB             =    3.0
+    
+    # Friis loss at 1km, in dB
+    FRIIS_LOSS_1km_dB             = 20*log10(FREQUENCY_GHz) + 92.45
+    
+    # beyond this distance, even without Pister-hack loss, Prx<SENSITIVITY_dBm
+    CUTOFF_RADIUS_km              = 10**((TX_POWER_dBm-SENSITIVITY_dBm-FRIIS_LOSS_1km_dB)/20)
+    
+    # motes are indexed in a grid of cells CUTOFF_RADIUS_km high, in degrees
+    GRID_CELL_deg                 = degrees(CUTOFF_RADIUS_km/EARTH_RADIUS_km)
+    GRID_NUM_COLUMNS              = int(ceil(360/GRID_CELL_deg))
+    
+    NOISE_FLOOR_mW                = 10**(NOISE_FLOOR_dBm/10)
+    SINR_THRESHOLD                = 10**(SINR_THRESHOLD_dB/10)
+    
     def __init__(self,simTopology):
         
         # store params
@@ -31,12 +233,17 @@ class Propagation(eventBusClient.eventBusClient):
         
         # local variables
         self.dataLock             = threading.Lock()
-        self.connections          = {}
-        self.pendingTxEnd         = []
+        self.connections          = {}    # moteId -> LinkTable
+        self.grid                 = {}    # (row,column) -> [moteId]
+        self.gridCells            = {}    # moteId -> (row,column)
+        self.onAir                = {}    # fromMote -> (channel,[(toMote,power_mW)])
+        self.rxPower              = {}    # (toMote,channel) -> total power on the air, mW
+        self.receptions           = {}    # toMote -> {fromMote: Reception}
+        self.pendingTxEnd         = {}    # fromMote -> [Reception]
+        self.collisions           = {}    # (fromMote,toMote) -> number of collided frames
         self.errModel             = 'standard'    # tested by YYS 2016/8/30
         #self.errModel             = ''
-        self.links                = {}    # tested by YYS 2016/8/30
-        self.txHistory            = {}    # tested by YYS 2016/8/30          
+        self.markov               = MarkovLinks()
         self.txTotal              = 0    # tested by YYS 2016/8/31
         self.txGood               = 0    # tested by YYS 2016/8/31
         
@@ -67,215 +274,341 @@ class Propagation(eventBusClient.eventBusClient):
         
     #======================== public ==========================================
     
-    def createConnection(self,fromMote,toMote):
-  
-        
-        FREQUENCY_GHz        =    2.4
-        TX_POWER_dBm         =    0.0
-        PISTER_HACK_LOSS     =   40.0
-        SENSITIVITY_dBm      = -101.0
-        GREY_AREA_dB         =   15.0
+    def indicateNewMote(self,moteId):
+        '''
+        Index a new mote, and create its connections to the motes in range.
+        '''
         
         with self.dataLock:
+            self._indexMote(moteId)
             
             if not self.simTopology:
-                
-                #===== Pister-hack model
-                
-                # retrieve position
-                mhFrom            = self.engine.getMoteHandlerById(fromMote)
-                (latFrom,lonFrom) = mhFrom.getLocation()
-                mhTo              = self.engine.getMoteHandlerById(toMote)
-                (latTo,lonTo)     = mhTo.getLocation()
-    
-                # compute distance
-                lonFrom, latFrom, lonTo, latTo = map(radians, [lonFrom, latFrom, lonTo, latTo])
-                dlon             = lonTo - lonFrom 
-                dlat             = latTo - latFrom 
-                a                = sin(dlat/2)**2 + cos(latFrom) * cos(latTo) * sin(dlon/2)**2
-                c                = 2 * asin(sqrt(a)) 
-                d_km                = 6367 * c
-                
-                # compute reception power (first Friis, then apply Pister-hack)
-                Prx              = TX_POWER_dBm - (20*log10(d_km) + 20*log10(FREQUENCY_GHz) + 92.45)
-                Prx             -= PISTER_HACK_LOSS*random.random()
-               
-                #turn into PDR
-                if   Prx<SENSITIVITY_dBm:
-                    pdr          = 0.0
-                elif Prx>SENSITIVITY_dBm+GREY_AREA_dB:
-                    pdr          = 1.0
-                else:
-                    pdr          = (Prx-SENSITIVITY_dBm)/GREY_AREA_dB
-
+                candidates = self._motesAround(moteId)
             elif self.simTopology=='linear':
-                
-                # linear network
-                if fromMote==toMote+1:
-                    pdr          = 1.0
-                else:
-                    pdr          = 0.0
-            
-            elif self.simTopology=='fully-meshed':
-                
-                pdr          = 1.0
-            
+                candidates = [m for m in [moteId-1] if m in self.gridCells]
             else:
-                
-                raise NotImplementedError('unsupported simTopology={0}'.format(self.simTopology))
-            
-            #==== create, update or delete connection
+                candidates = [m for m in self.gridCells if m!=moteId]
             
-            if pdr:
-                if fromMote not in self.connections:
-                    self.connections[fromMote] = {}
-                self.connections[fromMote][toMote] = pdr
-                
-                if toMote not in self.connections:
-                    self.connections[toMote] = {}
-                self.connections[toMote][fromMote] = pdr
-            else:
-                self.deleteConnection(toMote,fromMote)
+            # the new mote is in no link table yet, no need to look it up
+            for toMote in sorted(candidates):
+                (pdr,rssi) = self._computeLink(moteId,toMote)
+                if pdr:
+                    self.connections.setdefault(moteId,LinkTable()).append(toMote,pdr,rssi)
+                    self.connections.setdefault(toMote,LinkTable()).append(moteId,pdr,rssi)
+    
+    def indicateMoteMoved(self,moteId):
+        '''
+        Re-index a mote after its location changed.
+        
+        The existing connections are kept as they are.
+        '''
+        
+        with self.dataLock:
+            if moteId in self.gridCells:
+                self._unindexMote(moteId)
+                self._indexMote(moteId)
+    
+    def createConnection(self,fromMote,toMote):
+        
+        with self.dataLock:
+            self._createConnection(fromMote,toMote)
     
     def retrieveConnections(self):
         
-        retrievedConnections = []
         returnVal            = []
         with self.dataLock:
             
-            for fromMote in self.connections:
-                for toMote in self.connections[fromMote]:
-                    if (toMote,fromMote) not in retrievedConnections:
+            # each connection is listed once, from its lowest mote ID
+            for (fromMote,links) in self.connections.items():
+                for (toMote,pdr) in links.items():
+                    if fromMote<toMote:
                         returnVal += [
                             {
                                 'fromMote': fromMote,
                                 'toMote':   toMote,
-                                'pdr':      self.connections[fromMote][toMote],
+                                'pdr':      pdr,
                             }
                         ]
-                        retrievedConnections += [(fromMote,toMote)]
         
         return returnVal
     
+    def retrieveCollisions(self):
+        '''
+        Return the number of frames received with a failed CRC because of
+        interference, per link.
+        '''
+        
+        with self.dataLock:
+            return [
+                {
+                    'fromMote':   fromMote,
+                    'toMote':     toMote,
+                    'collisions': n,
+                } for ((fromMote,toMote),n) in self.collisions.items()
+            ]
+    
+    def retrieveLinkStats(self):
+        '''
+        Return the number of frames sent and delivered over each link of the
+        Markov error model.
+        '''
+        
+        with self.dataLock:
+            return [
+                {
+                    'fromMote':   fromMote,
+                    'toMote':     toMote,
+                    'numTx':      numTx,
+                    'numGood':    numGood,
+                } for ((fromMote,toMote),numTx,numGood) in self.markov.items()
+            ]
+    
+    def setSeed(self,seed):
+        '''
+        Seed the random number generator of the Markov error model.
+        '''
+        
+        with self.dataLock:
+            self.markov.seed(seed)
+    
     def updateConnection(self,fromMote,toMote,pdr):
         
         with self.dataLock:
-            self.connections[fromMote][toMote] = pdr
-            self.connections[toMote][fromMote] = pdr
+            self.connections.setdefault(fromMote,LinkTable()).set(toMote,pdr)
+            self.connections.setdefault(toMote,LinkTable()).set(fromMote,pdr)
     
     def deleteConnection(self,fromMote,toMote):
         
         with self.dataLock:
-            
-            try:
-                del self.connections[fromMote][toMote]
-                if not self.connections[fromMote]:
-                    del self.connections[fromMote]
-                
-                del self.connections[toMote][fromMote]
-                if not self.connections[toMote]:
-                    del self.connections[toMote]
-            except KeyError:
-                pass # did not exist
+            self._deleteConnection(fromMote,toMote)
     
     # tested by YYS 2016/8/30
     def createLink(self,fromMote,toMote,p00_0,p01_0,p10_0,p11_0):  
         
         with self.dataLock:       
-           
-            if fromMote not in self.links:    # dict
-                self.links[fromMote] = {}
-            if toMote not in self.links[fromMote]:    # dict
-                self.links[fromMote][toMote] = {}
-            self.links[fromMote][toMote]['p00_0'] = p00_0
-            self.links[fromMote][toMote]['p01_0'] = p01_0
-            self.links[fromMote][toMote]['p10_0'] = p10_0
-            self.links[fromMote][toMote]['p11_0'] = p11_0
-            
-            if toMote not in self.links:    # dict
-                self.links[toMote] = {}
-            if fromMote not in self.links[toMote]:    # dict
-                self.links[toMote][fromMote] = {}
-            self.links[toMote][fromMote]['p00_0'] = p00_0
-            self.links[toMote][fromMote]['p01_0'] = p01_0
-            self.links[toMote][fromMote]['p10_0'] = p10_0
-            self.links[toMote][fromMote]['p11_0'] = p11_0
-            
-            #if fromMote not in self.txHistory:    # dict
-            #    self.txHistory[fromMote] = {}
-            #if toMote not in self.txHistory[fromMote]:    # dict
-            #    self.txHistory[fromMote][toMote] = {}
-            #self.txHistory[fromMote][toMote]['last2'] = 0    # last last tx is success. 0:good
-            #self.txHistory[fromMote][toMote]['last'] = 0     # last tx is success. 0:good
-            
-            #if toMote not in self.txHistory:    # dict
-            #    self.txHistory[toMote] = {}
-            #if fromMote not in self.txHistory[toMote]:    # dict
-            #    self.txHistory[toMote][fromMote] = {}
-            #self.txHistory[toMote][fromMote]['last2'] = 0    # last last tx is success. 0:good
-            #self.txHistory[toMote][fromMote]['last'] = 0     # last tx is success. 0:good
-                
+            self.markov.set(fromMote,toMote,p00_0,p01_0,p10_0,p11_0)
+            self.markov.set(toMote,fromMote,p00_0,p01_0,p10_0,p11_0)
+    
     #======================== indication from eventBus ========================
     
     def _indicateTxStart(self,sender,signal,data):
         
         (fromMote,packet,channel) = data
         
-        if fromMote in self.connections:
-            for (toMote,pdr) in self.connections[fromMote].items():
-                if self.errModel == 'markov2':
-                    if self.txHistory[fromMote][toMote]['last2'] == 0:
-                        if self.txHistory[fromMote][toMote]['last'] == 0:
-                            pdr = self.links[fromMote][toMote]['p00_0']
-                        else:
-                            pdr = self.links[fromMote][toMote]['p01_0']
-                    else:
-                        if self.txHistory[fromMote][toMote]['last'] == 0:
-                            pdr = self.links[fromMote][toMote]['p10_0']
-                        else:
-                            pdr = self.links[fromMote][toMote]['p11_0']
-                            
-                    self.txHistory[fromMote][toMote]['last2'] = self.txHistory[fromMote][toMote]['last']
-                    self.txTotal += 1
-                    if random.random()>pdr:    # tx failed                        
-                        self.txHistory[fromMote][toMote]['last'] = 1    # 1:bad
-                    else:
-                        self.txHistory[fromMote][toMote]['last'] = 0    # 0:good
-                        self.txGood += 1
-                        
-                        # indicate start of transmission
-                        mh = self.engine.getMoteHandlerById(toMote)
-                        mh.bspRadio.indicateTxStart(fromMote,packet,channel)
-                        
-                        # remember to signal end of transmission
-                        self.pendingTxEnd += [(fromMote,toMote)]
-                    #print 'Good/Total: ' + str(self.txGood) + '/' + str(self.txTotal)
-                                                
-                else:    # Original error model, i.e. PDR only
-                    if random.random()<=pdr:
-                        
-                        # indicate start of transmission
-                        mh = self.engine.getMoteHandlerById(toMote)
-                        mh.bspRadio.indicateTxStart(fromMote,packet,channel)
-                        
-                        # remember to signal end of transmission
-                        self.pendingTxEnd += [(fromMote,toMote)]
+        if fromMote not in self.connections:
+            return
+        
+        powers      = []
+        receptions  = []
+        
+        # links without a Markov model use their PDR only
+        if self.errModel == 'markov2':
+            markovIds = self.markov.linkIds
+        else:
+            markovIds = None
+        linkId      = None
+        
+        for (toMote,pdr,rssi,power_mW) in self.connections[fromMote].itemsWithPower():
+            
+            # the frame adds to the power on the air at toMote, whether or
+            # not toMote receives it
+            powers  += [(toMote,power_mW)]
+            total    = self.rxPower.get((toMote,channel),0.0)+power_mW
+            self.rxPower[(toMote,channel)] = total
+            
+            # frames toMote is receiving on this channel may collide
+            if toMote in self.receptions:
+                for reception in self.receptions[toMote].values():
+                    if reception.channel==channel:
+                        reception.checkSinr(total)
+            
+            if markovIds is not None:
+                linkId = markovIds.get((fromMote,toMote))
+            
+            if linkId is not None:
+                self.txTotal += 1
+                if not self.markov.transmit(linkId):
+                    continue
+                self.txGood  += 1
+            
+            else:    # Original error model, i.e. PDR only
+                if random.random()>pdr:
+                    continue
+            
+            # indicate start of transmission, the radio of toMote ignores it
+            # unless listening on this channel
+            mh = self.engine.getMoteHandlerById(toMote)
+            if not mh.bspRadio.indicateTxStart(fromMote,packet,channel,rssi):
+                continue
+            
+            # remember to signal end of transmission
+            reception = Reception(fromMote,toMote,channel,power_mW)
+            reception.checkSinr(total)
+            self.receptions.setdefault(toMote,{})[fromMote] = reception
+            receptions += [reception]
+        
+        self.onAir[fromMote]        = (channel,powers)
+        self.pendingTxEnd[fromMote] = receptions
     
     def _indicateTxEnd(self,sender,signal,data):
         
         fromMote = data
         
-        if fromMote in self.connections:
-            for (toMote,pdr) in self.connections[fromMote].items():
-                try:
-                    self.pendingTxEnd.remove((fromMote,toMote))
-                except ValueError:
-                    pass
-                else:
-                    mh = self.engine.getMoteHandlerById(toMote)
-                    mh.bspRadio.indicateTxEnd(fromMote)
+        if fromMote not in self.onAir:
+            return
+        
+        # the frame no longer adds to the power on the air
+        (channel,powers) = self.onAir.pop(fromMote)
+        for (toMote,power_mW) in powers:
+            key = (toMote,channel)
+            total = self.rxPower[key]-power_mW
+            if total>self.NOISE_FLOOR_mW/1000:
+                self.rxPower[key] = total
+            else:
+                # avoid accumulating rounding errors once the channel is clear
+                del self.rxPower[key]
+        
+        for reception in self.pendingTxEnd.pop(fromMote):
+            toMote = reception.toMote
+            del self.receptions[toMote][fromMote]
+            if not self.receptions[toMote]:
+                del self.receptions[toMote]
+            
+            # only count the collisions of frames still being received
+            mh = self.engine.getMoteHandlerById(toMote)
+            if mh.bspRadio.indicateTxEnd(fromMote,not reception.collided) and reception.collided:
+                link = (fromMote,toMote)
+                self.collisions[link] = self.collisions.get(link,0)+1
     
     #======================== private =========================================
     
+    def _createConnection(self,fromMote,toMote):
+        
+        (pdr,rssi) = self._computeLink(fromMote,toMote)
+        
+        #==== create, update or delete connection
+        
+        if pdr:
+            self.connections.setdefault(fromMote,LinkTable()).set(toMote,pdr,rssi)
+            self.connections.setdefault(toMote,LinkTable()).set(fromMote,pdr,rssi)
+        else:
+            self._deleteConnection(toMote,fromMote)
+    
+    def _computeLink(self,fromMote,toMote):
+        '''
+        Return the PDR and received power, in dBm, of a link. The received
+        power is None when the topology does not model it.
+        '''
+        
+        Prx                  = None
+        
+        if not self.simTopology:
+            
+            #===== Pister-hack model
+            
+            # compute distance
+            d_km             = self._distance(fromMote,toMote)
+            
+            # compute reception power (first Friis, then apply Pister-hack)
+            Prx              = self.TX_POWER_dBm - (20*log10(d_km) + self.FRIIS_LOSS_1km_dB)
+            Prx             -= self.PISTER_HACK_LOSS*random.random()
+            
+            #turn into PDR
+            if   Prx<self.SENSITIVITY_dBm:
+                pdr          = 0.0
+            elif Prx>self.SENSITIVITY_dBm+self.GREY_AREA_dB:
+                pdr          = 1.0
+            else:
+                pdr          = (Prx-self.SENSITIVITY_dBm)/self.GREY_AREA_dB
+        
+        elif self.simTopology=='linear':
+            
+            # linear network
+            if fromMote==toMote+1:
+                pdr          = 1.0
+            else:
+                pdr          = 0.0
+        
+        elif self.simTopology=='fully-meshed':
+            
+            pdr          = 1.0
+        
+        else:
+            
+            raise NotImplementedError('unsupported simTopology={0}'.format(self.simTopology))
+        
+        return (pdr,Prx)
+    
+    def _deleteConnection(self,fromMote,toMote):
+        
+        for (a,b) in [(fromMote,toMote),(toMote,fromMote)]:
+            try:
+                self.connections[a].delete(b)
+            except (KeyError,ValueError):
+                pass # did not exist
+            else:
+                if not self.connections[a]:
+                    del self.connections[a]
+    
+    #=== spatial index
+    
+    def _cell(self,moteId):
+        (lat,lon) = self.engine.getMoteHandlerById(moteId).getLocation()
+        return (
+            int(floor(lat/self.GRID_CELL_deg)),
+            int(floor((lon+180)/self.GRID_CELL_deg)) % self.GRID_NUM_COLUMNS,
+        )
+    
+    def _indexMote(self,moteId):
+        cell = self._cell(moteId)
+        self.grid.setdefault(cell,[]).append(moteId)
+        self.gridCells[moteId] = cell
+    
+    def _unindexMote(self,moteId):
+        cell = self.gridCells.pop(moteId)
+        self.grid[cell].remove(moteId)
+        if not self.grid[cell]:
+            del self.grid[cell]
+    
+    def _motesAround(self,moteId):
+        '''
+        Return the other motes closer than CUTOFF_RADIUS_km from a mote.
+        '''
+        
+        (row,column) = self.gridCells[moteId]
+        
+        # a cell spans less km in longitude than in latitude, away from the
+        # equator; look as many cells east and west as needed at the
+        # latitude of the neighboring row closest to a pole
+        maxLat = min(90.0,max(abs(row-1),abs(row+2))*self.GRID_CELL_deg)
+        span   = int(ceil(1/max(cos(radians(maxLat)),1e-9)))
+        if 2*span+1>=self.GRID_NUM_COLUMNS:
+            columns = range(self.GRID_NUM_COLUMNS)
+        else:
+            columns = [(column+c) % self.GRID_NUM_COLUMNS for c in range(-span,span+1)]
+        
+        returnVal = []
+        for r in [row-1,row,row+1]:
+            for c in columns:
+                for toMote in self.grid.get((r,c),[]):
+                    if toMote!=moteId and self._distance(moteId,toMote)<self.CUTOFF_RADIUS_km:
+                        returnVal += [toMote]
+        return returnVal
+    
     #======================== helpers =========================================
     
+    def _distance(self,fromMote,toMote):
+        '''
+        Great-circle distance between two motes, in km.
+        '''
+        
+        (latFrom,lonFrom) = self.engine.getMoteHandlerById(fromMote).getLocation()
+        (latTo,lonTo)     = self.engine.getMoteHandlerById(toMote).getLocation()
+        
+        lonFrom, latFrom, lonTo, latTo = map(radians, [lonFrom, latFrom, lonTo, latTo])
+        dlon             = lonTo - lonFrom 
+        dlat             = latTo - latFrom 
+        a                = sin(dlat/2)**2 + cos(latFrom) * cos(latTo) * sin(dlon/2)**2
+        c                = 2 * asin(sqrt(a)) 
+        return self.EARTH_RADIUS_km * c
+    
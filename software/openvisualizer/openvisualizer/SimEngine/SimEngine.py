@@ -63,7 +63,8 @@ class SimEngine(object):
         self.loghandler           = loghandler
         
         # local variables
-        self.moteHandlers         = []
+        self.moteHandlers         = []  # in creation order
+        self.moteHandlersById     = {}  # moteId -> moteHandler
         self.timeline             = TimeLine.TimeLine()
         self.propagation          = Propagation.Propagation(simTopology)
         self.idmanager            = IdManager.IdManager()
@@ -71,7 +72,12 @@ class SimEngine(object):
         self.pauseSem             = threading.Lock()
         self.isPaused             = False
         self.stopAfterSteps       = None
+        self.stopAtTime           = None
+        self.stopAtNumEvents      = None
         self.delay                = 0
+        self.turbo                = False
+        self.controlRequested     = False # pause, step, delay or stop pending
+        self.stopped              = threading.Event() # set once the simulation stopped by itself
         self.stats                = SimEngineStats()
         
         # logging this module
@@ -106,6 +112,15 @@ class SimEngine(object):
     
     def setDelay(self,delay):
         self.delay = delay
+        self._updateControlRequested()
+    
+    def setTurbo(self,turbo):
+        '''
+        In turbo mode, the timeline only calls pauseOrDelay() after an event
+        when a pause, step, delay or stop condition has been requested, and
+        does not yield the CPU between events.
+        '''
+        self.turbo = turbo
     
     def pause(self):
         if self.log.isEnabledFor(logging.DEBUG):
@@ -114,12 +129,14 @@ class SimEngine(object):
             self.pauseSem.acquire()
             self.isPaused = True
             self.stats.indicateStop()
+        self._updateControlRequested()
     
     def step(self,numSteps):
         self.stopAfterSteps = numSteps
         if self.isPaused:
             self.pauseSem.release()
             self.isPaused = False
+        self._updateControlRequested()
     
     def resume(self):
         if self.log.isEnabledFor(logging.DEBUG):
@@ -129,8 +146,28 @@ class SimEngine(object):
             self.pauseSem.release()
             self.isPaused = False
             self.stats.indicateStart()
+        self._updateControlRequested()
+    
+    def setStopCondition(self,simTime=None,numEvents=None):
+        '''
+        Pause the simulation once an event at or after simTime has executed,
+        or once numEvents events have executed in total.
+        '''
+        self.stopAtTime      = simTime
+        self.stopAtNumEvents = numEvents
+        self.stopped.clear()
+        self._updateControlRequested()
     
     def pauseOrDelay(self):
+        if ((self.stopAtTime is not None and
+             self.timeline.getCurrentTime()>=self.stopAtTime) or
+            (self.stopAtNumEvents is not None and
+             self.timeline.getStats().getNumEvents()>=self.stopAtNumEvents)):
+            self.stopAtTime      = None
+            self.stopAtNumEvents = None
+            self.pause()
+            self.stopped.set()
+        
         if self.isPaused:
             if self.log.isEnabledFor(logging.DEBUG):
                 self.log.debug('pauseOrDelay: pause')
@@ -139,7 +176,8 @@ class SimEngine(object):
         else:
             if self.log.isEnabledFor(logging.DEBUG):
                 self.log.debug('pauseOrDelay: delay {0}'.format(self.delay))
-            time.sleep(self.delay)
+            if self.delay or not self.turbo:
+                time.sleep(self.delay)
             
         if self.stopAfterSteps is not None:
             if self.stopAfterSteps>0:
@@ -148,29 +186,42 @@ class SimEngine(object):
                 self.pause()
         
         assert(self.stopAfterSteps is None or self.stopAfterSteps >= 0)
+        
+        self._updateControlRequested()
     
     def isRunning(self):
         return not self.isPaused
     
+    def waitStopped(self,timeout=None):
+        '''
+        Waits for the simulation to stop by itself, at the stop condition or
+        at the end of the timeline, rather than be paused.
+        
+        :returns: whether the simulation stopped within timeout seconds.
+        '''
+        return self.stopped.wait(timeout)
+    
     #=== called from the main script
     
-    def indicateNewMote(self,newMoteHandler):
+    def indicateNewMote(self,newMoteHandler,connect=True):
         
         # add this mote to my list of motes
         self.moteHandlers.append(newMoteHandler)
+        self.moteHandlersById[newMoteHandler.getId()] = newMoteHandler
         
-        # create connections to already existing motes
-        for mh in self.moteHandlers[:-1]:
-            self.propagation.createConnection(
-                fromMote     = newMoteHandler.getId(),
-                toMote       = mh.getId(),
-            )
+        # create connections to the already existing motes in range
+        if connect:
+            self.propagation.indicateNewMote(newMoteHandler.getId())
     
     #=== called from timeline
     
     def indicateFirstEventPassed(self):
         self.stats.indicateStart()
     
+    def indicateEndOfSimulation(self):
+        self.stats.indicateStop()
+        self.stopped.set()
+    
     #=== getting information about the system
     
     def getNumMotes(self):
@@ -179,19 +230,37 @@ class SimEngine(object):
     def getMoteHandler(self,rank):
         return self.moteHandlers[rank]
     
+    def getMoteHandlers(self):
+        return list(self.moteHandlers)
+    
     def getMoteHandlerById(self,moteId):
-        returnVal = None
-        for h in self.moteHandlers:
-            if h.getId()==moteId:
-                returnVal = h
-                break
+        returnVal = self.moteHandlersById.get(moteId)
         assert returnVal
         return returnVal
     
     def getStats(self):
         return self.stats
     
+    def getSimSpeed(self):
+        '''
+        Returns the number of simulated seconds per wall-clock second the
+        engine ran, or None if it did not run yet.
+        '''
+        durationRunning = self.stats.getDurationRunning()
+        if not durationRunning:
+            return None
+        return self.timeline.getCurrentTime()/durationRunning
+    
     #======================== private =========================================
     
+    def _updateControlRequested(self):
+        self.controlRequested = (
+            self.isPaused                       or
+            self.delay>0                        or
+            self.stopAfterSteps is not None     or
+            self.stopAtTime is not None         or
+            self.stopAtNumEvents is not None
+        )
+    
     #======================== helpers =========================================
     
\ No newline at end of file
@@ -5,6 +5,7 @@
 # Released under the BSD 3-Clause license as published at the link below.
 # https://openwsn.atlassian.net/wiki/display/OW/License
 
+import heapq
 import logging
 import threading
 
@@ -35,8 +36,16 @@ class TimeLineEvent(object):
 class TimeLine(threading.Thread):
     '''
     The timeline of the engine.
+    
+    Upcoming events are kept in a binary heap of [atTime, -seq, event]
+    entries, where seq increases with each scheduled event. Of events
+    scheduled for the same time, the last scheduled runs first. Events are
+    indexed by (moteId,desc); a canceled or rescheduled event is only marked
+    as such, and is dropped when it reaches the head of the heap.
     '''
     
+    COMPACT_MIN_ENTRIES = 64 # heap size under which canceled entries are not purged
+    
     def __init__(self):
         
         # store params
@@ -44,7 +53,11 @@ class TimeLine(threading.Thread):
         
         # local variables
         self.currentTime          = 0   # current time
-        self.timeline             = []  # list of upcoming events
+        self.dataLock             = threading.Lock()
+        self.timeline             = []  # heap of upcoming events
+        self.eventIndex           = {}  # (moteId,desc) -> heap entry
+        self.numScheduled         = 0
+        self.numCanceled          = 0   # canceled entries still in the heap
         self.firstEventPassed     = False
         self.firstEvent           = threading.Lock()
         self.firstEvent.acquire()
@@ -85,19 +98,24 @@ class TimeLine(threading.Thread):
         # apply the delay
         self.engine.pauseOrDelay()
         
+        # in turbo mode, the log level is only checked once
+        logDebug = self.log.isEnabledFor(logging.DEBUG)
+        
         while True:
             
+            # pop the event at the head of the timeline
+            with self.dataLock:
+                event = self._popEvent()
+            
             # detect the end of the simulation
-            if len(self.timeline)==0:
+            if event is None:
                 output  = ''
                 output += 'end of simulation reached\n'
                 output += ' - currentTime='+str(self.getCurrentTime())+'\n'
                 self.log.warning(output)
+                self.engine.indicateEndOfSimulation()
                 raise StopIteration(output)
             
-            # pop the event at the head of the timeline
-            event = self.timeline.pop(0)
-            
             # make sure that this event is later in time than the previous
             assert(self.currentTime<=event.atTime)
             
@@ -105,7 +123,9 @@ class TimeLine(threading.Thread):
             self.currentTime = event.atTime
             
             # log
-            if self.log.isEnabledFor(logging.DEBUG):
+            if not self.engine.turbo:
+                logDebug = self.log.isEnabledFor(logging.DEBUG)
+            if logDebug:
                 self.log.debug('\n\nnow {0:.6f}, executing {1}@{2}'.format(event.atTime,
                                                                        event.desc,
                                                                        event.moteId,))
@@ -116,8 +136,9 @@ class TimeLine(threading.Thread):
             # update statistics
             self.stats.incrementEvents()
             
-            # apply the delay
-            self.engine.pauseOrDelay()
+            # apply the delay, only if requested in turbo mode
+            if self.engine.controlRequested or not self.engine.turbo:
+                self.engine.pauseOrDelay()
     
     #======================== public ==========================================
     
@@ -151,23 +172,16 @@ class TimeLine(threading.Thread):
         # create a new event
         newEvent = TimeLineEvent(moteId,atTime,cb,desc)
         
-        # remove any event already in the queue with same description
-        for i in range(len(self.timeline)):
-            if (self.timeline[i].moteId==moteId and
-                self.timeline[i].desc==desc):
-                self.timeline.pop(i)
-                break
-        
-        # look for where to put this event
-        i = 0
-        while i<len(self.timeline):
-            if newEvent.atTime>self.timeline[i].atTime:
-               i += 1
-            else:
-               break
-        
-        # insert the new event
-        self.timeline.insert(i,newEvent)
+        with self.dataLock:
+            
+            # remove any event already in the queue with same description
+            self._removeEvent((moteId,desc))
+            
+            # insert the new event
+            self.numScheduled += 1
+            entry = [atTime,-self.numScheduled,newEvent]
+            self.eventIndex[(moteId,desc)] = entry
+            heapq.heappush(self.timeline,entry)
         
         # start the timeline, if applicable
         with self.firstEventLock:
@@ -188,26 +202,16 @@ class TimeLine(threading.Thread):
         if self.log.isEnabledFor(logging.DEBUG):
             self.log.debug('cancelEvent {0}@{1}'.format(desc,moteId))
         
-        # initialize return variable
-        numEventsCanceled = 0
-        
-        # remove any event already the queue with same description
-        i = 0
-        while i<len(self.timeline):
-            if (
-                  self.timeline[i].moteId==moteId and
-                  self.timeline[i].desc==desc
-               ):
-                self.timeline.pop(i)
-                numEventsCanceled += 1
+        # remove any event already the queue with same description, there
+        # is at most one
+        with self.dataLock:
+            if self._removeEvent((moteId,desc)):
+                return 1
             else:
-                i += 1
-        
-        # return the number of events canceled
-        return numEventsCanceled
+                return 0
         
     def getEvents(self):
-        return [[ev.atTime,ev.moteId,ev.desc] for ev in self.timeline]
+        return [[ev.atTime,ev.moteId,ev.desc] for ev in self._sortedEvents()]
     
     def getStats(self):
         return self.stats
@@ -216,9 +220,53 @@ class TimeLine(threading.Thread):
     
     def _printTimeline(self):
         output  = ''
-        for event in self.timeline:
+        for event in self._sortedEvents():
             output += '\n'+str(event)
         return output
     
     #======================== helpers =========================================
+    
+    def _popEvent(self):
+        '''
+        Pop the next event to execute off the heap.
+        
+        :returns: The event, or None if the timeline is empty.
+        '''
+        while self.timeline:
+            (atTime,negSeq,event) = heapq.heappop(self.timeline)
+            if event is None:
+                # canceled
+                self.numCanceled -= 1
+                continue
+            del self.eventIndex[(event.moteId,event.desc)]
+            return event
+        return None
+    
+    def _removeEvent(self,key):
+        '''
+        Mark the event identified by key as canceled.
+        
+        The heap is rebuilt without canceled entries once they make up half
+        of it, so rescheduling the same event does not grow it indefinitely.
+        
+        :returns: True if an event was canceled.
+        '''
+        entry = self.eventIndex.pop(key,None)
+        if entry is None:
+            return False
+        entry[2]              = None
+        self.numCanceled     += 1
+        if (
+                len(self.timeline)>=self.COMPACT_MIN_ENTRIES and
+                self.numCanceled*2>len(self.timeline)
+            ):
+            self.timeline     = [e for e in self.timeline if e[2] is not None]
+            heapq.heapify(self.timeline)
+            self.numCanceled  = 0
+        return True
+    
+    def _sortedEvents(self):
+        with self.dataLock:
+            entries = sorted(self.timeline)
+        return [entry[2] for entry in entries if entry[2] is not None]
     
\ No newline at end of file
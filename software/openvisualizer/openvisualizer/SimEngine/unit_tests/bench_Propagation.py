@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+'''
+Benchmark of the creation of a simulated network.
+
+Adds motes to the engine, which connects each new mote to the existing ones
+with the Pister-hack propagation model, then retrieves the connections, as
+the web topology page does. Reports the duration of both steps for several
+network sizes, with the motes either packed around Cory Hall as the
+LocationManager places them, or spread over an AREA_DEGREES-wide square.
+Run directly::
+
+    python bench_Propagation.py
+'''
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # SimEngine/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import random
+import time
+
+import SimEngine
+
+#============================ defines =========================================
+
+NUM_MOTES      = [100,1000]
+AREA_DEGREES   = 0.1 # about 10km
+
+#============================ helpers =========================================
+
+class BenchMoteHandler(object):
+
+    def __init__(self,engine,location):
+        self.id         = engine.idmanager.getId()
+        self.location   = location
+
+    def getId(self):
+        return self.id
+
+    def getLocation(self):
+        return self.location
+
+def packedLocation(engine):
+    return engine.locationmanager.getLocation()
+
+def spreadLocation(engine):
+    return (37.8+random.random()*AREA_DEGREES,-122.3+random.random()*AREA_DEGREES)
+
+#============================ main ============================================
+
+def main():
+    logging.disable(logging.CRITICAL)
+    random.seed(0)
+
+    for (name,getLocation) in [('packed',packedLocation),('spread',spreadLocation)]:
+        for numMotes in NUM_MOTES:
+
+            # start from a fresh engine (singleton)
+            SimEngine.SimEngine._instance = None
+            SimEngine.SimEngine._init     = False
+            engine = SimEngine.SimEngine()
+
+            start  = time.time()
+            for _ in range(numMotes):
+                engine.indicateNewMote(BenchMoteHandler(engine,getLocation(engine)))
+            durationCreate   = time.time()-start
+
+            start  = time.time()
+            connections      = engine.propagation.retrieveConnections()
+            durationRetrieve = time.time()-start
+
+            print '{0} {1:>4} motes: {2:>6} connections, created in {3:.2f}s, retrieved in {4:.3f}s'.format(
+                name,
+                numMotes,
+                len(connections),
+                durationCreate,
+                durationRetrieve,
+            )
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+'''
+Benchmark of the SimEngine event loop.
+
+Runs the timeline over a line of emulated motes, about 55m apart, and
+reports the number of events executed per second, for several network
+sizes. The motes are stand-ins for MoteHandler which do not need the
+compiled firmware: at each event, a mote re-arms its timer, and every
+TX_EVERY events it transmits a frame, which Propagation delivers to its
+neighbors. Each network is run in normal and in turbo mode. Run directly::
+
+    python bench_SimEngine.py
+'''
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # SimEngine/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import random
+import time
+
+import SimEngine
+
+#============================ defines =========================================
+
+NUM_MOTES      = [10,50,200]
+NUM_EVENTS     = 50000
+TX_EVERY       = 10
+TIMER_PERIOD   = 0.010
+MOTE_SPACING   = 0.0005 # degrees of latitude
+
+#============================ helpers =========================================
+
+class BenchRadio(object):
+
+    def indicateTxStart(self,moteId,packet,channel,rssi=-50):
+        return True
+
+    def indicateTxEnd(self,moteId,crcPasses=True):
+        return True
+
+class BenchMoteHandler(object):
+    '''
+    Stand-in for MoteHandler, running the timer callback in the timeline
+    thread.
+    '''
+
+    def __init__(self,engine,counter):
+        self.engine     = engine
+        self.counter    = counter
+        self.id         = engine.idmanager.getId()
+        self.location   = (self.id*MOTE_SPACING,0.0)
+        self.bspRadio   = BenchRadio()
+
+    def getId(self):
+        return self.id
+
+    def getLocation(self):
+        return self.location
+
+    def handleEvent(self,functionToCall):
+        functionToCall()
+
+    def timerFired(self):
+        self.counter[0] += 1
+        if self.counter[0] % TX_EVERY == 0:
+            self.engine.propagation._indicateTxStart('bench','wirelessTxStart',(self.id,[0x00]*20,11))
+            self.engine.propagation._indicateTxEnd('bench','wirelessTxEnd',self.id)
+        if self.counter[0] < NUM_EVENTS:
+            self.engine.timeline.scheduleEvent(
+                self.engine.timeline.getCurrentTime()+TIMER_PERIOD*random.random(),
+                self.id,
+                self.timerFired,
+                'timer',
+            )
+
+def createEngine(numMotes):
+    # start from a fresh engine (singleton)
+    SimEngine.SimEngine._instance = None
+    SimEngine.SimEngine._init     = False
+    engine  = SimEngine.SimEngine()
+    counter = [0]
+    for _ in range(numMotes):
+        engine.indicateNewMote(BenchMoteHandler(engine,counter))
+    return engine
+
+#============================ main ============================================
+
+def main():
+    logging.disable(logging.CRITICAL)
+    random.seed(0)
+
+    for (numMotes,turbo) in [(n,t) for n in NUM_MOTES for t in [False,True]]:
+        engine = createEngine(numMotes)
+        engine.setTurbo(turbo)
+        for mh in engine.getMoteHandlers():
+            engine.timeline.scheduleEvent(TIMER_PERIOD*random.random(),mh.getId(),mh.timerFired,'timer')
+
+        start  = time.time()
+        try:
+            engine.timeline.run()
+        except StopIteration:
+            pass
+        duration = time.time()-start
+
+        numEvents = engine.timeline.getStats().getNumEvents()
+        print '{0:>3} motes{1}: {2} events, {3:.0f} events/s'.format(
+            numMotes,
+            ' (turbo)' if turbo else '        ',
+            numEvents,
+            numEvents/duration,
+        )
+
+if __name__=="__main__":
+    main()
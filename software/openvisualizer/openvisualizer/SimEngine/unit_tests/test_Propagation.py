@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # SimEngine/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import logging.handlers
+import math
+import random
+
+import pytest
+
+import SimEngine
+import Propagation
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_Propagation.log'
+
+import logging
+log = logging.getLogger('test_Propagation')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_Propagation',
+                   'Propagation',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ defines =========================================
+
+NUM_MOTES         = 60
+AREA_DEGREES      = 0.05    # about 5.5km
+
+#============================ helpers =========================================
+
+class FakeRadio(object):
+    
+    '''
+    Records the frames received, in the order they end. As BspRadio, it
+    receives one frame at a time, on any channel.
+    '''
+    
+    def __init__(self):
+        self.receiving = None  # (moteId,channel) of the frame being received
+        self.received  = []
+    
+    def indicateTxStart(self,moteId,packet,channel,rssi=-50):
+        if self.receiving:
+            return False
+        self.receiving = (moteId,channel)
+        return True
+    
+    def indicateTxEnd(self,moteId,crcPasses=True):
+        if not self.receiving or self.receiving[0]!=moteId:
+            return False
+        self.received += [self.receiving+(crcPasses,)]
+        self.receiving = None
+        return True
+
+class FakeMoteHandler(object):
+    
+    def __init__(self,engine,lat,lon):
+        self.id       = engine.idmanager.getId()
+        self.location = (lat,lon)
+        self.bspRadio = FakeRadio()
+    
+    def getId(self):
+        return self.id
+    
+    def getLocation(self):
+        return self.location
+
+def createMotes(engine,locations):
+    returnVal = []
+    for (lat,lon) in locations:
+        mh = FakeMoteHandler(engine,lat,lon)
+        engine.indicateNewMote(mh,connect=False)
+        returnVal += [mh.getId()]
+    return returnVal
+
+def distance_km(mh1,mh2):
+    (lat1,lon1,lat2,lon2) = map(math.radians,mh1.getLocation()+mh2.getLocation())
+    a = math.sin((lat2-lat1)/2)**2 + math.cos(lat1)*math.cos(lat2)*math.sin((lon2-lon1)/2)**2
+    return Propagation.Propagation.EARTH_RADIUS_km*2*math.asin(math.sqrt(a))
+
+def txStart(propagation,moteId,channel):
+    propagation._indicateTxStart('test','wirelessTxStart',(moteId,[0x00]*10,channel))
+
+def txEnd(propagation,moteId):
+    propagation._indicateTxEnd('test','wirelessTxEnd',moteId)
+
+def connectedPairs(propagation):
+    return sorted([(c['fromMote'],c['toMote']) for c in propagation.retrieveConnections()])
+
+#============================ fixtures ========================================
+
+@pytest.fixture(params=[0.0,45.0,-60.0])
+def latitude(request):
+    return request.param
+
+#============================ tests ===========================================
+
+def test_linkTable():
+    
+    log.debug("\n---------- test_linkTable")
+    
+    links = Propagation.LinkTable()
+    links.append(1,0.5)
+    links.set(2,0.6)
+    links.set(3,0.7)
+    links.set(2,0.8)
+    
+    assert len(links)==3
+    assert links.get(2)==0.8
+    assert links.get(4) is None
+    
+    links.delete(1)
+    assert sorted(links.items())==[(2,0.8),(3,0.7)]
+    with pytest.raises(ValueError):
+        links.delete(1)
+
+def test_gridSameAsAllPairs(latitude,monkeypatch):
+    '''
+    Without the random Pister-hack loss, two motes are connected exactly
+    when they are closer than the cutoff radius.
+    '''
+    
+    log.debug("\n---------- test_gridSameAsAllPairs (latitude={0})".format(latitude))
+    
+    engine      = SimEngine.SimEngine()
+    rand        = random.Random(int(latitude))
+    locations   = [
+        (latitude+rand.random()*AREA_DEGREES,10.0+rand.random()*AREA_DEGREES)
+        for _ in range(NUM_MOTES)
+    ]
+    moteIds     = createMotes(engine,locations)
+    
+    monkeypatch.setattr(Propagation.random,'random',lambda: 0.0)
+    propagation = Propagation.Propagation('')
+    for moteId in moteIds:
+        propagation.indicateNewMote(moteId)
+    
+    expected    = []
+    for (i,fromMote) in enumerate(moteIds):
+        for toMote in moteIds[i+1:]:
+            d = distance_km(engine.getMoteHandlerById(fromMote),engine.getMoteHandlerById(toMote))
+            if d<propagation.CUTOFF_RADIUS_km:
+                expected += [(fromMote,toMote)]
+    
+    assert expected
+    assert len(expected)<NUM_MOTES*(NUM_MOTES-1)/2
+    assert connectedPairs(propagation)==sorted(expected)
+
+def test_moteMoved(monkeypatch):
+    
+    log.debug("\n---------- test_moteMoved")
+    
+    monkeypatch.setattr(Propagation.random,'random',lambda: 0.0)
+    engine      = SimEngine.SimEngine()
+    moteIds     = createMotes(engine,[(0.0,0.0),(0.0,1.0)])
+    propagation = Propagation.Propagation('')
+    for moteId in moteIds:
+        propagation.indicateNewMote(moteId)
+    assert connectedPairs(propagation)==[]
+    
+    # a new mote next to the second one, once it moved next to the first one
+    mh          = engine.getMoteHandlerById(moteIds[1])
+    mh.location = (0.0,0.001)
+    propagation.indicateMoteMoved(moteIds[1])
+    newMoteId   = createMotes(engine,[(0.0,0.002)])[0]
+    propagation.indicateNewMote(newMoteId)
+    
+    assert [toMote for (fromMote,toMote) in connectedPairs(propagation)]==[newMoteId,newMoteId]
+
+def test_linear():
+    
+    log.debug("\n---------- test_linear")
+    
+    engine      = SimEngine.SimEngine()
+    moteIds     = createMotes(engine,[(0.0,0.0)]*4)
+    propagation = Propagation.Propagation('linear')
+    for moteId in moteIds:
+        propagation.indicateNewMote(moteId)
+    
+    # the first mote is connected to the mote created before it, if any
+    assert connectedPairs(propagation)[-3:]==zip(moteIds[:-1],moteIds[1:])
+
+def test_updateAndDeleteConnection():
+    
+    log.debug("\n---------- test_updateAndDeleteConnection")
+    
+    engine      = SimEngine.SimEngine()
+    moteIds     = createMotes(engine,[(0.0,0.0)]*3)
+    propagation = Propagation.Propagation('fully-meshed')
+    
+    # updating a connection which does not exist creates it
+    propagation.updateConnection(moteIds[0],moteIds[2],0.5)
+    assert propagation.retrieveConnections()==[
+        {'fromMote': moteIds[0], 'toMote': moteIds[2], 'pdr': 0.5},
+    ]
+    
+    propagation.deleteConnection(moteIds[2],moteIds[0])
+    propagation.deleteConnection(moteIds[2],moteIds[0])
+    assert propagation.retrieveConnections()==[]
+    assert propagation.connections=={}
+
+def test_noCollision():
+    
+    log.debug("\n---------- test_noCollision")
+    
+    engine      = SimEngine.SimEngine()
+    (a,b,c)     = createMotes(engine,[(0.0,0.0)]*3)
+    propagation = Propagation.Propagation('fully-meshed')
+    for moteId in (a,b,c):
+        propagation.indicateNewMote(moteId)
+    
+    # overlapping frames on different channels, then one after the other
+    txStart(propagation,a,11)
+    txStart(propagation,c,12)
+    txEnd(propagation,a)
+    txEnd(propagation,c)
+    txStart(propagation,c,11)
+    txEnd(propagation,c)
+    
+    # b, receiving a's frame, ignores the one of c on the other channel
+    assert engine.getMoteHandlerById(b).bspRadio.received==[
+        (a,11,True),
+        (c,11,True),
+    ]
+    assert propagation.retrieveCollisions()==[]
+    assert propagation.rxPower=={}
+    assert propagation.receptions=={}
+
+def test_collision():
+    
+    log.debug("\n---------- test_collision")
+    
+    engine      = SimEngine.SimEngine()
+    (a,b,c)     = createMotes(engine,[(0.0,0.0)]*3)
+    propagation = Propagation.Propagation('fully-meshed')
+    for moteId in (a,b,c):
+        propagation.indicateNewMote(moteId)
+    
+    # c starts transmitting while b receives a's frame, on the same channel
+    txStart(propagation,a,11)
+    txStart(propagation,c,11)
+    txEnd(propagation,a)
+    txEnd(propagation,c)
+    
+    # b ignores c's frame, which is not counted as a collision
+    assert engine.getMoteHandlerById(b).bspRadio.received==[
+        (a,11,False),
+    ]
+    assert sorted((x['fromMote'],x['toMote'],x['collisions']) for x in propagation.retrieveCollisions())==[
+        (a,b,1),
+    ]
+    assert propagation.receptions=={}
+
+def test_capture(monkeypatch):
+    '''
+    A frame much stronger than the interfering one is still received.
+    '''
+    
+    log.debug("\n---------- test_capture")
+    
+    monkeypatch.setattr(Propagation.random,'random',lambda: 0.0)
+    engine      = SimEngine.SimEngine()
+    (a,b,c)     = createMotes(engine,[(0.0,0.0),(0.0,0.0001),(0.0,0.009)])
+    propagation = Propagation.Propagation('')
+    for moteId in (a,b,c):
+        propagation.indicateNewMote(moteId)
+    
+    txStart(propagation,a,11)
+    txStart(propagation,c,11)
+    txEnd(propagation,c)
+    txEnd(propagation,a)
+    
+    received = engine.getMoteHandlerById(b).bspRadio.received
+    assert received==[(a,11,True)]
+    assert propagation.retrieveCollisions()==[]
+
+def test_markovLinks():
+    
+    log.debug("\n---------- test_markovLinks")
+    
+    markov = Propagation.MarkovLinks()
+    markov.seed(1)
+    markov.set(1,2,0.0,1.0,0.0,1.0)
+    markov.set(2,1,1.0,1.0,1.0,1.0)
+    
+    # fails after a success, succeeds after a failure
+    assert [markov.transmit(0) for _ in range(4)]==[False,True,False,True]
+    assert markov.transmit(1)
+    
+    markov.set(1,2,1.0,1.0,1.0,1.0)
+    assert markov.transmit(0)
+    assert sorted(markov.items())==[((1,2),5,3),((2,1),1,1)]
+
+def test_markovLinksSeed():
+    
+    log.debug("\n---------- test_markovLinksSeed")
+    
+    outcomes = []
+    for seed in [1,1,2]:
+        markov = Propagation.MarkovLinks()
+        markov.seed(seed)
+        markov.set(1,2,0.5,0.5,0.5,0.5)
+        outcomes += [[markov.transmit(0) for _ in range(2*markov.BLOCK_SIZE)]]
+    
+    assert outcomes[0]==outcomes[1]
+    assert outcomes[0]!=outcomes[2]
+
+def test_markov2ErrorModel(monkeypatch):
+    
+    log.debug("\n---------- test_markov2ErrorModel")
+    
+    monkeypatch.setattr(Propagation.random,'random',lambda: 0.0)
+    engine      = SimEngine.SimEngine()
+    (a,b,c)     = createMotes(engine,[(0.0,0.0)]*3)
+    propagation = Propagation.Propagation('fully-meshed')
+    propagation.errModel = 'markov2'
+    for moteId in (a,b,c):
+        propagation.indicateNewMote(moteId)
+    
+    # the link to b drops every frame, the link to c has no Markov model
+    propagation.createLink(a,b,0.0,0.0,0.0,0.0)
+    for _ in range(3):
+        txStart(propagation,a,11)
+        txEnd(propagation,a)
+    
+    assert engine.getMoteHandlerById(b).bspRadio.received==[]
+    assert len(engine.getMoteHandlerById(c).bspRadio.received)==3
+    assert sorted((x['fromMote'],x['toMote'],x['numTx'],x['numGood']) for x in propagation.retrieveLinkStats())==[
+        (a,b,3,0),
+        (b,a,0,0),
+    ]
+    assert (propagation.txTotal,propagation.txGood)==(3,0)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # SimEngine/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import logging.handlers
+import threading
+
+import pytest
+
+import SimEngine
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_SimEngine.log'
+
+import logging
+log = logging.getLogger('test_SimEngine')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_SimEngine',
+                   'SimEngine',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ helpers =========================================
+
+class FakeMoteHandler(object):
+    
+    def __init__(self,id):
+        self.id       = id
+        self.location = (id*0.001,0.0)
+    
+    def getId(self):
+        return self.id
+    
+    def getLocation(self):
+        return self.location
+
+#============================ tests ===========================================
+
+def test_moteHandlerById():
+    
+    log.debug("\n---------- test_moteHandlerById")
+    
+    engine   = SimEngine.SimEngine()
+    numMotes = engine.getNumMotes()
+    handlers = [FakeMoteHandler(id) for id in range(1000+numMotes,1005+numMotes)]
+    for mh in handlers:
+        engine.indicateNewMote(mh)
+    
+    assert engine.getNumMotes()==numMotes+len(handlers)
+    assert engine.getMoteHandlers()[numMotes:]==handlers
+    for mh in handlers:
+        assert engine.getMoteHandlerById(mh.getId()) is mh
+    with pytest.raises(AssertionError):
+        engine.getMoteHandlerById(999)
+
+def test_controlRequested():
+    
+    log.debug("\n---------- test_controlRequested")
+    
+    engine   = SimEngine.SimEngine()
+    assert not engine.controlRequested
+    
+    engine.setDelay(0.1)
+    assert engine.controlRequested
+    engine.setDelay(0)
+    assert not engine.controlRequested
+    
+    engine.setStopCondition(numEvents=10)
+    assert engine.controlRequested
+    engine.setStopCondition()
+    assert not engine.controlRequested
+    
+    engine.pause()
+    assert engine.controlRequested
+    engine.step(2)
+    assert engine.controlRequested
+    engine.resume()
+    assert not engine.controlRequested
+
+def test_waitStopped():
+    
+    log.debug("\n---------- test_waitStopped")
+    
+    engine   = SimEngine.SimEngine()
+    engine.setStopCondition(numEvents=engine.timeline.getStats().getNumEvents())
+    
+    # a pause, e.g. to write to the serial port of a mote, is not a stop
+    engine.pause()
+    assert not engine.waitStopped(0.01)
+    engine.resume()
+    
+    # the stop condition pauses the timeline thread in pauseOrDelay()
+    timeline = threading.Thread(target=engine.pauseOrDelay)
+    timeline.start()
+    assert engine.waitStopped(1.0)
+    assert not engine.isRunning()
+    engine.resume()
+    timeline.join()
+    
+    # a new stop condition clears the stop
+    engine.setStopCondition(simTime=1000)
+    assert not engine.waitStopped(0.01)
+    engine.setStopCondition()
+    
+    # the timeline ran out of events
+    engine.indicateEndOfSimulation()
+    assert engine.waitStopped(0.01)
+    engine.setStopCondition()
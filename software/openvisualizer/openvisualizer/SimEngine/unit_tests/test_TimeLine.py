@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # SimEngine/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import logging.handlers
+import random
+
+import pytest
+
+import TimeLine
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_TimeLine.log'
+
+import logging
+log = logging.getLogger('test_TimeLine')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_TimeLine',
+                   'Timeline',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ defines =========================================
+
+NUM_MOTES         = 5
+DESCS             = ['timer','uartTx','radioRx','radioTx']
+NUM_OPERATIONS    = 2000
+
+#============================ helpers =========================================
+
+class ReferenceTimeLine(object):
+    '''
+    The list-based timeline the heap-based one replaces.
+    '''
+    
+    def __init__(self):
+        self.timeline = []
+    
+    def scheduleEvent(self,atTime,moteId,cb,desc):
+        newEvent = TimeLine.TimeLineEvent(moteId,atTime,cb,desc)
+        for i in range(len(self.timeline)):
+            if (self.timeline[i].moteId==moteId and
+                self.timeline[i].desc==desc):
+                self.timeline.pop(i)
+                break
+        i = 0
+        while i<len(self.timeline):
+            if newEvent.atTime>self.timeline[i].atTime:
+               i += 1
+            else:
+               break
+        self.timeline.insert(i,newEvent)
+    
+    def cancelEvent(self,moteId,desc):
+        numEventsCanceled = 0
+        i = 0
+        while i<len(self.timeline):
+            if (
+                  self.timeline[i].moteId==moteId and
+                  self.timeline[i].desc==desc
+               ):
+                self.timeline.pop(i)
+                numEventsCanceled += 1
+            else:
+                i += 1
+        return numEventsCanceled
+    
+    def getEvents(self):
+        return [[ev.atTime,ev.moteId,ev.desc] for ev in self.timeline]
+    
+    def popEvent(self):
+        return self.timeline.pop(0)
+
+def createTimeLine():
+    timeline = TimeLine.TimeLine()
+    # fake the first event having been scheduled, so the timeline does not
+    # try to start the simulation
+    timeline.firstEventPassed = True
+    return timeline
+
+def noop():
+    pass
+
+#============================ fixtures ========================================
+
+@pytest.fixture(params=[0,1,2])
+def seed(request):
+    return request.param
+
+#============================ tests ===========================================
+
+def test_equalTimestamps():
+    
+    log.debug("\n---------- test_equalTimestamps")
+    
+    timeline = createTimeLine()
+    timeline.scheduleEvent(1.0,1,noop,'a')
+    timeline.scheduleEvent(2.0,1,noop,'b')
+    timeline.scheduleEvent(1.0,2,noop,'a')
+    timeline.scheduleEvent(1.0,3,noop,'a')
+    
+    # events scheduled for the same time run in reverse scheduling order
+    assert timeline.getEvents()==[
+        [1.0,3,'a'],
+        [1.0,2,'a'],
+        [1.0,1,'a'],
+        [2.0,1,'b'],
+    ]
+
+def test_rescheduleAndCancel():
+    
+    log.debug("\n---------- test_rescheduleAndCancel")
+    
+    timeline = createTimeLine()
+    timeline.scheduleEvent(1.0,1,noop,'a')
+    timeline.scheduleEvent(2.0,2,noop,'a')
+    timeline.scheduleEvent(3.0,1,noop,'a')
+    
+    assert timeline.getEvents()==[[2.0,2,'a'],[3.0,1,'a']]
+    assert timeline.cancelEvent(1,'a')==1
+    assert timeline.cancelEvent(1,'a')==0
+    assert timeline.getEvents()==[[2.0,2,'a']]
+    
+    assert timeline._popEvent().moteId==2
+    assert timeline._popEvent() is None
+
+def test_compaction():
+    
+    log.debug("\n---------- test_compaction")
+    
+    timeline = createTimeLine()
+    for i in range(10*timeline.COMPACT_MIN_ENTRIES):
+        timeline.scheduleEvent(float(i),1,noop,'uartTx')
+    
+    assert len(timeline.timeline)<=timeline.COMPACT_MIN_ENTRIES
+    assert timeline.getEvents()==[[float(i),1,'uartTx']]
+
+def test_sameOrderAsReference(seed):
+    
+    log.debug("\n---------- test_sameOrderAsReference (seed {0})".format(seed))
+    
+    rand      = random.Random(seed)
+    timeline  = createTimeLine()
+    reference = ReferenceTimeLine()
+    now       = 0.0
+    
+    for _ in range(NUM_OPERATIONS):
+        moteId = rand.randint(1,NUM_MOTES)
+        desc   = rand.choice(DESCS)
+        op     = rand.random()
+        if   op<0.6:
+            # coarse times make equal timestamps frequent
+            atTime = now+rand.randint(0,5)*0.001
+            timeline.scheduleEvent(atTime,moteId,noop,desc)
+            reference.scheduleEvent(atTime,moteId,noop,desc)
+        elif op<0.8:
+            assert timeline.cancelEvent(moteId,desc)==reference.cancelEvent(moteId,desc)
+        elif reference.timeline:
+            event = timeline._popEvent()
+            expected = reference.popEvent()
+            assert (event.atTime,event.moteId,event.desc)==(expected.atTime,expected.moteId,expected.desc)
+            now   = event.atTime
+        assert timeline.getEvents()==reference.getEvents()
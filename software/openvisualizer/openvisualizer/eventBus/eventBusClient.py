@@ -10,9 +10,141 @@ log.addHandler(logging.NullHandler())
 
 import threading
 import Queue
+import weakref
 
 from pydispatch import dispatcher
 
+# all live clients, to deliver signals containing a wildcard
+_clients = weakref.WeakSet()
+
+class AsyncDelivery(object):
+    '''
+    Calls a callback from worker threads, through a bounded queue, so that a
+    slow callback does not block the thread which dispatches to it.
+    
+    When the queue is full, the overflow policy either drops the oldest
+    queued call, drops the new call, or blocks the caller until there is
+    room in the queue.
+    '''
+    
+    OVERFLOW_DROP_OLDEST = 'dropOldest'
+    OVERFLOW_DROP_NEWEST = 'dropNewest'
+    OVERFLOW_BLOCK       = 'block'
+    OVERFLOW_ALL         = [
+        OVERFLOW_DROP_OLDEST,
+        OVERFLOW_DROP_NEWEST,
+        OVERFLOW_BLOCK,
+    ]
+    
+    def __init__(self,name,callback,queueSize,overflow=OVERFLOW_DROP_OLDEST,numWorkers=1):
+        
+        assert queueSize>0
+        assert overflow in self.OVERFLOW_ALL
+        assert numWorkers>0
+        
+        # store params
+        self.name                 = name
+        self.callback             = callback
+        self.overflow             = overflow
+        
+        # local variables
+        self.queue                = Queue.Queue(maxsize=queueSize)
+        self.statsLock            = threading.Lock()
+        self.numQueued            = 0
+        self.numDelivered         = 0
+        self.numDropped           = 0
+        self.maxQueueDepth        = 0
+        self.workers              = []
+        
+        # start the workers
+        for i in range(numWorkers):
+            worker                = threading.Thread(target=self._work)
+            worker.name           = '{0}#{1}'.format(self.name,i)
+            worker.daemon         = True
+            worker.start()
+            self.workers         += [worker]
+    
+    #======================== public ==========================================
+    
+    def put(self,*args,**kwargs):
+        '''
+        Queue a call to the callback with the given arguments.
+        '''
+        
+        item = (args,kwargs)
+        
+        if   self.overflow==self.OVERFLOW_BLOCK:
+            self.queue.put(item)
+        elif self.overflow==self.OVERFLOW_DROP_NEWEST:
+            try:
+                self.queue.put_nowait(item)
+            except Queue.Full:
+                self._countDropped()
+                return
+        else:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    break
+                except Queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                    except Queue.Empty:
+                        pass
+                    else:
+                        self.queue.task_done()
+                        self._countDropped()
+        
+        with self.statsLock:
+            self.numQueued       += 1
+            self.maxQueueDepth    = max(self.maxQueueDepth,self.queue.qsize())
+    
+    def getStats(self):
+        with self.statsLock:
+            return {
+                'name':           self.name,
+                'queueDepth':     self.queue.qsize(),
+                'maxQueueDepth':  self.maxQueueDepth,
+                'numQueued':      self.numQueued,
+                'numDelivered':   self.numDelivered,
+                'numDropped':     self.numDropped,
+            }
+    
+    def join(self):
+        '''
+        Block until all queued calls have been delivered.
+        '''
+        self.queue.join()
+    
+    def close(self):
+        '''
+        Stop the workers once the calls already queued are delivered.
+        '''
+        for _ in self.workers:
+            self.queue.put(None)
+    
+    #======================== private =========================================
+    
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                (args,kwargs) = item
+                try:
+                    self.callback(*args,**kwargs)
+                except Exception as err:
+                    log.critical("ERROR in {0} calling {1}, err={2}".format(self.name,self.callback,err))
+                with self.statsLock:
+                    self.numDelivered += 1
+            finally:
+                self.queue.task_done()
+    
+    def _countDropped(self):
+        with self.statsLock:
+            self.numDropped      += 1
+
 class eventBusClient(object):
     
     WILDCARD  = '*'
@@ -31,7 +163,7 @@ class eventBusClient(object):
         for r in registrations:
             assert type(r)==dict
             for k in r.keys():
-                assert k in ['signal','sender','callback']
+                assert k in ['signal','sender','callback','queueSize','overflow','numWorkers']
         
         # log
         log.info("create instance")
@@ -39,6 +171,9 @@ class eventBusClient(object):
         # store params
         self.dataLock        = threading.RLock()
         self.registrations   = []
+        self.registrationIdx = {}    # exact signal -> registrations, in order
+        self.wildcardRegs    = []    # registrations with a wildcard signal
+        self.connectedSigs   = set() # signals connected to the dispatcher
         
         # give this thread a name
         self.name            = name
@@ -52,23 +187,55 @@ class eventBusClient(object):
                 sender       = r['sender'],
                 signal       = r['signal'],
                 callback     = r['callback'],
+                queueSize    = r.get('queueSize'),
+                overflow     = r.get('overflow',AsyncDelivery.OVERFLOW_DROP_OLDEST),
+                numWorkers   = r.get('numWorkers',1),
             )
         
-        # connect to dispatcher
-        dispatcher.connect(
-            receiver = self._eventBusNotification,
-        )
+        _clients.add(self)
     
     #======================== public ==========================================
     
     def dispatch(self,signal,data):
-        return dispatcher.send(
+        returnVal = dispatcher.send(
             sender = self.name,
             signal = signal,
             data   = data,
         )
+        
+        if self._isWildcard(signal):
+            # a wildcard signal matches registrations which are indexed under
+            # other signals; deliver to those clients explicitly
+            for client in list(_clients):
+                if dispatcher.Any in client.connectedSigs or not client.registrationIdx:
+                    continue
+                returnVal += [(
+                    client._eventBusNotification,
+                    client._eventBusNotification(
+                        signal = signal,
+                        sender = self.name,
+                        data   = data,
+                    ),
+                )]
+        
+        return returnVal
     
-    def register(self,sender,signal,callback):
+    def register(self,sender,signal,callback,queueSize=None,
+            overflow=AsyncDelivery.OVERFLOW_DROP_OLDEST,numWorkers=1):
+        '''
+        Register a callback for a signal.
+        
+        By default, the callback is called synchronously, in the thread which
+        dispatches the signal. If queueSize is given, the callback is called
+        asynchronously by numWorkers threads, through a queue of queueSize
+        notifications, see AsyncDelivery. Request/response signals can not
+        be registered for asynchronously, as their caller expects the answer.
+        '''
+        
+        if queueSize and self._isRequestSignal(signal):
+            raise SystemError(
+                "Signal {0} can not be delivered asynchronously".format(signal)
+            )
         
         # detect duplicate registrations
         with self.dataLock:
@@ -92,40 +259,87 @@ class eventBusClient(object):
             'signal':        signal,
             'callback':      callback,
             'numRx':         0,
+            'delivery':      None,
         }
+        if queueSize:
+            newRegistration['delivery'] = AsyncDelivery(
+                name         = '{0}.{1}'.format(self.name,getattr(callback,'__name__',callback)),
+                callback     = callback,
+                queueSize    = queueSize,
+                overflow     = overflow,
+                numWorkers   = numWorkers,
+            )
         with self.dataLock:
             self.registrations += [newRegistration]
+            self._updateIndex()
     
     def unregister(self,sender,signal,callback):
         
         with self.dataLock:
-            for reg in self.registrations:
+            for reg in self.registrations[:]:
                 if  (
                         reg['sender']==sender                             and
                         self._signalsEquivalent(reg['signal'], signal)    and
                         reg['callback']==callback
                     ):
                     self.registrations.remove(reg)
+                    if reg['delivery']:
+                        reg['delivery'].close()
+            self._updateIndex()
+    
+    def getDeliveryStats(self):
+        '''
+        Returns the queue depth and drop counters of the asynchronous
+        registrations, as a list of dictionaries.
+        '''
+        returnVal = []
+        with self.dataLock:
+            for reg in self.registrations:
+                if reg['delivery']:
+                    stats           = reg['delivery'].getStats()
+                    stats['signal'] = reg['signal']
+                    stats['sender'] = reg['sender']
+                    returnVal      += [stats]
+        return returnVal
     
     #======================== private =========================================
     
     def _eventBusNotification(self,signal,sender,data):
         
         callback = None
+        delivery = None
         
         # find the callback
         with self.dataLock:
-            for r in self.registrations:
+            if self._isWildcard(signal):
+                candidates = self.registrations
+            else:
+                candidates = self.registrationIdx.get(signal,[])
+                if self.wildcardRegs:
+                    # keep registration order between both lists
+                    ids        = set([id(r) for r in candidates+self.wildcardRegs])
+                    candidates = [r for r in self.registrations if id(r) in ids]
+            for r in candidates:
                 if (
                         self._signalsEquivalent(r['signal'],signal) and
                         (r['sender']==sender or r['sender']==self.WILDCARD)
                     ):
                     callback = r['callback']
+                    delivery = r['delivery']
                     break
         
         if not callback:
             return None
         
+        # queue the call, for asynchronous registrations
+        if delivery:
+            delivery.put(
+                sender = sender,
+                signal = signal,
+                data   = data,
+            )
+            return None
+        
         # call the callback
         try:
             return callback(
@@ -138,6 +352,57 @@ class eventBusClient(object):
             log.critical(output)
             print output
     
+    def _updateIndex(self):
+        '''
+        Rebuild the signal index from the registrations, and connect to the
+        dispatcher only for the signals registered for, so that other
+        signals are not delivered to this client.
+        
+        Registrations with a wildcard signal are connected to any signal.
+        '''
+        
+        self.registrationIdx     = {}
+        self.wildcardRegs        = []
+        for r in self.registrations:
+            if self._isWildcard(r['signal']):
+                self.wildcardRegs += [r]
+            elif self._signalsEquivalent(r['signal'],r['signal']):
+                self.registrationIdx.setdefault(r['signal'],[]).append(r)
+            # other signals are never equivalent to any signal
+        
+        signals                  = set(self.registrationIdx.keys())
+        if self.wildcardRegs:
+            signals.add(dispatcher.Any)
+        
+        for signal in signals-self.connectedSigs:
+            dispatcher.connect(
+                receiver = self._eventBusNotification,
+                signal   = signal,
+            )
+        for signal in self.connectedSigs-signals:
+            dispatcher.disconnect(
+                receiver = self._eventBusNotification,
+                signal   = signal,
+            )
+        self.connectedSigs       = signals
+    
+    def _isRequestSignal(self,signal):
+        '''
+        Whether the dispatcher of the signal uses the value returned by the
+        callbacks, i.e. a 'get...' request, or a (dst_addr, proto, port)
+        signal, which is answered to tell it was consumed.
+        '''
+        if type(signal)==str:
+            return signal.startswith('get')
+        return type(signal)==tuple
+    
+    def _isWildcard(self,signal):
+        if type(signal)==str:
+            return signal==self.WILDCARD
+        if type(signal)==tuple:
+            return self.WILDCARD in signal
+        return False
+    
     def _signalsEquivalent(self,s1,s2):
         returnVal = True
         if type(s1)==type(s2)==str:
@@ -17,9 +17,18 @@ import openvisualizer.openvisualizer_utils as u
 
 from pydispatch import dispatcher
 from openvisualizer.openTun    import openTun
+from openvisualizer.eventBus   import eventBusClient
 
 class eventBusMonitor(object):
     
+    ZEP_SIGNALS             = [
+        'wirelessTxStart',
+        'fromMote.data',
+        'fromMote.sniffedPacket',
+        'bytesToMesh',
+    ]
+    ZEP_QUEUE_SIZE          = 1000
+    
     def __init__(self):
         
         # log
@@ -37,6 +46,15 @@ class eventBusMonitor(object):
         # give this instance a name
         self.name                      = 'eventBusMonitor'
         
+        # ZEP packets are built in a worker thread, not to slow down the
+        # threads dispatching mesh packets
+        self.zepDelivery               = eventBusClient.AsyncDelivery(
+            name                       = '{0}.zep'.format(self.name),
+            callback                   = self._exportZep,
+            queueSize                  = self.ZEP_QUEUE_SIZE,
+            overflow                   = eventBusClient.AsyncDelivery.OVERFLOW_DROP_OLDEST,
+        )
+        
         # connect to dispatcher
         dispatcher.connect(
             self._eventBusNotification,
@@ -61,6 +79,20 @@ class eventBusMonitor(object):
         
         # send back JSON string
         return json.dumps(returnVal)
+    
+    def getCounters(self):
+        '''
+        Returns the number of times each signal was dispatched, as a
+        dictionary {(sender,signal): num}.
+        '''
+        with self.dataLock:
+            return dict(self.stats)
+    
+    def getZepStats(self):
+        '''
+        Returns the queue depth and drop counters of the ZEP export.
+        '''
+        return self.zepDelivery.getStats()
         
     def setWiresharkDebug(self,isEnabled):
         '''
@@ -94,76 +126,81 @@ class eventBusMonitor(object):
             # this signal only exists is simulation mode
             self.simMode = True
         
-        if self.wiresharkDebugEnabled:
+        if self.wiresharkDebugEnabled and signal in self.ZEP_SIGNALS:
+            self.zepDelivery.put(signal,data,self.simMode)
+    
+    def _exportZep(self,signal,data,simMode):
+        '''
+        Forwards a copy of a mesh packet to the Internet interface, as a ZEP
+        packet. Called from the ZEP worker thread.
+        '''
+        
+        if simMode:
+            # simulation mode
             
-            if self.simMode:
-                # simulation mode
+            if signal=='wirelessTxStart':
+                # Forwards a copy of the packet exchanged between simulated motes
+                # to the tun interface for debugging.
+                
+                (moteId,frame,frequency) = data
+                
+                if log.isEnabledFor(logging.DEBUG):
+                    output  = []
+                    output += ['']
+                    output += ['- moteId:    {0}'.format(moteId)]
+                    output += ['- frame:     {0}'.format(u.formatBuf(frame))]
+                    output += ['- frequency: {0}'.format(frequency)]
+                    output  = '\n'.join(output)
+                    log.debug(output)
+                    print output # poipoi
                 
-                if signal=='wirelessTxStart':
-                    # Forwards a copy of the packet exchanged between simulated motes
-                    # to the tun interface for debugging.
-                    
-                    (moteId,frame,frequency) = data
-                    
-                    if log.isEnabledFor(logging.DEBUG):
-                        output  = []
-                        output += ['']
-                        output += ['- moteId:    {0}'.format(moteId)]
-                        output += ['- frame:     {0}'.format(u.formatBuf(frame))]
-                        output += ['- frequency: {0}'.format(frequency)]
-                        output  = '\n'.join(output)
-                        log.debug(output)
-                        print output # poipoi
-                    
-                    assert len(frame)>=1+2 # 1 for length byte, 2 for CRC
-                    
-                    # cut frame in pieces
-                    length = frame[0]
-                    body   = frame[1:-2]
-                    crc    = frame[-2:]
-                    
-                    # wrap with zep header
-                    zep   = self._wrapZepCrc(body,frequency)
-                    self._dispatchMeshDebugPacket(zep)
+                assert len(frame)>=1+2 # 1 for length byte, 2 for CRC
+                
+                # cut frame in pieces
+                length = frame[0]
+                body   = frame[1:-2]
+                crc    = frame[-2:]
+                
+                # wrap with zep header
+                zep   = self._wrapZepCrc(body,frequency)
+                self._dispatchMeshDebugPacket(zep)
+        
+        else:
+            # non-simulation mode
             
-            else:
-                # non-simulation mode
+            if signal=='fromMote.data':
+                # Forwards a copy of the data received from a mode
+                # to the Internet interface for debugging.
+                (previousHop,lowpan) = data
                 
-                if signal=='fromMote.data':
-                    # Forwards a copy of the data received from a mode
-                    # to the Internet interface for debugging.
-                    (previousHop,lowpan) = data
-                    
-                    zep = self._wrapMacAndZep(
-                        previousHop  = previousHop,
-                        nextHop      = self.dagRootEui64,
-                        lowpan       = lowpan,
-                    )
-                    self._dispatchMeshDebugPacket(zep)
+                zep = self._wrapMacAndZep(
+                    previousHop  = previousHop,
+                    nextHop      = self.dagRootEui64,
+                    lowpan       = lowpan,
+                )
+                self._dispatchMeshDebugPacket(zep)
 
-                if signal=='fromMote.sniffedPacket':
-                    body      = data[0:-3]
-                    crc       = data[-3:-1]
-                    frequency = data[-1]
+            if signal=='fromMote.sniffedPacket':
+                body      = data[0:-3]
+                crc       = data[-3:-1]
+                frequency = data[-1]
 
-                    # wrap with zep header
-                    zep   = self._wrapZepCrc(body,frequency)
-                    self._dispatchMeshDebugPacket(zep)
-                    
-                if signal=='bytesToMesh':
-                    # Forwards a copy of the 6LoWPAN packet destined for the mesh 
-                    # to the tun interface for debugging.
-                    (nextHop,lowpan) = data
-                    
-                    zep = self._wrapMacAndZep(
-                        previousHop  = self.dagRootEui64,
-                        nextHop      = nextHop,
-                        lowpan       = lowpan,
-                    )
-                    self._dispatchMeshDebugPacket(zep)
-        
-        
-        
+                # wrap with zep header
+                zep   = self._wrapZepCrc(body,frequency)
+                self._dispatchMeshDebugPacket(zep)
+                
+            if signal=='bytesToMesh':
+                # Forwards a copy of the 6LoWPAN packet destined for the mesh 
+                # to the tun interface for debugging.
+                (nextHop,lowpan) = data
+                
+                zep = self._wrapMacAndZep(
+                    previousHop  = self.dagRootEui64,
+                    nextHop      = nextHop,
+                    lowpan       = lowpan,
+                )
+                self._dispatchMeshDebugPacket(zep)
+    
     def _wrapMacAndZep(self, previousHop, nextHop, lowpan):
         '''
         Returns Exegin ZEP protocol header and dummy 802.15.4 header 
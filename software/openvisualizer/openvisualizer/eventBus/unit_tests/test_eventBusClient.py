@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))               # root/
+sys.path.insert(0, os.path.join(here, '..'))                           # eventBus/
+
+import logging
+import logging.handlers
+
+import pytest
+
+import eventBusClient
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_eventBusClient.log'
+
+import logging
+log = logging.getLogger('test_eventBusClient')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_eventBusClient',
+                   'eventBusClient',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ defines =========================================
+
+WILDCARD = eventBusClient.eventBusClient.WILDCARD
+ADDR_A   = tuple([0xaa]*16)
+ADDR_B   = tuple([0xbb]*16)
+
+#============================ helpers =========================================
+
+class RecordingClient(eventBusClient.eventBusClient):
+    
+    def __init__(self,name,signals,returnVal=None):
+        self.received  = []
+        self.returnVal = returnVal
+        eventBusClient.eventBusClient.__init__(
+            self,
+            name             = name,
+            registrations    = [
+                {
+                    'sender'   : WILDCARD,
+                    'signal'   : s,
+                    'callback' : self._record,
+                } for s in signals
+            ]
+        )
+    
+    def _record(self,sender,signal,data):
+        self.received += [(signal,data)]
+        return self.returnVal
+
+#============================ tests ===========================================
+
+def test_exactSignal():
+    
+    log.debug("\n---------- test_exactSignal")
+    
+    a = RecordingClient('a',['sigA'])
+    b = RecordingClient('b',['sigB'])
+    
+    a.dispatch('sigB',1)
+    
+    assert a.received==[]
+    assert b.received==[('sigB',1)]
+
+def test_tupleSignal():
+    
+    log.debug("\n---------- test_tupleSignal")
+    
+    a = RecordingClient('a',[(ADDR_A,'udp',5683)])
+    b = RecordingClient('b',[(ADDR_B,'udp',5683),(ADDR_B,'udp',WILDCARD)])
+    
+    a.dispatch((ADDR_B,'udp',5683),1)
+    a.dispatch((ADDR_B,'udp',1234),2)
+    a.dispatch((ADDR_A,'udp',1234),3)
+    
+    assert a.received==[]
+    assert b.received==[((ADDR_B,'udp',5683),1),((ADDR_B,'udp',1234),2)]
+
+def test_wildcardSignal():
+    
+    log.debug("\n---------- test_wildcardSignal")
+    
+    a = RecordingClient('a',['sigA'])
+    b = RecordingClient('b',[WILDCARD])
+    
+    b.dispatch('sigA',1)
+    b.dispatch(WILDCARD,2)
+    
+    assert a.received==[('sigA',1),(WILDCARD,2)]
+    assert b.received==[('sigA',1),(WILDCARD,2)]
+
+def test_unregister():
+    
+    log.debug("\n---------- test_unregister")
+    
+    a = RecordingClient('a',['sigA'])
+    
+    a.unregister(WILDCARD,'sigA',a._record)
+    a.dispatch('sigA',1)
+    
+    assert a.received==[]
+
+def test_dispatchAndGetResult():
+    
+    log.debug("\n---------- test_dispatchAndGetResult")
+    
+    a = RecordingClient('a',['getSomething'],returnVal='something')
+    b = RecordingClient('b',['getOther'])
+    
+    assert b._dispatchAndGetResult('getSomething',None)=='something'
+    assert b._dispatchProtocol('getSomething',None)==True
+    assert a._dispatchProtocol('getOther',None)==False
+    with pytest.raises(SystemError):
+        a._dispatchAndGetResult('getNothing',None)
+
+def test_asyncDelivery():
+    
+    log.debug("\n---------- test_asyncDelivery")
+    
+    a = RecordingClient('a',[])
+    a.register(
+        sender    = WILDCARD,
+        signal    = 'sigA',
+        callback  = a._record,
+        queueSize = 10,
+    )
+    
+    for i in range(5):
+        a.dispatch('sigA',i)
+    a.registrations[0]['delivery'].join()
+    
+    assert a.received==[('sigA',i) for i in range(5)]
+    stats = a.getDeliveryStats()[0]
+    assert stats['signal']=='sigA'
+    assert stats['numDelivered']==5
+    assert stats['numDropped']==0
+    assert stats['queueDepth']==0
+
+@pytest.mark.parametrize('overflow,expected', [
+    (eventBusClient.AsyncDelivery.OVERFLOW_DROP_OLDEST, [2,3,4]),
+    (eventBusClient.AsyncDelivery.OVERFLOW_DROP_NEWEST, [0,1,2]),
+])
+def test_asyncOverflow(overflow,expected):
+    
+    log.debug("\n---------- test_asyncOverflow")
+    
+    received = []
+    
+    delivery = eventBusClient.AsyncDelivery(
+        name      = 'test',
+        callback  = received.append,
+        queueSize = 3,
+        overflow  = overflow,
+    )
+    
+    # stop the worker, so nobody reads the queue while filling it
+    delivery.close()
+    delivery.workers[0].join()
+    
+    for i in range(5):
+        delivery.put(i)
+    
+    while not delivery.queue.empty():
+        (args,kwargs) = delivery.queue.get_nowait()
+        received.append(args[0])
+    
+    assert received==expected
+    assert delivery.getStats()['numDropped']==2
+    assert delivery.getStats()['maxQueueDepth']==3
+
+def test_asyncRequestSignal():
+    
+    log.debug("\n---------- test_asyncRequestSignal")
+    
+    a = RecordingClient('a',[])
+    
+    for signal in ['getSourceRoute',(ADDR_A,'udp',5683)]:
+        with pytest.raises(SystemError):
+            a.register(
+                sender    = WILDCARD,
+                signal    = signal,
+                callback  = a._record,
+                queueSize = 10,
+            )
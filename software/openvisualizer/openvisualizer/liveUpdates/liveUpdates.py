@@ -0,0 +1,210 @@
+# Copyright (c) 2010-2013, Regents of the University of California.
+# All rights reserved.
+#
+# Released under the BSD 3-Clause license as published at the link below.
+# https://openwsn.atlassian.net/wiki/display/OW/License
+'''
+Pushes the changes of the state of the network to the web UI, as a stream
+of Server-Sent Events, rather than have the pages poll for it.
+
+The state is sampled at most once per minimum period, whatever the number
+of subscribers. Each subscriber compares the samples it is handed, at its
+own period, to the previous one it was handed, and receives only what
+changed in between:
+
+- ``moteState``: the rows of a state element of a mote which were updated,
+  as ``{"moteid": .., "elem": .., "rows": {"<row>": {..}}}``;
+- ``dag``: the edges of the DAG added and removed, as
+  ``{"added": [..], "removed": [..]}``;
+- ``eventBus``: the increments of the event bus counters, as a list of
+  ``{"sender": .., "signal": .., "increment": ..}``.
+
+The first events of a subscriber hold the whole state.
+'''
+
+import logging
+log = logging.getLogger('liveUpdates')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+import json
+import threading
+import time
+
+class LiveUpdates(object):
+    '''
+    Samples the state of the network for the subscribers.
+    '''
+
+    EV_MOTESTATE        = 'moteState'
+    EV_DAG              = 'dag'
+    EV_EVENTBUS         = 'eventBus'
+
+    def __init__(self,app,minPeriod):
+        '''
+        :param app:       OpenVisualizerApp
+        :param minPeriod: Minimum time between two samples, in seconds.
+        '''
+
+        # store params
+        self.app                  = app
+        self.minPeriod            = minPeriod
+
+        # local variables
+        self.dataLock             = threading.Lock()
+        self.sample               = None
+        self.sampleTime           = None
+        self.numSubscribers       = 0
+
+    #======================== public ==========================================
+
+    def subscribe(self,period=None):
+        '''
+        :param period: Time between two batches of events, in seconds, at
+                       least minPeriod, and minPeriod by default.
+        '''
+        if period is None or period<self.minPeriod:
+            period = self.minPeriod
+        return Subscriber(self,period)
+
+    def getSample(self):
+        '''
+        Returns the latest sample of the state, taken less than minPeriod
+        ago.
+        '''
+        with self.dataLock:
+            now = time.time()
+            if self.sample is None or now-self.sampleTime>=self.minPeriod:
+                self.sample       = self._takeSample(self.sample)
+                self.sampleTime   = now
+            return self.sample
+
+    def getNumSubscribers(self):
+        with self.dataLock:
+            return self.numSubscribers
+
+    #======================== private =========================================
+
+    def _takeSample(self,previous):
+        '''
+        The rows of the state elements which were not updated since the
+        previous sample are not read again.
+        '''
+
+        motes = {}
+        for ms in self.app.moteStates:
+            moteid = self.app.moteIndex.getMoteId(ms.moteConnector.serialport)
+            if not moteid:
+                continue
+            for name in ms.ST_ALL:
+                numUpdates = ms.getStateElem(name).getNumUpdates()
+                key        = (moteid,name)
+                if previous and previous['motes'].get(key,(None,))[0]==numUpdates:
+                    motes[key] = previous['motes'][key]
+                else:
+                    motes[key] = (numUpdates,ms.getStateElemRows(name))
+
+        (_,edges) = self.app.topology.getDAG()
+
+        return {
+            'motes':    motes,
+            'dag':      set((e['u'],e['v']) for e in edges),
+            'eventBus': self.app.eventBusMonitor.getCounters(),
+        }
+
+    def _subscribed(self,delta):
+        with self.dataLock:
+            self.numSubscribers  += delta
+
+class Subscriber(object):
+    '''
+    Stream of events of a single client.
+    '''
+
+    KEEPALIVE           = ': keepalive\n\n'
+
+    def __init__(self,liveUpdates,period):
+
+        # store params
+        self.liveUpdates          = liveUpdates
+        self.period               = period
+
+        # local variables
+        self.lastSample           = None
+
+    #======================== public ==========================================
+
+    def getEvents(self):
+        '''
+        Returns the events of the changes since the previous call, as a list
+        of (event type, data).
+        '''
+        sample          = self.liveUpdates.getSample()
+        returnVal       = self._diff(self.lastSample,sample)
+        self.lastSample = sample
+        return returnVal
+
+    def stream(self):
+        '''
+        Generates the Server-Sent Events, one batch per period, until the
+        client disconnects.
+        '''
+        self.liveUpdates._subscribed(+1)
+        try:
+            while True:
+                output = []
+                for (event,data) in self.getEvents():
+                    output += ['event: {0}\ndata: {1}\n\n'.format(event,json.dumps(data))]
+                # writing fails once the client is gone, which closes the stream
+                yield ''.join(output) or self.KEEPALIVE
+                time.sleep(self.period)
+        finally:
+            self.liveUpdates._subscribed(-1)
+
+    #======================== private =========================================
+
+    def _diff(self,old,new):
+        returnVal = []
+
+        #=== rows of the mote state
+        for ((moteid,name),(numUpdates,rows)) in sorted(new['motes'].items()):
+            if old and (moteid,name) in old['motes']:
+                (oldNumUpdates,oldRows) = old['motes'][(moteid,name)]
+                if oldNumUpdates==numUpdates:
+                    continue
+            else:
+                oldRows = []
+            changed = {}
+            for (i,(rowNumUpdates,rowJson)) in enumerate(rows):
+                if i<len(oldRows) and oldRows[i][0]==rowNumUpdates:
+                    continue
+                data = json.loads(rowJson)
+                if data:
+                    changed[str(i)] = data[0]
+            if changed:
+                returnVal += [(LiveUpdates.EV_MOTESTATE,{'moteid': moteid, 'elem': name, 'rows': changed})]
+
+        #=== edges of the DAG
+        oldEdges = old['dag'] if old else set()
+        added    = new['dag']-oldEdges
+        removed  = oldEdges-new['dag']
+        if added or removed:
+            returnVal += [(LiveUpdates.EV_DAG,{
+                'added':   [{'u': u, 'v': v} for (u,v) in sorted(added)],
+                'removed': [{'u': u, 'v': v} for (u,v) in sorted(removed)],
+            })]
+
+        #=== event bus counters
+        oldCounters = old['eventBus'] if old else {}
+        increments  = []
+        for ((sender,signal),num) in new['eventBus'].items():
+            if num!=oldCounters.get((sender,signal),0):
+                increments += [{
+                    'sender':    sender,
+                    'signal':    signal,
+                    'increment': num-oldCounters.get((sender,signal),0),
+                }]
+        if increments:
+            returnVal += [(LiveUpdates.EV_EVENTBUS,increments)]
+
+        return returnVal
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import collections
+import logging
+import logging.handlers
+
+import pytest
+
+from openvisualizer.moteState   import moteState
+from openvisualizer.liveUpdates import liveUpdates
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_liveUpdates.log'
+
+import logging
+log = logging.getLogger('test_liveUpdates')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_liveUpdates',
+                   'liveUpdates',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ defines =========================================
+
+MIN_PERIOD   = 1.0
+
+NotifBackoff = collections.namedtuple('NotifBackoff',['backoffExponent','backoff'])
+NotifRow     = collections.namedtuple('NotifRow',['row','isSync'])
+
+#============================ helpers =========================================
+
+class FakeMoteConnector(object):
+    def __init__(self,serialport):
+        self.serialport = serialport
+
+class FakeMoteIndex(object):
+    def __init__(self):
+        self.ids = {}
+    def getMoteId(self,serialPort):
+        return self.ids.get(serialPort)
+
+class FakeTopology(object):
+    def __init__(self):
+        self.edges = []
+    def getDAG(self):
+        return ([],[{'u': u, 'v': v} for (u,v) in self.edges])
+
+class FakeEventBusMonitor(object):
+    def __init__(self):
+        self.counters = {}
+    def getCounters(self):
+        return dict(self.counters)
+
+class FakeApp(object):
+    '''
+    The parts of OpenVisualizerApp sampled by LiveUpdates, with a single
+    mote, 0001 if identified, whose schedule is a table of StateIsSync rows.
+    '''
+    def __init__(self,identified=True):
+        self.moteIndex       = FakeMoteIndex()
+        self.topology        = FakeTopology()
+        self.eventBusMonitor = FakeEventBusMonitor()
+        self.ms              = moteState.moteState(FakeMoteConnector('emulated1'))
+        self.ms.state[self.ms.ST_SCHEDULE] = moteState.StateTable(moteState.StateIsSync)
+        self.moteStates      = [self.ms]
+        if identified:
+            self.moteIndex.ids['emulated1'] = '0001'
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    returnVal = FakeClock()
+    monkeypatch.setattr(liveUpdates.time,'time',returnVal.time)
+    return returnVal
+
+def eventsOfType(events,eventType):
+    return [data for (event,data) in events if event==eventType]
+
+#============================ tests ===========================================
+
+def test_fullStateFirst(clock):
+
+    log.debug("\n---------- test_fullStateFirst")
+
+    app  = FakeApp()
+    app.ms.getStateElem(app.ms.ST_BACKOFF).update(NotifBackoff(1,2))
+    app.ms.getStateElem(app.ms.ST_SCHEDULE).update(NotifRow(0,1))
+    app.topology.edges                           = [('0002','0001')]
+    app.eventBusMonitor.counters[('lbr','v6ToMesh')] = 3
+    live = liveUpdates.LiveUpdates(app,MIN_PERIOD)
+
+    events = live.subscribe().getEvents()
+
+    assert eventsOfType(events,live.EV_MOTESTATE)==[
+        {'moteid': '0001', 'elem': 'Backoff',  'rows': {'0': {'backoffExponent': 1, 'backoff': 2}}},
+        {'moteid': '0001', 'elem': 'Schedule', 'rows': {'0': {'isSync': 1}}},
+    ]
+    assert eventsOfType(events,live.EV_DAG)==[
+        {'added': [{'u': '0002', 'v': '0001'}], 'removed': []},
+    ]
+    assert eventsOfType(events,live.EV_EVENTBUS)==[
+        [{'sender': 'lbr', 'signal': 'v6ToMesh', 'increment': 3}],
+    ]
+
+def test_changedRowsOnly(clock):
+
+    log.debug("\n---------- test_changedRowsOnly")
+
+    app  = FakeApp()
+    schedule = app.ms.getStateElem(app.ms.ST_SCHEDULE)
+    for row in range(3):
+        schedule.update(NotifRow(row,0))
+    live = liveUpdates.LiveUpdates(app,MIN_PERIOD)
+    sub  = live.subscribe()
+    sub.getEvents()
+
+    # nothing changed
+    clock.now += MIN_PERIOD
+    assert sub.getEvents()==[]
+
+    # only the updated row is sent, even if its content did not change
+    schedule.update(NotifRow(1,0))
+    clock.now += MIN_PERIOD
+    assert sub.getEvents()==[
+        (live.EV_MOTESTATE,{'moteid': '0001', 'elem': 'Schedule', 'rows': {'1': {'isSync': 0}}}),
+    ]
+
+def test_unidentifiedMote(clock):
+
+    log.debug("\n---------- test_unidentifiedMote")
+
+    # a mote without a 16-bit ID yet is not sent
+    app  = FakeApp(identified=False)
+    app.ms.getStateElem(app.ms.ST_BACKOFF).update(NotifBackoff(1,2))
+    live = liveUpdates.LiveUpdates(app,MIN_PERIOD)
+
+    assert live.subscribe().getEvents()==[]
+
+def test_dagEdges(clock):
+
+    log.debug("\n---------- test_dagEdges")
+
+    app  = FakeApp()
+    app.topology.edges = [('0002','0001'),('0003','0002')]
+    live = liveUpdates.LiveUpdates(app,MIN_PERIOD)
+    sub  = live.subscribe()
+    sub.getEvents()
+
+    app.topology.edges = [('0002','0001'),('0003','0001'),('0004','0003')]
+    clock.now += MIN_PERIOD
+    assert sub.getEvents()==[
+        (live.EV_DAG,{
+            'added':   [{'u': '0003', 'v': '0001'},{'u': '0004', 'v': '0003'}],
+            'removed': [{'u': '0003', 'v': '0002'}],
+        }),
+    ]
+
+def test_counterIncrements(clock):
+
+    log.debug("\n---------- test_counterIncrements")
+
+    app  = FakeApp()
+    app.eventBusMonitor.counters = {('lbr','v6ToMesh'): 3, ('rpl','infoDagRoot'): 1}
+    live = liveUpdates.LiveUpdates(app,MIN_PERIOD)
+    sub  = live.subscribe()
+    sub.getEvents()
+
+    app.eventBusMonitor.counters = {('lbr','v6ToMesh'): 5, ('rpl','infoDagRoot'): 1, ('jrc','v6ToMesh'): 2}
+    clock.now += MIN_PERIOD
+    (event,increments) = sub.getEvents()[0]
+    assert event==live.EV_EVENTBUS
+    assert sorted(increments)==sorted([
+        {'sender': 'lbr', 'signal': 'v6ToMesh', 'increment': 2},
+        {'sender': 'jrc', 'signal': 'v6ToMesh', 'increment': 2},
+    ])
+
+def test_minPeriod(clock):
+
+    log.debug("\n---------- test_minPeriod")
+
+    app  = FakeApp()
+    live = liveUpdates.LiveUpdates(app,MIN_PERIOD)
+
+    # a subscriber can not be faster than the minimum period
+    assert live.subscribe().period==MIN_PERIOD
+    assert live.subscribe(0.1).period==MIN_PERIOD
+    assert live.subscribe(5.0).period==5.0
+
+    # the subscribers share a sample within the minimum period
+    sub1 = live.subscribe()
+    sub2 = live.subscribe()
+    sub1.getEvents()
+    sample = live.getSample()
+    app.topology.edges = [('0002','0001')]
+    clock.now += MIN_PERIOD/2
+    assert sub2.getEvents()==[]
+    assert live.getSample() is sample
+
+    # a new sample is taken after it, the state elements which were not
+    # updated are not read again
+    clock.now += MIN_PERIOD/2
+    assert eventsOfType(sub1.getEvents(),live.EV_DAG)==[
+        {'added': [{'u': '0002', 'v': '0001'}], 'removed': []},
+    ]
+    assert live.getSample() is not sample
+    assert live.getSample()['motes'][('0001','Backoff')] is sample['motes'][('0001','Backoff')]
@@ -42,6 +42,7 @@ class Parser(object):
         
         # local variables
         self.parsingKeys          = []
+        self.parsingKeyIdx        = []    # [(index,{val:parser})], in order
         self.headerParsingKeys    = []
         self.named_tuple          = {}
     
@@ -60,9 +61,10 @@ class Parser(object):
         # TODO
      
         # call the next header parser
-        for key in self.parsingKeys:
-            if input[key.index]==key.val:
-                return key.parser(input[self.headerLength:])
+        for (index,parsers) in self.parsingKeyIdx:
+            parser = parsers.get(input[index])
+            if parser:
+                return parser(input[self.headerLength:])
         
         # if you get here, no key was found
      
@@ -77,4 +79,13 @@ class Parser(object):
             raise ParserException(ParserException.TOO_SHORT)
     
     def _addSubParser(self,index=None,val=None,parser=None):
-        self.parsingKeys.append(ParsingKey(index,val,parser))
\ No newline at end of file
+        self.parsingKeys.append(ParsingKey(index,val,parser))
+        
+        # index by type byte, first registration wins
+        for (i,parsers) in self.parsingKeyIdx:
+            if i==index:
+                break
+        else:
+            parsers = {}
+            self.parsingKeyIdx.append((index,parsers))
+        parsers.setdefault(val,parser)
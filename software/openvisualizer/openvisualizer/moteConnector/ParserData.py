@@ -24,6 +24,8 @@ class ParserData(Parser.Parser):
     IPHC_DAM       = 0
     
     UINJECT_MASK    = 'uinject'
+    
+    ASN_STRUCT      = struct.Struct('<BHH')
      
     def __init__(self):
         
@@ -57,7 +59,7 @@ class ParserData(Parser.Parser):
         #asn comes in the next 5bytes.  
         
         asnbytes=input[2:7]
-        (self._asn) = struct.unpack('<BHH',''.join([chr(c) for c in asnbytes]))
+        (self._asn) = self.ASN_STRUCT.unpack(bytearray(asnbytes))
         
         #source and destination of the message
         dest = input[7:15]
@@ -227,7 +229,7 @@ class ParserData(Parser.Parser):
          
         # cross layer trick here. capture UDP packet from udpLatency and get ASN to compute latency.
         if len(input) >37:
-            if self.UINJECT_MASK == ''.join(chr(i) for i in input[-7:]):
+            if bytearray(input[-7:]) == self.UINJECT_MASK:
                 aux      = input[len(input)-14:len(input)-9]  # last 5 bytes of the packet are the ASN in the UDP latency packet
                 diff     = self._asndiference(aux,asnbytes)   # calculate difference 
                 timeinus = diff*self.MSPERSLOT                # compute time in ms
@@ -20,6 +20,7 @@ import StackDefines
 class ParserInfoErrorCritical(Parser.Parser):
     
     HEADER_LENGTH       = 1
+    IEC_STRUCT          = struct.Struct('>HBBHH') # moteId, component, code, arg1, arg2
     
     SEVERITY_INFO       = ord('I')
     SEVERITY_ERROR      = ord('E')
@@ -58,7 +59,7 @@ class ParserInfoErrorCritical(Parser.Parser):
             callingComponent,
             error_code,
             arg1,
-            arg2) = struct.unpack('>HBBHH',''.join([chr(c) for c in input]))
+            arg2) = self.IEC_STRUCT.unpack(bytearray(input))
         except struct.error:
             raise ParserException(ParserException.DESERIALIZE,"could not extract data from {0}".format(input))
         
@@ -23,10 +23,12 @@ class FieldParsingKey(object):
         self.name       = name
         self.structure  = structure
         self.fields     = fields
+        self.struct     = struct.Struct(structure)
 
 class ParserStatus(Parser.Parser):
     
     HEADER_LENGTH       = 4
+    HEADER_STRUCT       = struct.Struct('<HB') # moteId, statusElem
     
     def __init__(self):
         
@@ -38,6 +40,7 @@ class ParserStatus(Parser.Parser):
         
         # local variables
         self.fieldsParsingKeys    = []
+        self.fieldsParsers        = {} # statusElem -> (key, named tuple)
         
         # register fields
         self._addFieldsParser   (
@@ -246,64 +249,63 @@ class ParserStatus(Parser.Parser):
         # ensure input not short longer than header
         self._checkLength(input)
         
-        headerBytes = input[:3]
+        if not isinstance(input,bytearray):
+            input = bytearray(input)
         
         # extract moteId and statusElem
         try:
-           (moteId,statusElem) = struct.unpack('<HB',''.join([chr(c) for c in headerBytes]))
+           (moteId,statusElem) = self.HEADER_STRUCT.unpack_from(input)
         except struct.error:
-            raise ParserException(ParserException.DESERIALIZE,"could not extract moteId and statusElem from {0}".format(headerBytes))
+            raise ParserException(ParserException.DESERIALIZE,"could not extract moteId and statusElem from {0}".format(list(input[:3])))
         
         # log
         if log.isEnabledFor(logging.DEBUG):
             log.debug("moteId={0} statusElem={1}".format(moteId,statusElem))
         
-        # jump the header bytes
-        input = input[3:]
+        # find the parser for that status element
+        try:
+            (key,namedTuple) = self.fieldsParsers[statusElem]
+        except KeyError:
+            raise ParserException(ParserException.NO_KEY, "type={0} (\"{1}\")".format(
+                input[3],
+                chr(input[3])))
+        
+        # log
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("parsing {0}, ({1} bytes) as {2}".format(input[3:],len(input)-3,key.name))
+        
+        # parse byte array, after the header bytes
+        if len(input)-self.HEADER_STRUCT.size!=key.struct.size:
+            raise ParserException(
+                    ParserException.DESERIALIZE,
+                    "could not extract tuple {0} by applying {1} to {2}; error: {3}".format(
+                        key.name,
+                        key.structure,
+                        u.formatBuf(input[3:]),
+                        'unpack requires a string argument of length {0}'.format(key.struct.size),
+                    )
+                )
+        fields = key.struct.unpack_from(input,self.HEADER_STRUCT.size)
         
-        # call the next header parser
-        for key in self.fieldsParsingKeys:
-            if statusElem==key.val:
-            
-                # log
-                if log.isEnabledFor(logging.DEBUG):
-                    log.debug("parsing {0}, ({1} bytes) as {2}".format(input,len(input),key.name))
-                
-                # parse byte array
-                try:
-                    fields = struct.unpack(key.structure,''.join([chr(c) for c in input]))                     
-                except struct.error as err:
-                    raise ParserException(
-                            ParserException.DESERIALIZE,
-                            "could not extract tuple {0} by applying {1} to {2}; error: {3}".format(
-                                key.name,
-                                key.structure,
-                                u.formatBuf(input),
-                                str(err)
-                            )
-                        )
-                
-                # map to name tuple
-                returnTuple = self.named_tuple[key.name](*fields)
-                
-                # log
-                if log.isEnabledFor(logging.DEBUG):
-                    log.debug("parsed into {0}".format(returnTuple))
-                
-                # map to name tuple
-                return 'status', returnTuple
+        # map to name tuple
+        returnTuple = namedTuple(*fields)
         
-        # if you get here, no key was found
-        raise ParserException(ParserException.NO_KEY, "type={0} (\"{1}\")".format(
-            input[0],
-            chr(input[0])))
+        # log
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("parsed into {0}".format(returnTuple))
+        
+        return 'status', returnTuple
     
     #======================== private =========================================
     
     def _addFieldsParser(self,index=None,val=None,name=None,structure=None,fields=None):
     
         # add to fields parsing keys
-        self.fieldsParsingKeys.append(FieldParsingKey(index,val,name,structure,fields))
+        key = FieldParsingKey(index,val,name,structure,fields)
+        self.fieldsParsingKeys.append(key)
         
         # define named tuple
         self.named_tuple[name] = collections.namedtuple("Tuple_"+name, fields)
+        
+        # index by statusElem, first registration wins
+        self.fieldsParsers.setdefault(val,(key,self.named_tuple[name]))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+'''
+Benchmark of the serial frame parser.
+
+Replays serial frames through OpenParser and reports the number of frames
+parsed per second. Run directly::
+
+    python bench_parser.py [framesFile]
+
+framesFile holds the recorded frames (after HDLC deframing), one per line,
+as hex strings, e.g. '53341201...'. Without it, status frames of every
+status element are generated at random.
+'''
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))               # root/
+sys.path.insert(0, os.path.join(here, '..'))                           # moteConnector/
+
+import random
+import struct
+import timeit
+
+import OpenParser
+import ParserStatus
+import openvisualizer.openvisualizer_utils as u
+
+#============================ defines =========================================
+
+NUM_FRAMES     = 10000
+NUM_REPEAT     = 3
+
+#============================ helpers =========================================
+
+def loadFrames(filename):
+    with open(filename) as f:
+        return [u.hex2buf(l.strip()) for l in f if l.strip()]
+
+def generateFrames():
+    random.seed(0)
+    keys   = ParserStatus.ParserStatus().fieldsParsingKeys
+    frames = []
+    for _ in range(NUM_FRAMES):
+        key     = random.choice(keys)
+        frames += [
+            [OpenParser.OpenParser.SERFRAME_MOTE2PC_STATUS,0x01,0x00,key.val]+
+            [random.randint(0x00,0xff) for _ in range(struct.calcsize(key.structure))]
+        ]
+    return frames
+
+#============================ main ============================================
+
+def main():
+    if len(sys.argv)>1:
+        frames = loadFrames(sys.argv[1])
+    else:
+        frames = generateFrames()
+    
+    parser = OpenParser.OpenParser()
+    
+    def run():
+        for f in frames:
+            try:
+                parser.parseInput(f)
+            except Exception:
+                pass
+    
+    duration = min(timeit.repeat(run, repeat=NUM_REPEAT, number=1))
+    print '{0} frames: {1:.0f} frames/s'.format(len(frames), len(frames)/duration)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))               # root/
+sys.path.insert(0, os.path.join(here, '..'))                           # moteConnector/
+
+import logging
+import logging.handlers
+import random
+import struct
+
+import pytest
+
+import OpenParser
+import ParserStatus
+from ParserException import ParserException
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_parser.log'
+
+import logging
+log = logging.getLogger('test_parser')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_parser',
+                   'ParserStatus',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ fixtures ========================================
+
+STATUSKEYS = ParserStatus.ParserStatus().fieldsParsingKeys
+
+@pytest.fixture(params=STATUSKEYS, ids=[k.name for k in STATUSKEYS])
+def statusKey(request):
+    return request.param
+
+#============================ helpers =========================================
+
+def statusFrame(statusElem,payload):
+    return [0x34,0x12,statusElem]+payload
+
+#============================ tests ===========================================
+
+def test_parseStatus(statusKey):
+    
+    log.debug("\n---------- test_parseStatus {0}".format(statusKey.name))
+    
+    parser   = ParserStatus.ParserStatus()
+    
+    for _ in range(20):
+        payload  = [random.randint(0x00,0xff) for _ in range(struct.calcsize(statusKey.structure))]
+        expected = struct.unpack(statusKey.structure,''.join([chr(b) for b in payload]))
+        
+        for frame in [statusFrame(statusKey.val,payload),bytearray(statusFrame(statusKey.val,payload))]:
+            (eventSubType,parsed) = parser.parseInput(frame)
+            
+            assert eventSubType=='status'
+            assert type(parsed).__name__=='Tuple_'+statusKey.name
+            assert tuple(parsed)==expected
+
+def test_parseStatusWrongLength(statusKey):
+    
+    log.debug("\n---------- test_parseStatusWrongLength {0}".format(statusKey.name))
+    
+    parser   = ParserStatus.ParserStatus()
+    payload  = [0x00]*(struct.calcsize(statusKey.structure)+1)
+    
+    with pytest.raises(ParserException) as err:
+        parser.parseInput(statusFrame(statusKey.val,payload))
+    assert err.value.errorCode==ParserException.DESERIALIZE
+
+def test_parseStatusUnknown():
+    
+    log.debug("\n---------- test_parseStatusUnknown")
+    
+    parser   = ParserStatus.ParserStatus()
+    
+    with pytest.raises(ParserException) as err:
+        parser.parseInput(statusFrame(0xff,[0x00]))
+    assert err.value.errorCode==ParserException.NO_KEY
+
+def test_openParser():
+    
+    log.debug("\n---------- test_openParser")
+    
+    parser   = OpenParser.OpenParser()
+    
+    (eventSubType,parsed) = parser.parseInput([OpenParser.OpenParser.SERFRAME_MOTE2PC_STATUS]+statusFrame(0,[0x01]))
+    assert eventSubType=='status'
+    assert parsed.isSync==1
+    
+    (eventSubType,parsed) = parser.parseInput([OpenParser.OpenParser.SERFRAME_MOTE2PC_SNIFFED_PACKET,0x01,0x02,0x03])
+    assert eventSubType=='sniffedPacket'
+    assert parsed==[0x03]
+    
+    with pytest.raises(ParserException) as err:
+        parser.parseInput([ord('?'),0x00])
+    assert err.value.errorCode==ParserException.NO_KEY
@@ -146,9 +146,7 @@ class moteProbe(threading.Thread):
         
         # local variables
         self.hdlc                 = OpenHdlc.OpenHdlc()
-        self.lastRxByte           = self.hdlc.HDLC_FLAG
-        self.busyReceiving        = False
-        self.inputBuf             = ''
+        self.deframer             = OpenHdlc.OpenHdlcDeframer()
         self.outputBuf            = []
         self.outputBufLock        = threading.RLock()
         self.dataLock             = threading.Lock()
@@ -199,12 +197,19 @@ class moteProbe(threading.Thread):
                 else:
                     raise SystemError()
                 
+                # drop partial frame from a previous connection
+                self.deframer.reset()
+                
                 while self.goOn: # read bytes from serial port
                     try:
                         if   self.mode==self.MODE_SERIAL:
+                            # block for the first byte, then drain whatever is waiting
                             rxBytes = self.serial.read(1)
-                            if rxBytes == 0: # timeout
+                            if not rxBytes: # timeout
                                 continue
+                            numWaiting = self.serial.inWaiting()
+                            if numWaiting:
+                                rxBytes += self.serial.read(numWaiting)
                         elif self.mode==self.MODE_EMULATED:
                             rxBytes = self.serial.read()
                         elif self.mode==self.MODE_IOTLAB:
@@ -217,57 +222,8 @@ class moteProbe(threading.Thread):
                         time.sleep(1)
                         break
                     else:
-                        for rxByte in rxBytes:
-                            if      (
-                                        (not self.busyReceiving)             and 
-                                        self.lastRxByte==self.hdlc.HDLC_FLAG and
-                                        rxByte!=self.hdlc.HDLC_FLAG
-                                    ):
-                                # start of frame
-                                if log.isEnabledFor(logging.DEBUG):
-                                    log.debug("{0}: start of hdlc frame {1} {2}".format(self.name, u.formatStringBuf(self.hdlc.HDLC_FLAG), u.formatStringBuf(rxByte)))
-                                self.busyReceiving       = True
-                                self.inputBuf            = self.hdlc.HDLC_FLAG
-                                self.inputBuf           += rxByte
-                            elif    (
-                                        self.busyReceiving                   and
-                                        rxByte!=self.hdlc.HDLC_FLAG
-                                    ):
-                                # middle of frame
-                                
-                                self.inputBuf           += rxByte
-                            elif    (
-                                        self.busyReceiving                   and
-                                        rxByte==self.hdlc.HDLC_FLAG
-                                    ):
-                                # end of frame
-                                if log.isEnabledFor(logging.DEBUG):
-                                    log.debug("{0}: end of hdlc frame {1} ".format(self.name, u.formatStringBuf(rxByte)))
-                                self.busyReceiving       = False
-                                self.inputBuf           += rxByte
-                                
-                                try:
-                                    tempBuf = self.inputBuf
-                                    self.inputBuf        = self.hdlc.dehdlcify(self.inputBuf)
-                                    if log.isEnabledFor(logging.DEBUG):
-                                        log.debug("{0}: {2} dehdlcized input: {1}".format(self.name, u.formatStringBuf(self.inputBuf), u.formatStringBuf(tempBuf)))
-                                except OpenHdlc.HdlcException as err:
-                                    log.warning('{0}: invalid serial frame: {2} {1}'.format(self.name, err, u.formatStringBuf(tempBuf)))
-                                else:
-                                    if self.inputBuf==chr(OpenParser.OpenParser.SERFRAME_MOTE2PC_REQUEST):
-                                        with self.outputBufLock:
-                                            if self.outputBuf:
-                                                outputToWrite = self.outputBuf.pop(0)
-                                                self.serial.write(outputToWrite)
-                                    else:
-                                        # dispatch
-                                        dispatcher.send(
-                                            sender        = self.name,
-                                            signal        = 'fromMoteProbe@'+self.portname,
-                                            data          = [ord(c) for c in self.inputBuf],
-                                        )
-                            
-                            self.lastRxByte = rxByte
+                        for frame in self.deframer.feed(rxBytes):
+                            self._handleFrame(frame)
                         
                     if self.mode==self.MODE_EMULATED:
                         self.serial.doneReading()
@@ -295,6 +251,31 @@ class moteProbe(threading.Thread):
     
     #======================== private =========================================
     
+    def _handleFrame(self,frame):
+        
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("{0}: received hdlc frame {1}".format(self.name, u.formatStringBuf(frame)))
+        
+        try:
+            inputBuf = self.hdlc.dehdlcify(frame)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("{0}: {2} dehdlcized input: {1}".format(self.name, u.formatStringBuf(inputBuf), u.formatStringBuf(frame)))
+        except OpenHdlc.HdlcException as err:
+            log.warning('{0}: invalid serial frame: {2} {1}'.format(self.name, err, u.formatStringBuf(frame)))
+        else:
+            if inputBuf==chr(OpenParser.OpenParser.SERFRAME_MOTE2PC_REQUEST):
+                with self.outputBufLock:
+                    if self.outputBuf:
+                        outputToWrite = self.outputBuf.pop(0)
+                        self.serial.write(outputToWrite)
+            else:
+                # dispatch
+                dispatcher.send(
+                    sender        = self.name,
+                    signal        = 'fromMoteProbe@'+self.portname,
+                    data          = [ord(c) for c in inputBuf],
+                )
+    
     def _bufferDataToSend(self,data):
         
         # abort for IoT-LAB
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+'''
+Micro-benchmark of the HDLC codec.
+
+Reports the number of frames per second hdlcify() and dehdlcify() process,
+with the C CRC and with the pure-Python fallback. Run directly::
+
+    python bench_hdlc.py
+'''
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))               # root/
+sys.path.insert(0, os.path.join(here, '..'))                           # moteProbe/
+
+import random
+import timeit
+
+import OpenHdlc
+import openvisualizer.openvisualizer_utils as u
+
+#============================ defines =========================================
+
+FRAME_LENGTHS  = [10, 40, 127]
+NUM_FRAMES     = 1000
+NUM_REPEAT     = 3
+
+#============================ helpers =========================================
+
+def bench(label, func, frames):
+    def run():
+        for f in frames:
+            func(f)
+    duration = min(timeit.repeat(run, repeat=NUM_REPEAT, number=1))
+    print '   {0:<12} {1:>10.0f} frames/s'.format(label, len(frames)/duration)
+
+def benchAll(label, frames):
+    print label
+    hdlc      = OpenHdlc.OpenHdlc()
+    hdlcified = [hdlc.hdlcify(f) for f in frames]
+    bench('hdlcify',   hdlc.hdlcify,   frames)
+    bench('dehdlcify', hdlc.dehdlcify, hdlcified)
+
+#============================ main ============================================
+
+def main():
+    random.seed(0)
+    
+    crc_hqx = u.crcHqx
+    for frameLen in FRAME_LENGTHS:
+        frames = [
+            ''.join([chr(random.randint(0x00,0xff)) for _ in range(frameLen)])
+            for _ in range(NUM_FRAMES)
+        ]
+        
+        u.crcHqx = crc_hqx
+        benchAll('{0}B frames, C CRC:'.format(frameLen), frames)
+        
+        u.crcHqx = None
+        benchAll('{0}B frames, Python CRC:'.format(frameLen), frames)
+    u.crcHqx = crc_hqx
+
+if __name__=="__main__":
+    main()
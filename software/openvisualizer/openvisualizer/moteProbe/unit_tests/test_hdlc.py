@@ -117,3 +117,87 @@ def test_randdomBackAndForth(randomFrame):
     log.debug("dehdlcified:    {0}".format(u.formatStringBuf(frameDehdlcified)))
     
     assert frameDehdlcified==randomFrame
+
+def test_deframerSplitReads(randomFrame):
+    
+    randomFrame = json.loads(randomFrame)
+    randomFrame = ''.join([chr(b) for b in randomFrame])
+    
+    log.debug("\n---------- test_deframerSplitReads")
+    
+    hdlc     = OpenHdlc.OpenHdlc()
+    deframer = OpenHdlc.OpenHdlcDeframer()
+    
+    # two copies of the frame, delivered in reads of random length
+    stream   = hdlc.hdlcify(randomFrame)*2
+    frames   = []
+    while stream:
+        readLen  = random.randint(1,len(stream))
+        frames  += deframer.feed(stream[:readLen])
+        stream   = stream[readLen:]
+    
+    assert len(frames)==2
+    for frame in frames:
+        assert hdlc.dehdlcify(frame)==randomFrame
+
+def test_deframerBatch():
+    
+    log.debug("\n---------- test_deframerBatch")
+    
+    hdlc     = OpenHdlc.OpenHdlc()
+    deframer = OpenHdlc.OpenHdlcDeframer()
+    
+    payloads = ['\x53','\x7e\x7d\x01','\x44\x02\x03']
+    stream   = ''.join([hdlc.hdlcify(p) for p in payloads])
+    
+    # partial frame is kept until its closing flag is received
+    frames   = deframer.feed(stream[:-1])
+    assert [hdlc.dehdlcify(f) for f in frames]==payloads[:-1]
+    frames   = deframer.feed(stream[-1:])
+    assert [hdlc.dehdlcify(f) for f in frames]==payloads[-1:]
+    
+    # no frame in flags only
+    assert deframer.feed(hdlc.HDLC_FLAG*3)==[]
+
+def test_pythonFallback(randomFrame, monkeypatch):
+    
+    randomFrame = json.loads(randomFrame)
+    randomFrame = ''.join([chr(b) for b in randomFrame])
+    
+    log.debug("\n---------- test_pythonFallback")
+    
+    hdlc = OpenHdlc.OpenHdlc()
+    
+    frameHdlcified = hdlc.hdlcify(randomFrame)
+    
+    # same CRC and same frame without the C CRC
+    monkeypatch.setattr(u, 'crcHqx', None)
+    
+    assert hdlc.hdlcify(randomFrame)==frameHdlcified
+    assert hdlc.dehdlcify(frameHdlcified)==randomFrame
+
+def test_bufferTypes():
+    
+    log.debug("\n---------- test_bufferTypes")
+    
+    hdlc  = OpenHdlc.OpenHdlc()
+    
+    frame = '\x53\x7e\x11\x7d\x22'
+    
+    frameHdlcified = hdlc.hdlcify(frame)
+    assert hdlc.hdlcify(bytearray(frame))==frameHdlcified
+    assert hdlc.hdlcify(memoryview(frame))==frameHdlcified
+    assert hdlc.dehdlcify(bytearray(frameHdlcified))==frame
+    assert hdlc.dehdlcify(memoryview(frameHdlcified))==frame
+
+def test_wrongCrc():
+    
+    log.debug("\n---------- test_wrongCrc")
+    
+    hdlc  = OpenHdlc.OpenHdlc()
+    
+    frameHdlcified = hdlc.hdlcify('\x53\x11\x22')
+    frameHdlcified = frameHdlcified[:2]+'\x00'+frameHdlcified[3:]
+    
+    with pytest.raises(OpenHdlc.HdlcException):
+        hdlc.dehdlcify(frameHdlcified)
@@ -0,0 +1,201 @@
+# Copyright (c) 2010-2013, Regents of the University of California.
+# All rights reserved.
+#
+# Released under the BSD 3-Clause license as published at the link below.
+# https://openwsn.atlassian.net/wiki/display/OW/License
+'''
+Contains the StateHistory class, which records how the numeric values of
+the state of a mote evolve, and the ring buffers it stores them in.
+'''
+import logging
+log = logging.getLogger('StateHistory')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+import array
+import threading
+import time
+
+class RingBuffer(object):
+    '''
+    Columns of timestamps and values, of fixed size, in which the oldest
+    sample is overwritten by the newest one once full.
+    '''
+    
+    def __init__(self,capacity):
+        self.capacity             = capacity
+        self.timestamps           = array.array('d',[0.0])*capacity
+        self.values               = array.array('d',[0.0])*capacity
+        self.start                = 0    # index of the oldest sample
+        self.count                = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def append(self,ts,value):
+        i = (self.start+self.count)%self.capacity
+        self.timestamps[i]        = ts
+        self.values[i]            = value
+        if self.count<self.capacity:
+            self.count           += 1
+        else:
+            self.start            = (self.start+1)%self.capacity
+    
+    def getRange(self,tsFrom=None,tsTo=None):
+        '''
+        Returns the samples timestamped between tsFrom and tsTo, both
+        included, as a list of (ts,value), oldest first.
+        '''
+        returnVal = []
+        if tsFrom is None:
+            n = 0
+        else:
+            n = self._bisect(tsFrom)
+        while n<self.count:
+            i  = (self.start+n)%self.capacity
+            ts = self.timestamps[i]
+            if tsTo is not None and ts>tsTo:
+                break
+            returnVal.append((ts,self.values[i]))
+            n += 1
+        return returnVal
+    
+    def _bisect(self,ts):
+        '''
+        Returns the position, from the oldest sample, of the first sample
+        timestamped ts or later.
+        '''
+        lo = 0
+        hi = self.count
+        while lo<hi:
+            mid = (lo+hi)//2
+            if self.timestamps[(self.start+mid)%self.capacity]<ts:
+                lo = mid+1
+            else:
+                hi = mid
+        return lo
+
+class DownsampledBuffer(RingBuffer):
+    '''
+    A RingBuffer of the average of the samples over each period, timestamped
+    with the start of the period.
+    
+    The average of the current period is stored once a sample of a later
+    period is added, but is returned by getRange() in the meantime.
+    '''
+    
+    def __init__(self,capacity,period):
+        RingBuffer.__init__(self,capacity)
+        self.period               = period
+        self.periodStart          = None
+        self.periodSum            = 0.0
+        self.periodCount          = 0
+    
+    def add(self,ts,value):
+        periodStart = ts-ts%self.period
+        if periodStart!=self.periodStart:
+            if self.periodCount:
+                self.append(self.periodStart,self.periodSum/self.periodCount)
+            self.periodStart      = periodStart
+            self.periodSum        = 0.0
+            self.periodCount      = 0
+        self.periodSum           += value
+        self.periodCount         += 1
+    
+    def getRange(self,tsFrom=None,tsTo=None):
+        returnVal = RingBuffer.getRange(self,tsFrom,tsTo)
+        if (
+                self.periodCount                                    and
+                (tsFrom is None or self.periodStart>=tsFrom)        and
+                (tsTo   is None or self.periodStart<=tsTo)
+            ):
+            returnVal.append((self.periodStart,self.periodSum/self.periodCount))
+        return returnVal
+
+class StateHistory(object):
+    '''
+    Append-only history of the numeric values of the state elements of a
+    mote.
+    
+    Each (state element, field) is a series, stored in a RingBuffer of its
+    raw samples and in a DownsampledBuffer per tier. Buffers are allocated
+    at their full size, and at most MAX_SERIES series are recorded, so the
+    memory used per mote is bounded.
+    '''
+    
+    TIER_RAW            = 'raw'
+    RAW_SIZE            = 128    # samples
+    TIERS               = [
+        # name          period (s)   number of periods
+        ('10s',         10,          360),    # 1 hour
+        ('1min',        60,          240),    # 4 hours
+    ]
+    MAX_SERIES          = 256
+    
+    def __init__(self):
+        
+        # local variables
+        self.dataLock             = threading.Lock()
+        self.series               = {}    # (elemName,field) -> [RingBuffer, DownsampledBuffer per tier]
+        self.numDropped           = 0     # values of series beyond MAX_SERIES
+    
+    #======================== public ==========================================
+    
+    def record(self,elemName,values,ts=None):
+        '''
+        Append values to the series of a state element.
+        
+        :param elemName: Name of the state element.
+        :param values:   Dictionary {field: number}.
+        :param ts:       Timestamp of the values, now by default.
+        '''
+        
+        if ts is None:
+            ts = time.time()
+        
+        with self.dataLock:
+            for (field,value) in values.items():
+                buffers = self.series.get((elemName,field))
+                if buffers is None:
+                    if len(self.series)>=self.MAX_SERIES:
+                        if not self.numDropped:
+                            log.warning('more than {0} series, not recording {1}.{2}'.format(
+                                self.MAX_SERIES,elemName,field))
+                        self.numDropped += 1
+                        continue
+                    buffers = [RingBuffer(self.RAW_SIZE)]+[
+                        DownsampledBuffer(size,period) for (_,period,size) in self.TIERS
+                    ]
+                    self.series[(elemName,field)] = buffers
+                buffers[0].append(ts,value)
+                for buf in buffers[1:]:
+                    buf.add(ts,value)
+    
+    def getTierNames(self):
+        return [self.TIER_RAW]+[name for (name,_,_) in self.TIERS]
+    
+    def getSeriesNames(self):
+        '''
+        Returns the (elemName,field) of the series recorded, sorted.
+        '''
+        with self.dataLock:
+            return sorted(self.series.keys())
+    
+    def query(self,elemName,field,tier=TIER_RAW,tsFrom=None,tsTo=None):
+        '''
+        Returns the samples of a series timestamped between tsFrom and tsTo,
+        both included, as a list of (ts,value), oldest first.
+        
+        :param tier: One of getTierNames(); the samples of a downsampled
+                     tier are the averages over its periods.
+        '''
+        
+        tierNames = self.getTierNames()
+        if tier not in tierNames:
+            raise ValueError('No tier named {0}'.format(tier))
+        
+        with self.dataLock:
+            buffers = self.series.get((elemName,field))
+            if buffers is None:
+                return []
+            return buffers[tierNames.index(tier)].getRange(tsFrom,tsTo)
@@ -0,0 +1,129 @@
+# Copyright (c) 2010-2013, Regents of the University of California.
+# All rights reserved.
+#
+# Released under the BSD 3-Clause license as published at the link below.
+# https://openwsn.atlassian.net/wiki/display/OW/License
+'''
+Contains the moteIndex class, which finds the moteState of a mote from its
+addresses or serial port.
+'''
+import logging
+log = logging.getLogger('moteIndex')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+import threading
+
+from openvisualizer.eventBus      import eventBusClient
+
+class moteIndex(eventBusClient.eventBusClient):
+    '''
+    Index of the moteStates by 16-bit ID, EUI64 and serial port.
+    
+    moteStates are added and removed explicitly, and are indexed by their
+    addresses as they announce them with an 'infoMoteId' signal.
+    '''
+    
+    def __init__(self):
+        
+        # local variables
+        self.dataLock             = threading.Lock()
+        self.bySerialPort         = {}    # serial port -> moteState
+        self.by16bId              = {}    # 16-bit ID, as hex string -> moteState
+        self.byEui64              = {}    # EUI64, as tuple -> moteState
+        self.ids                  = {}    # serial port -> (16-bit ID, EUI64)
+        
+        # initialize parent class
+        eventBusClient.eventBusClient.__init__(
+            self,
+            name                  = 'moteIndex',
+            registrations         =  [
+                {
+                    'sender'      : self.WILDCARD,
+                    'signal'      : 'infoMoteId',
+                    'callback'    : self._infoMoteId_notif,
+                },
+            ]
+        )
+    
+    #======================== public ==========================================
+    
+    def add(self,ms):
+        '''
+        Indexes a moteState, by the addresses it already knows, if any.
+        '''
+        serialPort = ms.moteConnector.serialport
+        idManager  = ms.getStateElem(ms.ST_IDMANAGER)
+        with self.dataLock:
+            self.bySerialPort[serialPort] = ms
+            if idManager.data:
+                self._setIds(
+                    serialPort,
+                    idManager.data[0]['my16bID'].addr,
+                    idManager.data[0]['my64bID'].addr,
+                )
+    
+    def remove(self,ms):
+        serialPort = ms.moteConnector.serialport
+        with self.dataLock:
+            if self.bySerialPort.get(serialPort) is not ms:
+                return
+            self._clearIds(serialPort)
+            del self.bySerialPort[serialPort]
+    
+    def getBySerialPort(self,serialPort):
+        with self.dataLock:
+            return self.bySerialPort.get(serialPort)
+    
+    def getBy16bId(self,moteid):
+        '''
+        :param moteid: 16-bit ID of the mote, as an hex string, e.g. '0a01'.
+        '''
+        with self.dataLock:
+            return self.by16bId.get(moteid.lower())
+    
+    def getByEui64(self,eui64):
+        '''
+        :param eui64: EUI64 of the mote, as a list of 8 bytes.
+        '''
+        with self.dataLock:
+            return self.byEui64.get(tuple(eui64))
+    
+    def getMoteId(self,serialPort):
+        '''
+        Returns the 16-bit ID of the mote on a serial port, as an hex string,
+        or None if the mote has not reported it yet.
+        '''
+        with self.dataLock:
+            return self.ids.get(serialPort,(None,None))[0]
+    
+    #======================== private =========================================
+    
+    def _infoMoteId_notif(self,sender,signal,data):
+        '''
+        Called from the thread of the moteState, which holds its state lock,
+        so the moteState can not be accessed here.
+        '''
+        with self.dataLock:
+            if data['serialPort'] not in self.bySerialPort:
+                return
+            self._setIds(data['serialPort'],data['my16bID'],data['my64bID'])
+    
+    def _setIds(self,serialPort,my16bID,my64bID):
+        self._clearIds(serialPort)
+        ms    = self.bySerialPort[serialPort]
+        id16b = ''.join(['%02x'%b for b in my16bID])
+        eui64 = tuple(my64bID)
+        self.by16bId[id16b]       = ms
+        self.byEui64[eui64]       = ms
+        self.ids[serialPort]      = (id16b,eui64)
+        log.debug('indexed {0} as {1}'.format(serialPort,id16b))
+    
+    def _clearIds(self,serialPort):
+        if serialPort not in self.ids:
+            return
+        (id16b,eui64) = self.ids.pop(serialPort)
+        if self.by16bId.get(id16b) is self.bySerialPort[serialPort]:
+            del self.by16bId[id16b]
+        if self.byEui64.get(eui64) is self.bySerialPort[serialPort]:
+            del self.byEui64[eui64]
@@ -19,6 +19,7 @@ import threading
 import json
 
 from openvisualizer.moteConnector import ParserStatus
+from openvisualizer.moteState     import StateHistory
 from openvisualizer.eventBus      import eventBusClient
 from openvisualizer.openType      import openType,         \
                                          typeAsn,          \
@@ -39,12 +40,17 @@ class StateElem(object):
     Abstract superclass for internal mote state classes.
     '''
     
+    # notification fields recorded in the history, None for all numeric ones
+    HISTORY_FIELDS = None
+    
     def __init__(self):
         self.meta                      = [{}]
         self.data                      = []
         
         self.meta[0]['numUpdates']     = 0
         self.meta[0]['lastUpdated']    = None
+        
+        self.jsonCache                 = {}    # (aspect,isPrettyPrint) -> (numUpdates,json)
     
     #======================== public ==========================================
     
@@ -52,10 +58,16 @@ class StateElem(object):
         self.meta[0]['lastUpdated']    = time.time()
         self.meta[0]['numUpdates']    += 1
     
+    def getNumUpdates(self):
+        return self.meta[0]['numUpdates']
+    
     def toJson(self, aspect='all', isPrettyPrint=False):
         '''
         Dumps state to JSON.
         
+        The JSON is cached until the next update of the state, so dumping
+        a state which did not change is cheap.
+        
         :param aspect: 
                The particular aspect of the state object to dump, or the 
                default 'all' for all aspects. Aspect names:
@@ -69,6 +81,13 @@ class StateElem(object):
                 for the meta and data aspects. Otherwise, the JSON
                 is a list of the selected aspect's content.
         '''
+        # read before dumping, so an update while dumping invalidates the cache
+        numUpdates = self.meta[0]['numUpdates']
+        
+        cached = self.jsonCache.get((aspect,isPrettyPrint))
+        if cached and cached[0]==numUpdates:
+            return cached[1]
+        
         content = None
         if aspect   == 'all':
             content = self._toDict()
@@ -79,13 +98,34 @@ class StateElem(object):
         else:
             raise ValueError('No aspect named {0}'.format(aspect))
         
-        return json.dumps(content,
-                          sort_keys = bool(isPrettyPrint),
-                          indent    = 4 if isPrettyPrint else None)
+        returnVal = json.dumps(content,
+                               sort_keys = bool(isPrettyPrint),
+                               indent    = 4 if isPrettyPrint else None)
+        
+        self.jsonCache[(aspect,isPrettyPrint)] = (numUpdates,returnVal)
+        
+        return returnVal
     
     def __str__(self):
         return self.toJson(isPrettyPrint=True)
     
+    def getHistoryValues(self,notif):
+        '''
+        Returns the values to record in the history of the state, as a
+        dictionary {field: number}, given the notification it was updated
+        with.
+        '''
+        if self.HISTORY_FIELDS is None:
+            fields = notif._fields
+        else:
+            fields = self.HISTORY_FIELDS
+        returnVal = {}
+        for field in fields:
+            value = getattr(notif,field)
+            if isinstance(value,(int,long,float)):
+                returnVal[field] = value
+        return returnVal
+    
     #======================== private =========================================
     
     def _toDict(self):
@@ -130,6 +170,9 @@ class StateOutputBuffer(StateElem):
 
 class StateAsn(StateElem):
     
+    def getHistoryValues(self,notif):
+        return {'asn': (notif.asn_4<<32)+(notif.asn_2_3<<16)+notif.asn_0_1}
+    
     def update(self,notif):
         StateElem.update(self)
         if len(self.data)==0:
@@ -141,6 +184,9 @@ class StateAsn(StateElem):
                                    notif.asn_4)
 class StateJoined(StateElem):
     
+    def getHistoryValues(self,notif):
+        return {'joinedAsn': (notif.joinedAsn_4<<32)+(notif.joinedAsn_2_3<<16)+notif.joinedAsn_0_1}
+    
     def update(self,notif):
         StateElem.update(self)
         if len(self.data)==0:
@@ -153,6 +199,12 @@ class StateJoined(StateElem):
 
 class StateMacStats(StateElem):
     
+    def getHistoryValues(self,notif):
+        returnVal = StateElem.getHistoryValues(self,notif)
+        if notif.numTicsTotal!=0:
+            returnVal['dutyCycle']          = (float(notif.numTicsOn)/float(notif.numTicsTotal))*100
+        return returnVal
+    
     def update(self,notif):
         StateElem.update(self)
         if len(self.data)==0:
@@ -169,7 +221,9 @@ class StateMacStats(StateElem):
             self.data[0]['dutyCycle']       = '?'
 
 class StateScheduleRow(StateElem):
-
+    
+    HISTORY_FIELDS = ['numRx','numTx','numTxACK']
+    
     def update(self,notif):
         StateElem.update(self)
         if len(self.data)==0:
@@ -225,6 +279,13 @@ class StateQueue(StateElem):
         for i in range(10):
             self.data.append(StateQueueRow())
     
+    def getHistoryValues(self,notif):
+        depth = 0
+        for i in range(10):
+            if getattr(notif,'owner_{0}'.format(i))!=typeComponent.typeComponent.COMPONENT_NULL:
+                depth += 1
+        return {'depth': depth}
+    
     def update(self,notif):
         StateElem.update(self)
         self.data[0].update(notif.creator_0,notif.owner_0)
@@ -240,6 +301,8 @@ class StateQueue(StateElem):
 
 class StateNeighborsRow(StateElem):
     
+    HISTORY_FIELDS = ['used','parentPreference','DAGrank','rssi','numRx','numTx','numTxACK']
+    
     def update(self,notif):
         StateElem.update(self)
         if len(self.data)==0:
@@ -284,6 +347,8 @@ class StateIsSync(StateElem):
 
 class StateIdManager(StateElem):
     
+    HISTORY_FIELDS = ['isDAGroot']
+    
     def __init__(self,eventBusClient,moteConnector):
         StateElem.__init__(self)
         self.eventBusClient  = eventBusClient
@@ -298,6 +363,9 @@ class StateIdManager(StateElem):
     
     def update(self,notif):
     
+        # remember the addresses, to announce when they change
+        oldIds = self._getIds()
+        
         # update state
         StateElem.update(self)
         if len(self.data)==0:
@@ -364,6 +432,24 @@ class StateIdManager(StateElem):
         
         # record isDAGroot
         self.isDAGroot = self.data[0]['isDAGroot']
+        
+        # announce the addresses of the mote to the eventBus
+        if oldIds!=self._getIds():
+            
+            # dispatch
+            self.eventBusClient.dispatch(
+                signal        = 'infoMoteId',
+                data          = {
+                                    'my16bID':      self.data[0]['my16bID'].addr[:],
+                                    'my64bID':      self.data[0]['my64bID'].addr[:],
+                                    'serialPort':   self.moteConnector.serialport,
+                                },
+            )
+    
+    def _getIds(self):
+        if not self.data:
+            return None
+        return (self.data[0]['my16bID'].addr[:],self.data[0]['my64bID'].addr[:])
 
 class StateMyDagRank(StateElem):
     
@@ -390,6 +476,15 @@ class StateTable(StateElem):
             self.meta[0]['columnOrder']     = columnOrder
         self.data                           = []
 
+    def getHistoryValues(self,notif):
+        '''
+        The fields of each row are recorded as <row>.<field>.
+        '''
+        returnVal = {}
+        for (field,value) in self.data[notif.row].getHistoryValues(notif).items():
+            returnVal['{0}.{1}'.format(notif.row,field)] = value
+        return returnVal
+    
     def update(self,notif):
         StateElem.update(self)
         while len(self.data)<notif.row+1:
@@ -548,33 +643,28 @@ class moteState(eventBusClient.eventBusClient):
         self.state[self.ST_MYDAGRANK]       = StateMyDagRank()
         self.state[self.ST_KAPERIOD]        = StatekaPeriod()
         
-        self.notifHandlers = {
-            self.parserStatus.named_tuple[self.ST_OUPUTBUFFER]:
-                self.state[self.ST_OUPUTBUFFER].update,
-            self.parserStatus.named_tuple[self.ST_ASN]:
-                self.state[self.ST_ASN].update,
-            self.parserStatus.named_tuple[self.ST_MACSTATS]:
-                self.state[self.ST_MACSTATS].update,
-            self.parserStatus.named_tuple[self.ST_SCHEDULEROW]:
-                self.state[self.ST_SCHEDULE].update,
-            self.parserStatus.named_tuple[self.ST_BACKOFF]:
-                self.state[self.ST_BACKOFF].update,
-            self.parserStatus.named_tuple[self.ST_QUEUEROW]:
-                self.state[self.ST_QUEUE].update,
-            self.parserStatus.named_tuple[self.ST_NEIGHBORSROW]:
-                self.state[self.ST_NEIGHBORS].update,
-            self.parserStatus.named_tuple[self.ST_ISSYNC]:
-                self.state[self.ST_ISSYNC].update,
-            self.parserStatus.named_tuple[self.ST_IDMANAGER]:
-                self.state[self.ST_IDMANAGER].update,
-            self.parserStatus.named_tuple[self.ST_MYDAGRANK]:
-                self.state[self.ST_MYDAGRANK].update,
-            self.parserStatus.named_tuple[self.ST_KAPERIOD]:
-                self.state[self.ST_KAPERIOD].update,
-            self.parserStatus.named_tuple[self.ST_JOINED]:
-                self.state[self.ST_JOINED].update,
-
-        }
+        self.history                        = StateHistory.StateHistory()
+        
+        # notification -> (name of the state element it updates, state element)
+        self.notifHandlers = {}
+        for (notifName,elemName) in [
+                (self.ST_OUPUTBUFFER,     self.ST_OUPUTBUFFER),
+                (self.ST_ASN,             self.ST_ASN),
+                (self.ST_MACSTATS,        self.ST_MACSTATS),
+                (self.ST_SCHEDULEROW,     self.ST_SCHEDULE),
+                (self.ST_BACKOFF,         self.ST_BACKOFF),
+                (self.ST_QUEUEROW,        self.ST_QUEUE),
+                (self.ST_NEIGHBORSROW,    self.ST_NEIGHBORS),
+                (self.ST_ISSYNC,          self.ST_ISSYNC),
+                (self.ST_IDMANAGER,       self.ST_IDMANAGER),
+                (self.ST_MYDAGRANK,       self.ST_MYDAGRANK),
+                (self.ST_KAPERIOD,        self.ST_KAPERIOD),
+                (self.ST_JOINED,          self.ST_JOINED),
+            ]:
+            self.notifHandlers[self.parserStatus.named_tuple[notifName]] = (
+                elemName,
+                self.state[elemName],
+            )
         
         # initialize parent class
         eventBusClient.eventBusClient.__init__(
@@ -610,6 +700,36 @@ class moteState(eventBusClient.eventBusClient):
         
         return returnVal
     
+    def getStateElemJson(self,elemName,aspect='data'):
+        '''
+        Dumps a state element to JSON, while it is not being updated.
+        '''
+        
+        if elemName not in self.state:
+            raise ValueError('No state called {0}'.format(elemName))
+        
+        with self.stateLock:
+            return self.state[elemName].toJson(aspect)
+    
+    def getStateElemRows(self,elemName):
+        '''
+        Returns the number of updates and the JSON data of each row of a
+        state element, as a list of (numUpdates,json). A state element whose
+        rows are not state elements themselves is a single row.
+        '''
+        
+        if elemName not in self.state:
+            raise ValueError('No state called {0}'.format(elemName))
+        
+        with self.stateLock:
+            elem = self.state[elemName]
+            if elem.data and isinstance(elem.data[0],StateElem):
+                return [(row.getNumUpdates(),row.toJson('data')) for row in elem.data]
+            return [(elem.getNumUpdates(),elem.toJson('data'))]
+    
+    def getHistory(self):
+        return self.history
+    
     def triggerAction(self,action):
         
         # dispatch
@@ -634,10 +754,11 @@ class moteState(eventBusClient.eventBusClient):
         
         # call handler
         found = False
-        for k,v in self.notifHandlers.items():
+        for k,(elemName,elem) in self.notifHandlers.items():
             if self._isnamedtupleinstance(data,k):
                 found = True
-                v(data)
+                elem.update(data)
+                self.history.record(elemName,elem.getHistoryValues(data))
                 break
         
         # unlock the state data
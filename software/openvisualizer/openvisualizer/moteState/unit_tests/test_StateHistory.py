@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # moteState/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import collections
+import logging
+import logging.handlers
+
+import pytest
+
+import StateHistory
+from openvisualizer.moteState import moteState
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_StateHistory.log'
+
+import logging
+log = logging.getLogger('test_StateHistory')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_StateHistory',
+                   'StateHistory',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ tests ===========================================
+
+def test_ringBuffer():
+
+    log.debug("\n---------- test_ringBuffer")
+
+    buf = StateHistory.RingBuffer(10)
+    for i in range(25):
+        buf.append(float(i),float(2*i))
+
+    assert len(buf)==10
+    assert buf.getRange()==[(float(i),float(2*i)) for i in range(15,25)]
+    assert buf.getRange(17.5,20)==[(float(i),float(2*i)) for i in range(18,21)]
+    assert buf.getRange(30)==[]
+    assert buf.getRange(None,14)==[]
+
+def test_downsampled():
+
+    log.debug("\n---------- test_downsampled")
+
+    buf = StateHistory.DownsampledBuffer(3,10)
+    for ts in range(45):
+        buf.add(float(ts),float(ts%10))
+
+    # 4 periods stored, the oldest overwritten, and the current partial one
+    assert buf.getRange()==[(10.0,4.5),(20.0,4.5),(30.0,4.5),(40.0,2.0)]
+    assert buf.getRange(15,30)==[(20.0,4.5),(30.0,4.5)]
+
+def test_query():
+
+    log.debug("\n---------- test_query")
+
+    history = StateHistory.StateHistory()
+    for ts in range(100):
+        history.record('asn',{'asn': ts*100},ts=1000.0+ts)
+
+    assert history.getSeriesNames()==[('asn','asn')]
+    assert len(history.query('asn','asn'))==100
+    assert history.query('asn','asn',tsFrom=1098)==[(1098.0,9800.0),(1099.0,9900.0)]
+    assert [ts for (ts,_) in history.query('asn','asn',tier='1min')]==[960.0,1020.0,1080.0]
+    assert history.query('asn','unknown')==[]
+    with pytest.raises(ValueError):
+        history.query('asn','asn',tier='1day')
+
+def test_maxSeries(monkeypatch):
+
+    log.debug("\n---------- test_maxSeries")
+
+    monkeypatch.setattr(StateHistory.StateHistory,'MAX_SERIES',4)
+    history = StateHistory.StateHistory()
+    history.record('elem',dict(('f{0}'.format(i),i) for i in range(6)),ts=1.0)
+
+    assert len(history.getSeriesNames())==4
+    assert history.numDropped==2
+
+def test_historyValues():
+
+    log.debug("\n---------- test_historyValues")
+
+    notif = collections.namedtuple('Notif',['row','numRx','numTx','numTxACK','type'])
+    elem  = moteState.StateTable(moteState.StateScheduleRow)
+    elem.data.append(moteState.StateScheduleRow())
+
+    assert elem.getHistoryValues(notif(0,3,5,4,'TX'))=={'0.numRx':3,'0.numTx':5,'0.numTxACK':4}
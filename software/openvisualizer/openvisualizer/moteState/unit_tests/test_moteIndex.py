@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import logging.handlers
+
+import pytest
+
+from openvisualizer.moteState import moteState
+from openvisualizer.moteState import moteIndex
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_moteIndex.log'
+
+import logging
+log = logging.getLogger('test_moteIndex')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_moteIndex',
+                   'moteIndex',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ helpers =========================================
+
+class FakeMoteConnector(object):
+    def __init__(self,serialport):
+        self.serialport = serialport
+
+def reportIds(ms,my16bID,my64bID):
+    '''
+    Feeds the moteState the IdManager status notification of a mote.
+    '''
+    notifClass = ms.parserStatus.named_tuple[ms.ST_IDMANAGER]
+    values     = dict((f,0) for f in notifClass._fields)
+    values['my16bID_0'],values['my16bID_1'] = my16bID
+    for i in range(8):
+        values['my64bID_{0}'.format(i)] = my64bID[i]
+    ms._receivedStatus_notif('moteConnector@{0}'.format(ms.moteConnector.serialport),'fromMote.status',notifClass(**values))
+
+#============================ fixtures ========================================
+
+@pytest.fixture
+def motes():
+    index = moteIndex.moteIndex()
+    mss   = [moteState.moteState(FakeMoteConnector('emulated{0}'.format(i))) for i in [1,2]]
+    for ms in mss:
+        index.add(ms)
+    return (index,mss)
+
+#============================ tests ===========================================
+
+def test_index(motes):
+
+    log.debug("\n---------- test_index")
+
+    (index,[ms1,ms2]) = motes
+
+    assert index.getBySerialPort('emulated1') is ms1
+    assert index.getBy16bId('0001') is None
+    assert index.getMoteId('emulated1') is None
+
+    reportIds(ms1,[0x00,0x01],[0x14,0x15,0x92,0,0,0,0,0x01])
+    reportIds(ms2,[0x0a,0x02],[0x14,0x15,0x92,0,0,0,0,0x02])
+
+    assert index.getBy16bId('0001') is ms1
+    assert index.getBy16bId('0A02') is ms2
+    assert index.getByEui64([0x14,0x15,0x92,0,0,0,0,0x02]) is ms2
+    assert index.getMoteId('emulated2')=='0a02'
+
+def test_addressChange(motes):
+
+    log.debug("\n---------- test_addressChange")
+
+    (index,[ms1,ms2]) = motes
+
+    reportIds(ms1,[0x00,0x01],[0x14,0x15,0x92,0,0,0,0,0x01])
+    reportIds(ms1,[0x00,0x03],[0x14,0x15,0x92,0,0,0,0,0x01])
+
+    assert index.getBy16bId('0001') is None
+    assert index.getBy16bId('0003') is ms1
+
+def test_remove(motes):
+
+    log.debug("\n---------- test_remove")
+
+    (index,[ms1,ms2]) = motes
+
+    reportIds(ms1,[0x00,0x01],[0x14,0x15,0x92,0,0,0,0,0x01])
+    index.remove(ms1)
+
+    assert index.getBySerialPort('emulated1') is None
+    assert index.getBy16bId('0001') is None
+    assert index.getByEui64([0x14,0x15,0x92,0,0,0,0,0x01]) is None
+
+    # the addresses known when added are indexed
+    index.add(ms1)
+    assert index.getBy16bId('0001') is ms1
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import collections
+import json
+import logging
+import logging.handlers
+
+from openvisualizer.moteState import moteState
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_moteState.log'
+
+import logging
+log = logging.getLogger('test_moteState')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_moteState',
+                   'moteState',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ defines =========================================
+
+NotifBackoff = collections.namedtuple('NotifBackoff',['backoffExponent','backoff'])
+NotifRow     = collections.namedtuple('NotifRow',['row','isSync'])
+
+#============================ tests ===========================================
+
+def test_jsonCache():
+
+    log.debug("\n---------- test_jsonCache")
+
+    elem = moteState.StateBackoff()
+    elem.update(NotifBackoff(1,2))
+    first = elem.toJson('data')
+
+    # cached until the next update
+    assert elem.toJson('data') is first
+    assert json.loads(elem.toJson('meta'))[0]['numUpdates']==1
+
+    elem.update(NotifBackoff(3,4))
+    assert json.loads(elem.toJson('data'))==[{'backoffExponent': 3, 'backoff': 4}]
+    assert json.loads(elem.toJson('meta'))[0]['numUpdates']==2
+    assert elem.getNumUpdates()==2
+
+def test_jsonCacheTable():
+
+    log.debug("\n---------- test_jsonCacheTable")
+
+    elem = moteState.StateTable(moteState.StateIsSync)
+    elem.update(NotifRow(0,0))
+    assert json.loads(elem.toJson('data'))==[{'isSync': 0}]
+
+    # updating a row updates the table
+    elem.update(NotifRow(1,1))
+    assert json.loads(elem.toJson('data'))==[{'isSync': 0},{'isSync': 1}]
+
+def test_stateElemRows():
+
+    log.debug("\n---------- test_stateElemRows")
+
+    class FakeMoteConnector(object):
+        serialport = 'emulated1'
+
+    ms = moteState.moteState(FakeMoteConnector())
+
+    # the rows of the queue are state elements, the backoff is a single row
+    rows = ms.getStateElemRows(ms.ST_QUEUE)
+    assert rows==[(0,'[]')]*10
+    rows = ms.getStateElemRows(ms.ST_BACKOFF)
+    assert rows==[(0,'[]')]
+
+    ms.getStateElem(ms.ST_BACKOFF).update(NotifBackoff(1,2))
+    (numUpdates,data) = ms.getStateElemRows(ms.ST_BACKOFF)[0]
+    assert numUpdates==1
+    assert json.loads(data)==[{'backoffExponent': 1, 'backoff': 2}]
@@ -14,6 +14,21 @@ import openvisualizer.openvisualizer_utils as u
 
 #============================ parameters ======================================
 
+#============================ helpers =========================================
+
+def _toList(buf):
+    '''
+    Return buf as a list of integers.
+
+    Packets travel on the EventBus as lists of integers, which are used as
+    is. Byte strings, bytearrays and memoryviews are converted once, on entry.
+    '''
+    if isinstance(buf,list):
+        return buf
+    if isinstance(buf,memoryview):
+        buf = buf.tobytes()
+    return list(bytearray(buf))
+
 class OpenLbr(eventBusClient.eventBusClient):
     '''
     Class which is responsible for translating between 6LoWPAN and IPv6
@@ -135,9 +150,15 @@ class OpenLbr(eventBusClient.eventBusClient):
     NHC_UDP_PORTS_4S_4D      = 3
 
     LINK_LOCAL_PREFIX        = [0xfe, 0x80, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
+    DEFAULT_PREFIX           = [0xbb, 0xbb, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
+    DEFAULT_DAGROOT_ADDR     = DEFAULT_PREFIX + [0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x01]
     
     #=== Errors    
     ERR_DESTINATIONUNREACHABLE = 1
+    
+    #=== RH3 6LoRH cache
+    RH3_CACHE_SIZE           = 256
+    RH3_CACHE_MIN_HOPS       = 3 # shorter routes are cheaper to encode than to look up
 
     def __init__(self,usePageZero):
 
@@ -149,6 +170,11 @@ class OpenLbr(eventBusClient.eventBusClient):
         self.networkPrefix        = None
         self.dagRootEui64         = None
         self.usePageZero          = usePageZero
+        self.rh3CacheLock         = threading.Lock()
+        self.rh3Cache             = {} # key -> [RH3 6LoRH(s), last use]
+        self.rh3Clock             = 0
+        self.rh3CacheHits         = 0
+        self.rh3CacheMisses       = 0
 
         # initialize parent class
         eventBusClient.eventBusClient.__init__(
@@ -182,6 +208,19 @@ class OpenLbr(eventBusClient.eventBusClient):
 
     #======================== public ==========================================
 
+    def getStats(self):
+        '''
+        Returns the counters of the RH3 6LoRH cache.
+        '''
+        with self.rh3CacheLock:
+            return {
+                'name':           '{0}.rh3Cache'.format(self.name),
+                'size':           len(self.rh3Cache),
+                'maxSize':        self.RH3_CACHE_SIZE,
+                'numHits':        self.rh3CacheHits,
+                'numMisses':      self.rh3CacheMisses,
+            }
+
     #======================== private =========================================
 
     #===== IPv6 -> 6LoWPAN
@@ -343,71 +382,64 @@ class OpenLbr(eventBusClient.eventBusClient):
                     print "wrong payload lenght on UDP packet {0}".format(",".join(str(c) for c in data))
                     return
 
-                if ipv6dic['payload'][0] & self.NHC_UDP_MASK==self.NHC_UDP_ID:
+                payload = ipv6dic['payload']
+
+                if payload[0] & self.NHC_UDP_MASK==self.NHC_UDP_ID:
 
-                    lowpan_nhc            = ipv6dic['payload'][0]
-                    udp_header_length     = 0
-                    newUdp                = []
-                    newUdp_header_length  = 0
+                    lowpan_nhc            = payload[0]
 
                     if lowpan_nhc & self.NHC_UDP_PORTS_MASK == self.NHC_UDP_PORTS_INLINE:
-                        src_port  = u.buf2int(ipv6dic['payload'][1:3])
-                        dest_port = u.buf2int(ipv6dic['payload'][3:5])
+                        src_port  = (payload[1] << 8) + payload[2]
+                        dest_port = (payload[3] << 8) + payload[4]
                         udp_header_length = 5
                     elif lowpan_nhc & self.NHC_UDP_PORTS_MASK == self.NHC_UDP_PORTS_16S_8D:
-                        src_port  = u.buf2int(ipv6dic['payload'][1:3])
-                        dest_port = 0xf000 + ipv6dic['payload'][3]
+                        src_port  = (payload[1] << 8) + payload[2]
+                        dest_port = 0xf000 + payload[3]
                         udp_header_length = 4
                     elif lowpan_nhc & self.NHC_UDP_PORTS_MASK == self.NHC_UDP_PORTS_8S_16D:
-                        src_port  = 0xf000 + ipv6dic['payload'][1]
-                        dest_port = u.buf2int(ipv6dic['payload'][2:4])
+                        src_port  = 0xf000 + payload[1]
+                        dest_port = (payload[2] << 8) + payload[3]
                         udp_header_length = 4
                     elif lowpan_nhc & self.NHC_UDP_PORTS_MASK == self.NHC_UDP_PORTS_4S_4D:
-                        src_port  = 0xf0b0 +((ipv6dic['payload'][1] >> 4) & 0x0f)
-                        dest_port = 0xf0b0 +((ipv6dic['payload'][1] >> 0) & 0x0f)
+                        src_port  = 0xf0b0 +((payload[1] >> 4) & 0x0f)
+                        dest_port = 0xf0b0 +((payload[1] >> 0) & 0x0f)
                         udp_header_length = 2
 
-                    newUdp  =  [src_port  >>8 , src_port  & 0x00ff]
-                    newUdp  += [dest_port >>8 , dest_port & 0x00ff]
-
-                    idxLen = len(newUdp) # remember index of payload length
-                    newUdp += [0x00,0x00] # length (placeholder)
-                    newUdp_header_length += 2
-
                     udp_header_length += 2 # skip two bytes checksum following
-                    idxCS = len(newUdp) # remember index of checksum
-                    newUdp += [0x00,0x00] # Checksum (placeholder)
-                    newUdp_header_length += 2
 
-                    #append payload to compute crc again
-                    newUdp += ipv6dic['payload'][udp_header_length:] # data octets
+                    app_payload = payload[udp_header_length:]
+                    udp_len     = len(app_payload)+8
 
-                    udp_len  = [0, len(ipv6dic['payload'][udp_header_length:])+8]
-                    newUdp[idxLen]   = udp_len[0]
-                    newUdp[idxLen+1] = udp_len[1]
+                    # uncompressed header (checksum zeroed to compute it) and data octets
+                    newUdp      = [
+                        src_port  >> 8, src_port  & 0x00ff,
+                        dest_port >> 8, dest_port & 0x00ff,
+                        udp_len   >> 8, udp_len   & 0x00ff,
+                        0x00,           0x00,
+                    ] + app_payload
 
-                    checksum = u.calculatePseudoHeaderCRC(ipv6dic['src_addr'],ipv6dic['dst_addr'],udp_len,[0,ipv6dic['next_header']],newUdp)
+                    checksum = u.calculatePseudoHeaderCRC(ipv6dic['src_addr'],ipv6dic['dst_addr'],newUdp[4:6],[0,ipv6dic['next_header']],newUdp)
                     #fill crc with the right value.
-                    newUdp[idxCS]   = checksum[0]
-                    newUdp[idxCS+1] = checksum[1]
+                    newUdp[6]   = checksum[0]
+                    newUdp[7]   = checksum[1]
 
                     #keep fields for later processing if needed
-                    ipv6dic['udp_src_port']       = u.buf2int(newUdp[0:2])
-                    ipv6dic['udp_dest_port']      = u.buf2int(newUdp[2:4])
+                    ipv6dic['udp_src_port']       = src_port
+                    ipv6dic['udp_dest_port']      = dest_port
                     ipv6dic['udp_length']         = newUdp[4:6]
                     ipv6dic['udp_checksum']       = newUdp[6:8]
-                    ipv6dic['app_payload']        = newUdp[8:]
+                    ipv6dic['app_payload']        = app_payload
 
                     #substitute udp header by the uncompressed header.
                     ipv6dic['payload']        = newUdp
-                    ipv6dic['payload_length'] = len(newUdp)
+                    ipv6dic['payload_length'] = udp_len
                 else:
                     #No UDP header compressed
-                    ipv6dic['udp_src_port']=u.buf2int(ipv6dic['payload'][:2])
-                    ipv6dic['udp_dest_port']=u.buf2int(ipv6dic['payload'][2:4])
-                    ipv6dic['udp_length']=ipv6dic['payload'][4:6]
-                    ipv6dic['udp_checksum']=ipv6dic['payload'][6:8]
-                    ipv6dic['app_payload']=ipv6dic['payload'][8:]
+                    ipv6dic['udp_src_port']=(payload[0] << 8) + payload[1]
+                    ipv6dic['udp_dest_port']=(payload[2] << 8) + payload[3]
+                    ipv6dic['udp_length']=payload[4:6]
+                    ipv6dic['udp_checksum']=payload[6:8]
+                    ipv6dic['app_payload']=payload[8:]
 
                 dispatchSignal=(tuple(ipv6dic['dst_addr']),self.PROTO_UDP,ipv6dic['udp_dest_port'])
 
@@ -436,7 +468,8 @@ class OpenLbr(eventBusClient.eventBusClient):
 
         See http://tools.ietf.org/html/rfc2460#page-4.
 
-        :param ipv6: [in] Byte array representing an IPv6 packet.
+        :param ipv6: [in] Byte array representing an IPv6 packet. A byte
+            string, bytearray or memoryview is converted to a list first.
 
         :raises: ValueError when some part of the process is not defined in
             the standard.
@@ -446,6 +479,8 @@ class OpenLbr(eventBusClient.eventBusClient):
         :returns: A dictionary of fields.
         '''
 
+        ipv6 = _toList(ipv6)
+
         if len(ipv6)<self.IPv6_HEADER_LEN:
             raise ValueError('Packet too small ({0} bytes) no space for IPv6 header'.format(len(ipv6)))
 
@@ -456,7 +491,7 @@ class OpenLbr(eventBusClient.eventBusClient):
 
         returnVal['traffic_class']     = ((ipv6[0] & 0x0F) << 4) + (ipv6[1] >> 4)
         returnVal['flow_label']        = ((ipv6[1] & 0x0F) << 16) + (ipv6[2] << 8) + ipv6[3]
-        returnVal['payload_length']    = u.buf2int(ipv6[4:6])
+        returnVal['payload_length']    = (ipv6[4] << 8) + ipv6[5]
         returnVal['next_header']       = ipv6[6]
         returnVal['hop_limit']         = ipv6[7]
         returnVal['src_addr']          = ipv6[8:8+16]
@@ -538,96 +573,21 @@ class OpenLbr(eventBusClient.eventBusClient):
 
         returnVal += [self.PAGE_ONE_DISPATCH]
 
-        if lowpan['src_addr'][:8] != [187, 187, 0, 0, 0, 0, 0, 0]:
-            compressReference = [187, 187, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1]
+        if lowpan['src_addr'][:8] != self.DEFAULT_PREFIX:
+            compressReference = self.DEFAULT_DAGROOT_ADDR
         else:
             compressReference = lowpan['src_addr']
 
 
         # destination address
         if len(lowpan['route'])>1:
-            # source route needed, get prefix from compression Reference
-            if len(compressReference)==16:
-                prefix=compressReference[:8]
 
             # =======================3. RH3 6LoRH(s) ==============================
-            sizeUnitType = 0xff
-            size     = 0
-            hopList  = []
-
-            for hop in list(reversed(lowpan['route'][1:])):
-                size += 1
-                if compressReference[-8:-1] == hop[-8:-1]:
-                    if sizeUnitType != 0xff:
-                        if  sizeUnitType != self.TYPE_6LoRH_RH3_0:
-                            returnVal += [self.CRITICAL_6LoRH|(size-2),sizeUnitType]
-                            returnVal += hopList
-                            size = 1
-                            sizeUnitType = self.TYPE_6LoRH_RH3_0
-                            hopList = [hop[-1]]
-                            compressReference = hop
-                        else:
-                            hopList += [hop[-1]]
-                            compressReference = hop
-                    else:
-                        sizeUnitType = self.TYPE_6LoRH_RH3_0
-                        hopList += [hop[-1]]
-                        compressReference = hop
-                elif compressReference[-8:-2] == hop[-8:-2]:
-                    if sizeUnitType != 0xff:
-                        if  sizeUnitType != self.TYPE_6LoRH_RH3_1:
-                            returnVal += [self.CRITICAL_6LoRH|(size-2),sizeUnitType]
-                            returnVal += hopList
-                            size = 1
-                            sizeUnitType = self.TYPE_6LoRH_RH3_1
-                            hopList = hop[-2:]
-                            compressReference = hop
-                        else:
-                            hopList += hop[-2:]
-                            compressReference = hop
-                    else:
-                        sizeUnitType = self.TYPE_6LoRH_RH3_1
-                        hopList += hop[-2:]
-                        compressReference = hop
-                elif compressReference[-8:-4] == hop[-8:-4]:
-                    if sizeUnitType != 0xff:
-                        if  sizeUnitType != self.TYPE_6LoRH_RH3_2:
-                            returnVal += [self.CRITICAL_6LoRH|(size-2),sizeUnitType]
-                            returnVal += hopList
-                            size = 1
-                            sizeUnitType = self.TYPE_6LoRH_RH3_2
-                            hopList = hop[-4:]
-                            compressReference = hop
-                        else:
-                            hopList += hop[-4:]
-                            compressReference = hop
-                    else:
-                        sizeUnitType = self.TYPE_6LoRH_RH3_2
-                        hopList += hop[-4:]
-                        compressReference = hop
-                else:
-                    if sizeUnitType != 0xff:
-                        if  sizeUnitType != self.TYPE_6LoRH_RH3_3:
-                            returnVal += [self.CRITICAL_6LoRH|(size-2),sizeUnitType]
-                            returnVal += hopList
-                            size = 1
-                            sizeUnitType = self.TYPE_6LoRH_RH3_3
-                            hopList = hop
-                            compressReference = hop
-                        else:
-                            hopList += hop
-                            compressReference = hop
-                    else:
-                        sizeUnitType = self.TYPE_6LoRH_RH3_3
-                        hopList += hop
-                        compressReference = hop
-
-            returnVal += [self.CRITICAL_6LoRH|(size-1),sizeUnitType]
-            returnVal += hopList
+            returnVal += self._getRH3(compressReference,lowpan['route'][1:])
 
         # ===================== 2. IPinIP 6LoRH ===============================
 
-        if lowpan['src_addr'][:8] != [187, 187, 0, 0, 0, 0, 0, 0]:
+        if lowpan['src_addr'][:8] != self.DEFAULT_PREFIX:
             # add RPI
             # TBD
             flag = self.O_FLAG | self.I_FLAG | self.K_FLAG
@@ -638,7 +598,7 @@ class OpenLbr(eventBusClient.eventBusClient):
             returnVal += [self.ELECTIVE_6LoRH | l,self.TYPE_6LoRH_IP_IN_IP]
             returnVal += lowpan['hlim']
 
-            compressReference = [187, 187, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1]
+            compressReference = self.DEFAULT_DAGROOT_ADDR
         else:
             compressReference = lowpan['src_addr']
 
@@ -674,7 +634,7 @@ class OpenLbr(eventBusClient.eventBusClient):
             lowpan['src_addr'] = lowpan['src_addr'][8:]
         else:
             sac                  = self.IPHC_SAC_STATEFUL
-            if lowpan['src_addr'][:8] == [187, 187, 0, 0, 0, 0, 0, 0]:
+            if lowpan['src_addr'][:8] == self.DEFAULT_PREFIX:
                 lowpan['src_addr'] = lowpan['src_addr'][8:]
 
         if   len(lowpan['src_addr'])==128/8:
@@ -693,7 +653,7 @@ class OpenLbr(eventBusClient.eventBusClient):
             lowpan['dst_addr'] = lowpan['dst_addr'][8:]
         else:
             dac                  = self.IPHC_DAC_STATEFUL
-            if lowpan['dst_addr'][:8] == [187, 187, 0, 0, 0, 0, 0, 0]:
+            if lowpan['dst_addr'][:8] == self.DEFAULT_PREFIX:
                 lowpan['dst_addr'] = lowpan['dst_addr'][8:]
 
         m                    = self.IPHC_M_NO
@@ -737,8 +697,8 @@ class OpenLbr(eventBusClient.eventBusClient):
     def lowpan_to_ipv6(self,data):
 
         pkt_ipv6 = {}
-        mac_prev_hop=data[0]
-        pkt_lowpan=data[1]
+        mac_prev_hop=_toList(data[0])
+        pkt_lowpan=_toList(data[1])
         pkt_ipv6['src_addr'] = [0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00]
 
         if pkt_lowpan[0]==self.PAGE_ONE_DISPATCH:
@@ -770,7 +730,7 @@ class OpenLbr(eventBusClient.eventBusClient):
                     pkt_ipv6['hop_limit'] = pkt_lowpan[ptr+2]
                     ptr += 3
                     if length == 1:
-                        pkt_ipv6['src_addr'] = [0xbb,0xbb,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x01]
+                        pkt_ipv6['src_addr'] = self.DEFAULT_DAGROOT_ADDR[:]
                     elif length == 9:
                         pkt_ipv6['src_addr'] = self.networkPrefix + pkt_lowpan[ptr:ptr+8]
                         ptr += 8
@@ -878,11 +838,8 @@ class OpenLbr(eventBusClient.eventBusClient):
                 pkt_ipv6['src_addr'] = prefix + mac_prev_hop
 
             elif sam == self.IPHC_SAM_16B:
-                a1 = pkt_lowpan[ptr]
-                a2 = pkt_lowpan[ptr+1]
+                pkt_ipv6['src_addr'] = prefix+[0x00,0x00,0x00,0x00,0x00,0x00]+pkt_lowpan[ptr:ptr+2]
                 ptr = ptr+2
-                s = ''.join(['\x00','\x00','\x00','\x00','\x00','\x00',a1,a2])
-                pkt_ipv6['src_addr'] = prefix+s
 
             elif sam == self.IPHC_SAM_64B:
                 pkt_ipv6['src_addr'] = prefix+pkt_lowpan[ptr:ptr+8]
@@ -907,11 +864,8 @@ class OpenLbr(eventBusClient.eventBusClient):
                     log.debug("IPHC_DAM_ELIDED this packet is for the dagroot!")
                 pkt_ipv6['dst_addr'] = prefix+self.dagRootEui64
             elif dam == self.IPHC_DAM_16B:
-                a1 = pkt_lowpan[ptr]
-                a2 = pkt_lowpan[ptr+1]
+                pkt_ipv6['dst_addr'] = prefix+[0x00,0x00,0x00,0x00,0x00,0x00]+pkt_lowpan[ptr:ptr+2]
                 ptr = ptr+2
-                s = ''.join(['\x00','\x00','\x00','\x00','\x00','\x00',a1,a2])
-                pkt_ipv6['dst_addr'] = prefix+s
             elif dam == self.IPHC_DAM_64B:
                 pkt_ipv6['dst_addr'] = prefix+pkt_lowpan[ptr:ptr+8]
                 ptr = ptr + 8
@@ -972,25 +926,112 @@ class OpenLbr(eventBusClient.eventBusClient):
         return pkt_ipv6
 
     def reassemble_ipv6_packet(self, pkt):
-        pktw = [((6 << 4) + (pkt['traffic_class'] >> 4)),
-                (((pkt['traffic_class'] & 0x0F) << 4) + (pkt['flow_label'] >> 16)),
-                ((pkt['flow_label'] >> 8) & 0x00FF),
-                (pkt['flow_label'] & 0x0000FF),
-                (pkt['payload_length'] >> 8),
-                (pkt['payload_length'] & 0x00FF),
-                (pkt['next_header']),
-                (pkt['hop_limit'])]
-        for i in range(0,16):
-            pktw.append( (pkt['src_addr'][i]) )
-        for i in range(0,16):
-            pktw.append( (pkt['dst_addr'][i]) )
+        '''
+        Turn dictionary of IPv6 fields into byte array.
 
-        return pktw + pkt['payload']
+        :param pkt: [in] dictionary of fields representing an IPv6 packet.
+
+        :returns: A list of bytes representing the IPv6 packet, built in a
+            single concatenation.
+        '''
+        return [
+            ((6 << 4) + (pkt['traffic_class'] >> 4)),
+            (((pkt['traffic_class'] & 0x0F) << 4) + (pkt['flow_label'] >> 16)),
+            ((pkt['flow_label'] >> 8) & 0x00FF),
+            (pkt['flow_label'] & 0x0000FF),
+            (pkt['payload_length'] >> 8),
+            (pkt['payload_length'] & 0x00FF),
+            (pkt['next_header']),
+            (pkt['hop_limit']),
+        ] + pkt['src_addr'][:16] + pkt['dst_addr'][:16] + pkt['payload']
 
 
 
     #======================== helpers =========================================
 
+    #===== RH3 6LoRH
+
+    def _getRH3(self,compressReference,hops):
+        '''
+        Return the RH3 6LoRH(s) encoding hops, from the cache if possible.
+
+        The encoding only depends on the page, the last 8 bytes of the
+        compression reference and the hops, which form the cache key. Routes
+        of less than RH3_CACHE_MIN_HOPS hops are encoded directly, as building
+        the key costs more than encoding them.
+        '''
+        if len(hops)<self.RH3_CACHE_MIN_HOPS:
+            return self._encodeRH3(compressReference,hops)
+        key = (
+            self.usePageZero,
+            tuple(compressReference[-8:]),
+            tuple([tuple(hop) for hop in hops]),
+        )
+        with self.rh3CacheLock:
+            self.rh3Clock += 1
+            entry = self.rh3Cache.get(key)
+            if entry is None:
+                self.rh3CacheMisses += 1
+                if len(self.rh3Cache)>=self.RH3_CACHE_SIZE:
+                    self._evictRH3()
+                entry = [tuple(self._encodeRH3(compressReference,hops)),self.rh3Clock]
+                self.rh3Cache[key] = entry
+            else:
+                self.rh3CacheHits   += 1
+                entry[1] = self.rh3Clock
+        return entry[0]
+
+    def _evictRH3(self):
+        '''
+        Drop the least recently used quarter of the RH3 6LoRH cache.
+
+        Evicting in bulk keeps the cost of a cache hit to updating a counter.
+        '''
+        entries = sorted(self.rh3Cache.items(),key=lambda item: item[1][1])
+        for (key,entry) in entries[:max(1,self.RH3_CACHE_SIZE/4)]:
+            del self.rh3Cache[key]
+
+    def _encodeRH3(self,compressReference,hops):
+        '''
+        Encode hops into RH3 6LoRH(s).
+
+        Each hop is compressed against the previous one, the first against
+        compressReference. Consecutive hops compressed to the same size share
+        one RH3 6LoRH.
+        '''
+        returnVal    = []
+        sizeUnitType = 0xff
+        size         = 0
+        hopList      = []
+
+        for hop in reversed(hops):
+            size += 1
+            if   compressReference[-8:-1] == hop[-8:-1]:
+                unitType = self.TYPE_6LoRH_RH3_0
+                hopBytes = hop[-1:]
+            elif compressReference[-8:-2] == hop[-8:-2]:
+                unitType = self.TYPE_6LoRH_RH3_1
+                hopBytes = hop[-2:]
+            elif compressReference[-8:-4] == hop[-8:-4]:
+                unitType = self.TYPE_6LoRH_RH3_2
+                hopBytes = hop[-4:]
+            else:
+                unitType = self.TYPE_6LoRH_RH3_3
+                hopBytes = hop
+            if sizeUnitType != 0xff and sizeUnitType != unitType:
+                returnVal += [self.CRITICAL_6LoRH|(size-2),sizeUnitType]
+                returnVal += hopList
+                size       = 1
+                hopList    = []
+            sizeUnitType       = unitType
+            hopList           += hopBytes
+            compressReference  = hop
+
+        returnVal += [self.CRITICAL_6LoRH|(size-1),sizeUnitType]
+        returnVal += hopList
+
+        return returnVal
+
     #===== source route
 
     def _getSourceRoute(self,destination):
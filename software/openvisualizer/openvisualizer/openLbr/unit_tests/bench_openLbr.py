@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+'''
+Benchmark of the IPv6 <-> 6LoWPAN conversion in OpenLbr.
+
+Pushes a corpus of IPHC frames received from the mesh through
+_meshToV6_notif and a corpus of IPv6 packets destined to motes through
+_v6ToMesh_notif, and reports the number of packets converted per second in
+each direction. Run directly::
+
+    python bench_openLbr.py [framesFile]
+
+framesFile holds frames received from the mesh, one per line, as two hex
+strings: the EUI64 of the previous hop and the 6LoWPAN frame, e.g.
+'141592cc00000002 7a773a9b000000...'. Without it, a corpus of upstream UDP and ICMPv6
+frames from motes 2 to 7 hops away is generated.
+'''
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # openLbr/
+
+import logging
+import timeit
+
+import openLbr
+from   openvisualizer.eventBus import eventBusClient
+import openvisualizer.openvisualizer_utils as u
+
+#============================ defines =========================================
+
+NUM_REPEAT     = 3
+NUM_COPIES     = 200
+
+PREFIX         = [0xbb,0xbb,0x00,0x00,0x00,0x00,0x00,0x00]
+INTERNET_HOST  = [0x20,0x01,0x0d,0xb8,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x42]
+PAYLOAD_LENS   = [10,50,80]
+MAX_HOPS       = 7
+
+#============================ helpers =========================================
+
+def moteEui64(id):
+    return [0x14,0x15,0x92,0xcc,0x00,0x00,0x00,id]
+
+DAGROOT        = moteEui64(1)
+
+class SourceRouteResponder(eventBusClient.eventBusClient):
+    '''
+    Answers 'getSourceRoute' along a line topology and swallows the
+    converted packets.
+    '''
+    def __init__(self):
+        eventBusClient.eventBusClient.__init__(
+            self,
+            name             = 'SourceRouteResponder',
+            registrations    = [
+                {
+                    'sender'   : self.WILDCARD,
+                    'signal'   : 'getSourceRoute',
+                    'callback' : self._getSourceRoute_notif,
+                },
+                {
+                    'sender'   : self.WILDCARD,
+                    'signal'   : 'bytesToMesh',
+                    'callback' : self._sink_notif,
+                },
+                {
+                    'sender'   : self.WILDCARD,
+                    'signal'   : 'v6ToInternet',
+                    'callback' : self._sink_notif,
+                },
+            ]
+        )
+
+    def _getSourceRoute_notif(self,sender,signal,data):
+        return [moteEui64(id) for id in range(data[-1],0,-1)]
+
+    def _sink_notif(self,sender,signal,data):
+        pass
+
+def udpPacket(src,dst,port,payload):
+    length = 8+len(payload)
+    udp    = [port>>8,port&0xff,port>>8,port&0xff,length>>8,length&0xff,0x00,0x00]+payload
+    udp[6:8] = u.calculatePseudoHeaderCRC(src,dst,[0x00,0x00,length>>8,length&0xff],[0x00,0x00,0x00,17],udp)
+    return [0x60,0x00,0x00,0x00,length>>8,length&0xff,17,64]+src+dst+udp
+
+def generateMeshFrames():
+    frames = []
+    for id in range(2,MAX_HOPS+1):
+        for l in PAYLOAD_LENS:
+            payload = [(i*5)&0xff for i in range(l)]
+            # RPI and IPinIP 6LoRH, inner IPHC with the UDP header inline
+            frames += [(
+                moteEui64(id),
+                [0xf1,0x83,0x05,0x02,0xa9,0x06,0x40]+moteEui64(id)+
+                [0x7e,0x50]+moteEui64(id)+INTERNET_HOST+
+                [0xf0,0x16,0x33,0x16,0x33,0x12,0x34]+payload
+            )]
+            # IPHC, ICMPv6 inline, destination elided (to the DAGroot)
+            frames += [(
+                moteEui64(id),
+                [0x7a,0x77,58,155,0x00,0x00,0x00]+payload
+            )]
+    return frames
+
+def generateV6Packets():
+    packets = []
+    for id in range(2,MAX_HOPS+1):
+        for l in PAYLOAD_LENS:
+            packets += [udpPacket(INTERNET_HOST,PREFIX+moteEui64(id),5683,[(i*7)&0xff for i in range(l)])]
+    return packets
+
+def loadMeshFrames(filename):
+    frames = []
+    with open(filename) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields)==2:
+                frames += [(u.hex2buf(fields[0]),u.hex2buf(fields[1]))]
+    return frames
+
+#============================ main ============================================
+
+def main():
+    logging.disable(logging.CRITICAL)
+
+    if len(sys.argv)>1:
+        meshFrames = loadMeshFrames(sys.argv[1])
+    else:
+        meshFrames = generateMeshFrames()
+    v6Packets  = generateV6Packets()
+
+    lbr        = openLbr.OpenLbr(usePageZero=False)
+    lbr._setPrefix_notif('bench','networkPrefix',PREFIX)
+    lbr._infoDagRoot_notif('bench','infoDagRoot',{'isDAGroot':1,'eui64':DAGROOT})
+    responder  = SourceRouteResponder()
+
+    meshFrames = meshFrames*NUM_COPIES
+    v6Packets  = v6Packets*NUM_COPIES
+
+    def runUpstream():
+        for f in meshFrames:
+            lbr._meshToV6_notif('bench','fromMote.data',f)
+
+    def runDownstream():
+        for p in v6Packets:
+            lbr._v6ToMesh_notif('bench','v6ToMesh',p)
+
+    for (name,run,num) in [
+            ('6LoWPAN->IPv6',runUpstream,  len(meshFrames)),
+            ('IPv6->6LoWPAN',runDownstream,len(v6Packets)),
+        ]:
+        duration = min(timeit.repeat(run, repeat=NUM_REPEAT, number=1))
+        print '{0}: {1} packets, {2:.0f} packets/s'.format(name, num, num/duration)
+
+if __name__=="__main__":
+    main()
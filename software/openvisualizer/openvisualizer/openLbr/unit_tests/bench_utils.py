@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+'''
+Benchmark of the checksum helpers in openvisualizer_utils.
+
+Reports the number of UDP pseudo-header checksums computed per second over
+random payloads of typical sizes (a short CoAP message, a full 802.15.4 frame
+and the IPv6 minimum MTU), and the number of IEEE802.15.4 FCS computed per
+second over random frames, one at a time and in batches. Run directly::
+
+    python bench_utils.py
+'''
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+
+import random
+import timeit
+
+import openvisualizer.openvisualizer_utils as u
+
+#============================ defines =========================================
+
+PAYLOAD_LENS   = [64,127,1280]
+NUM_CHECKSUMS  = 10000
+FRAME_LENS     = [20,127]
+NUM_FRAMES     = 10000
+NUM_REPEAT     = 3
+
+#============================ main ============================================
+
+def main():
+    random.seed(0)
+
+    src = [random.randint(0x00,0xff) for _ in range(16)]
+    dst = [random.randint(0x00,0xff) for _ in range(16)]
+    nh  = [0x00,0x00,0x00,17]
+
+    for l in PAYLOAD_LENS:
+        payload = [random.randint(0x00,0xff) for _ in range(l)]
+        length  = [0x00,0x00,l>>8,l&0xff]
+
+        def run():
+            for _ in range(NUM_CHECKSUMS):
+                u.calculatePseudoHeaderCRC(src,dst,length,nh,payload)
+
+        duration = min(timeit.repeat(run, repeat=NUM_REPEAT, number=1))
+        print '{0:>4}B payload: {1:.0f} checksums/s'.format(l, NUM_CHECKSUMS/duration)
+
+    for l in FRAME_LENS:
+        frames = [[random.randint(0x00,0xff) for _ in range(l)] for _ in range(NUM_FRAMES)]
+
+        def runSingle():
+            for f in frames:
+                u.calculateFCS(f)
+
+        def runBatch():
+            u.calculateFCSBatch(frames)
+
+        for (name,run) in [('single',runSingle),('batch',runBatch)]:
+            duration = min(timeit.repeat(run, repeat=NUM_REPEAT, number=1))
+            print '{0:>4}B frame:   {1:.0f} FCS/s ({2})'.format(l, NUM_FRAMES/duration, name)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+
+import os
+import sys
+here = sys.path[0]
+sys.path.insert(0, os.path.join(here, '..', '..', '..'))                       # root/
+sys.path.insert(0, os.path.join(here, '..'))                                   # openLbr/
+sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'))   # PyDispatcher-2.0.3/
+
+import logging
+import logging.handlers
+import json
+
+import pytest
+
+import openLbr
+from   openvisualizer.eventBus import eventBusClient
+import openvisualizer.openvisualizer_utils as u
+
+#============================ logging =========================================
+
+LOGFILE_NAME = 'test_openLbr.log'
+
+import logging
+log = logging.getLogger('test_openLbr')
+log.setLevel(logging.ERROR)
+log.addHandler(logging.NullHandler())
+
+logHandler = logging.handlers.RotatingFileHandler(LOGFILE_NAME,
+                                                  backupCount=5,
+                                                  mode='w')
+logHandler.setFormatter(logging.Formatter("%(asctime)s [%(name)s:%(levelname)s] %(message)s"))
+for loggerName in ['test_openLbr',
+                   'openLbr',]:
+    temp = logging.getLogger(loggerName)
+    temp.setLevel(logging.DEBUG)
+    temp.addHandler(logHandler)
+
+#============================ defines =========================================
+
+PREFIX        = [0xbb,0xbb,0x00,0x00,0x00,0x00,0x00,0x00]
+DAGROOT       = [0x14,0x15,0x92,0xcc,0x00,0x00,0x00,0x01]
+MOTE          = [0x14,0x15,0x92,0xcc,0x00,0x00,0x00,0x02]
+
+# UDP from 2001:db8::42 to bbbb::1415:92cc:0:2, port 5683, payload 01020304
+IPV6_PKT      = '60000000000c114020010db8000000000000000000000042bbbb000000000000141592cc0000000216331633000c3ed001020304'
+
+# the same packet received from the mote, RPI and IPinIP 6LoRH, UDP header inline
+LOWPAN_UP     = 'f1830502a90640141592cc000000027e50141592cc0000000220010db8000000000000000000000042f016331633123401020304'
+IPV6_UP       = '60000000000c1140bbbb000000000000141592cc0000000220010db800000000000000000000004216331633000c3ed001020304'
+
+#============================ helpers =========================================
+
+class RecordingClient(eventBusClient.eventBusClient):
+
+    def __init__(self):
+        self.received  = []
+        eventBusClient.eventBusClient.__init__(
+            self,
+            name             = 'RecordingClient',
+            registrations    = [
+                {
+                    'sender'   : self.WILDCARD,
+                    'signal'   : 'v6ToInternet',
+                    'callback' : self._record,
+                },
+            ]
+        )
+
+    def _record(self,sender,signal,data):
+        self.received += [(signal,data)]
+
+def createLbr():
+    lbr = openLbr.OpenLbr(usePageZero=False)
+    lbr._setPrefix_notif('test','networkPrefix',PREFIX)
+    lbr._infoDagRoot_notif('test','infoDagRoot',{'isDAGroot':1,'eui64':DAGROOT})
+    return lbr
+
+def bufOfType(buf,bufType):
+    if   bufType=='list':
+        return buf
+    elif bufType=='str':
+        return ''.join([chr(b) for b in buf])
+    elif bufType=='bytearray':
+        return bytearray(buf)
+    elif bufType=='memoryview':
+        return memoryview(bytearray(buf))
+
+#============================ fixtures ========================================
+
+#===== bufType
+
+BUFTYPES = [
+    'list',
+    'str',
+    'bytearray',
+    'memoryview',
+]
+
+@pytest.fixture(params=BUFTYPES)
+def bufType(request):
+    return request.param
+
+#===== expectedLowpan
+
+EXPECTEDLOWPAN = [
+    #           route (destination first, DAGroot excluded)    lowpan
+    json.dumps((
+        [MOTE],
+        'f1930500a106407a451120010db8000000000000000000000042141592cc0000000216331633000c3ed001020304',
+    )),
+    json.dumps((
+        [
+            MOTE,
+            [0x14,0x15,0x92,0xcc,0x00,0x00,0x00,0x03],
+            [0x14,0x15,0x92,0xcc,0x00,0x00,0x01,0x04],
+            [0x00,0x12,0x4b,0x00,0x01,0x02,0x03,0x04],
+            [0x00,0x12,0x4b,0x00,0x01,0x02,0x03,0x05],
+        ],
+        'f1800300124b00010203058000048003141592cc0000010480010003930500a106407a451120010db8000000000000000000000042141592cc0000000216331633000c3ed001020304',
+    )),
+]
+
+@pytest.fixture(params=EXPECTEDLOWPAN)
+def expectedLowpan(request):
+    return request.param
+
+#============================ tests ===========================================
+
+def test_ipv6RoundTrip(bufType):
+
+    log.debug("\n---------- test_ipv6RoundTrip ({0})".format(bufType))
+
+    lbr  = createLbr()
+    pkt  = u.hex2buf(IPV6_PKT)
+
+    ipv6 = lbr.disassemble_ipv6(bufOfType(pkt,bufType))
+
+    assert ipv6['payload_length']==12
+    assert ipv6['next_header']==lbr.IANA_UDP
+    assert ipv6['src_addr']==u.hex2buf('20010db8000000000000000000000042')
+    assert lbr.reassemble_ipv6_packet(ipv6)==pkt
+
+def test_reassembleLowpan(expectedLowpan):
+
+    (route,expected) = json.loads(expectedLowpan)
+
+    log.debug("\n---------- test_reassembleLowpan ({0} hops)".format(len(route)))
+
+    lbr    = createLbr()
+
+    lowpan = lbr.ipv6_to_lowpan(lbr.disassemble_ipv6(u.hex2buf(IPV6_PKT)))
+    lowpan['route'] = route
+
+    assert lbr.reassemble_lowpan(lowpan)==u.hex2buf(str(expected))
+
+def test_lowpanToIpv6(bufType):
+
+    log.debug("\n---------- test_lowpanToIpv6 ({0})".format(bufType))
+
+    lbr      = createLbr()
+    frame    = u.hex2buf(LOWPAN_UP)
+
+    expected = lbr.lowpan_to_ipv6((MOTE,frame))
+    ipv6     = lbr.lowpan_to_ipv6((bufOfType(MOTE,bufType),bufOfType(frame,bufType)))
+
+    assert ipv6==expected
+    assert ipv6['src_addr']==PREFIX+MOTE
+
+def test_meshToV6(bufType):
+
+    log.debug("\n---------- test_meshToV6 ({0})".format(bufType))
+
+    lbr      = createLbr()
+    recorder = RecordingClient()
+
+    lbr._meshToV6_notif('test','fromMote.data',(MOTE,bufOfType(u.hex2buf(LOWPAN_UP),bufType)))
+
+    assert recorder.received==[('v6ToInternet',u.hex2buf(IPV6_UP))]
+    assert type(recorder.received[0][1])==list
+
+def test_rh3Cache(expectedLowpan):
+
+    (route,expected) = json.loads(expectedLowpan)
+
+    log.debug("\n---------- test_rh3Cache ({0} hops)".format(len(route)))
+
+    lbr    = createLbr()
+
+    for _ in range(3):
+        lowpan = lbr.ipv6_to_lowpan(lbr.disassemble_ipv6(u.hex2buf(IPV6_PKT)))
+        lowpan['route'] = route
+        assert lbr.reassemble_lowpan(lowpan)==u.hex2buf(str(expected))
+
+    stats  = lbr.getStats()
+    if len(route)-1>=lbr.RH3_CACHE_MIN_HOPS:
+        assert stats['numMisses']==1
+        assert stats['numHits']==2
+        assert stats['size']==1
+    else:
+        # no RH3 6LoRH needed, or encoded directly
+        assert stats['numMisses']==0
+        assert stats['size']==0
+
+def test_rh3CacheShortRoute():
+
+    log.debug("\n---------- test_rh3CacheShortRoute")
+
+    lbr    = createLbr()
+    ref    = PREFIX+DAGROOT
+
+    for numHops in range(1,lbr.RH3_CACHE_MIN_HOPS):
+        hops = [[0x00,0x12,0x4b,0x00,0x01,0x02,0x03,i] for i in range(numHops)]
+        assert list(lbr._getRH3(ref,hops))==lbr._encodeRH3(ref,hops)
+
+    stats  = lbr.getStats()
+    assert stats['numMisses']==0
+    assert stats['numHits']==0
+    assert stats['size']==0
+
+def test_rh3CacheEviction():
+
+    log.debug("\n---------- test_rh3CacheEviction")
+
+    lbr    = createLbr()
+    lbr.RH3_CACHE_SIZE = 4
+    ref    = PREFIX+DAGROOT
+    routes = [[MOTE,[0x14,0x15,0x92,0xcc,0x00,0x00,0x01,i],DAGROOT] for i in range(6)]
+
+    for hops in routes[:4]:
+        lbr._getRH3(ref,hops)
+    # routes[0] becomes the most recently used
+    lbr._getRH3(ref,routes[0])
+    for hops in routes[4:]:
+        lbr._getRH3(ref,hops)
+
+    stats  = lbr.getStats()
+    assert stats['size']<=4
+    assert stats['numMisses']==6
+    assert stats['numHits']==1
+
+    # routes[0] survived the eviction, routes[1] did not
+    lbr._getRH3(ref,routes[0])
+    assert lbr.getStats()['numHits']==2
+    lbr._getRH3(ref,routes[1])
+    assert lbr.getStats()['numMisses']==7
+
+    for hops in routes:
+        assert list(lbr._getRH3(ref,hops))==lbr._encodeRH3(ref,hops)
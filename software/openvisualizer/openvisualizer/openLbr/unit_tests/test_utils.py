@@ -10,6 +10,7 @@ sys.path.insert(0, os.path.join(here, '..', '..','eventBus','PyDispatcher-2.0.3'
 import logging
 import logging.handlers
 import json
+import random
 
 import pytest
 
@@ -114,8 +115,96 @@ EXPECTEDFORMATIPv6 = [
 def expectedformatipv6(request):
     return request.param
 
+#===== checksumLength
+
+CHECKSUMLENGTHS = [0,1,2,3,63,64,127,128,1280]
+
+@pytest.fixture(params=CHECKSUMLENGTHS)
+def checksumLength(request):
+    return request.param
+
+#===== expectedFCS
+
+EXPECTEDFCS = [
+    #           frame                                                  FCS
+    json.dumps(('313233343536373839',                                  [0x89,0x21])),
+    json.dumps(('41cc66feca010101010101010102020202020202027a333a',    [0xb7,0xc3])),
+    json.dumps(('',                                                    [0x00,0x00])),
+    json.dumps(('00',                                                  [0x00,0x00])),
+]
+
+@pytest.fixture(params=EXPECTEDFCS)
+def expectedFCS(request):
+    return request.param
+
+#===== fcsLength
+
+FCSLENGTHS = [1,2,20,127]
+
+@pytest.fixture(params=FCSLENGTHS)
+def fcsLength(request):
+    return request.param
+
 #============================ helpers =========================================
 
+NUM_RANDOM_TRIALS = 50
+
+def randomBuf(length):
+    return [random.randint(0x00,0xff) for _ in range(length)]
+
+def referenceOneComplementSum(field,checksum):
+    '''
+    Word-by-word one's complement sum, as originally implemented.
+    '''
+    sum            = 0xFFFF & (checksum[0] << 8 | checksum[1])
+    i              = len(field)
+    while i > 1:
+        sum       += 0xFFFF & (field[-i] << 8 | (field[-i+1]))
+        i         -= 2
+    if i:
+        sum       += (0xFF & field[-1]) << 8
+    while sum >> 16:
+        sum        = (sum & 0xFFFF) + (sum >> 16)
+    
+    checksum[0]    = (sum >> 8) & 0xFF
+    checksum[1]    = sum & 0xFF
+    
+    return checksum
+
+def referenceByteinverse(b):
+    '''
+    Bit-by-bit byte inversion, as originally implemented.
+    '''
+    rb = 0
+    for pos in range(8):
+        if b&(1<<pos)!=0:
+            bitval = 1
+        else:
+            bitval = 0
+        rb |= bitval<<(7-pos)
+    return rb
+
+def referenceFCS(payload):
+    '''
+    Bitwise reimplementation of the FCS (CRC-16 ITU-T over bit-inverted
+    bytes), used as an independent reference.
+    '''
+    crc = 0x0000
+    for b in payload:
+        crc ^= referenceByteinverse(b)<<8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc<<1) ^ 0x1021) & 0xffff
+            else:
+                crc = (crc<<1) & 0xffff
+    return [referenceByteinverse(crc>>8),referenceByteinverse(crc&0xff)]
+
+def referencePseudoHeaderCRC(src,dst,length,nh,payload):
+    checksum       = [0x00]*2
+    for field in [src,dst,length,nh,payload]:
+        checksum   = referenceOneComplementSum(field,checksum)
+    return [checksum[0]^0xFF,checksum[1]^0xFF]
+
 #============================ tests ===========================================
 
 def test_buf2int(expectedBuf2int):
@@ -136,10 +225,101 @@ def test_byteinverse(expectedbyteinverse):
     assert u.byteinverse(b)==b_inverse
     assert u.byteinverse(b_inverse)==b
 
+def test_byteinverseAll():
+    for b in range(0x100):
+        assert u.byteinverse(b)==referenceByteinverse(b)
+
 def test_formatIPv6Addr(expectedformatipv6):
     
     (ipv6_list,ipv6_string) = json.loads(expectedformatipv6)
     
     print ipv6_string
     
-    assert u.formatIPv6Addr(ipv6_list)==ipv6_string
\ No newline at end of file
+    assert u.formatIPv6Addr(ipv6_list)==ipv6_string
+
+def test_oneComplementSum(checksumLength):
+    random.seed(checksumLength)
+    
+    for _ in range(NUM_RANDOM_TRIALS):
+        field    = randomBuf(checksumLength)
+        checksum = randomBuf(2)
+        
+        assert u._oneComplementSum(field,checksum[:])==referenceOneComplementSum(field,checksum[:])
+
+def test_calculateCRC(checksumLength):
+    random.seed(checksumLength)
+    
+    for _ in range(NUM_RANDOM_TRIALS):
+        payload  = randomBuf(checksumLength)
+        expected = referenceOneComplementSum(payload,[0x00,0x00])
+        
+        assert u.calculateCRC(payload)==[expected[0]^0xFF,expected[1]^0xFF]
+
+def test_calculatePseudoHeaderCRC(checksumLength):
+    random.seed(checksumLength)
+    
+    for _ in range(NUM_RANDOM_TRIALS):
+        src      = randomBuf(16)
+        dst      = randomBuf(16)
+        length   = [0x00,0x00,checksumLength>>8,checksumLength&0xff]
+        nh       = [0x00,0x00,0x00,17]
+        payload  = randomBuf(checksumLength)
+        expected = referencePseudoHeaderCRC(src,dst,length,nh,payload)
+        
+        assert u.calculatePseudoHeaderCRC(src,dst,length,nh,payload)==expected
+        assert u.calculatePseudoHeaderCRC(
+            bytearray(src),
+            ''.join([chr(b) for b in dst]),
+            length,
+            nh,
+            memoryview(bytearray(payload)),
+        )==expected
+
+def test_updateCRC(checksumLength):
+    random.seed(checksumLength)
+    
+    for _ in range(NUM_RANDOM_TRIALS):
+        src      = randomBuf(16)
+        dst      = randomBuf(16)
+        length   = [0x00,0x00,checksumLength>>8,checksumLength&0xff]
+        nh       = [0x00,0x00,0x00,17]
+        payload  = randomBuf(checksumLength)
+        checksum = u.calculatePseudoHeaderCRC(src,dst,length,nh,payload)
+        
+        # change the destination address
+        newDst   = randomBuf(16)
+        assert u.updateCRC(checksum,dst,newDst)==u.calculatePseudoHeaderCRC(src,newDst,length,nh,payload)
+        
+        # change the first bytes of the payload
+        if checksumLength:
+            numBytes   = random.randint(1,min(checksumLength,8))
+            newPayload = randomBuf(numBytes)+payload[numBytes:]
+            assert u.updateCRC(checksum,payload[:numBytes],newPayload[:numBytes])==u.calculatePseudoHeaderCRC(src,dst,length,nh,newPayload)
+
+def test_calculateFCS(expectedFCS):
+    (frame,fcs) = json.loads(expectedFCS)
+    frame       = u.hex2buf(str(frame))
+    
+    assert u.calculateFCS(frame)==fcs
+    assert u.calculateFCS(bytearray(frame))==fcs
+
+def test_calculateFCSRandom(fcsLength,monkeypatch):
+    random.seed(fcsLength)
+    frames = [randomBuf(fcsLength) for _ in range(NUM_RANDOM_TRIALS)]
+    
+    expected = [referenceFCS(f) for f in frames]
+    
+    assert [u.calculateFCS(f) for f in frames]==expected
+    assert u.calculateFCSBatch(frames)==expected
+    
+    # pure Python implementation
+    monkeypatch.setattr(u,'crcHqx',None)
+    
+    assert [u.calculateFCS(f) for f in frames]==expected
+    assert u.calculateFCSBatch(frames)==expected
+
+def test_calculateFCSBatch():
+    frames = [[],[0x00],u.hex2buf('313233343536373839'),[0x7e]*127]
+    
+    assert u.calculateFCSBatch(frames)==[u.calculateFCS(f) for f in frames]
+    assert u.calculateFCSBatch([])==[]
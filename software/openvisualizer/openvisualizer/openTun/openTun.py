@@ -19,15 +19,20 @@ from   openvisualizer.eventBus import eventBusClient
 IPV6PREFIX = [0xbb,0xbb,0x00,0x00,0x00,0x00,0x00,0x00]
 IPV6HOST   = [0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x01]
     
-def create():
+def create(useTun=True):
     '''
     Module-based Factory method to create instance based on operating system
+    
+    :param useTun: If false, no TUN interface is opened, e.g. for headless
+                   simulations
     '''
     # Must import here rather than at top of module to avoid a circular 
     # reference to OpenTun class.
     
+    if not useTun:
+        return OpenTunNull()
     
-    if sys.platform.startswith('win32'):
+    elif sys.platform.startswith('win32'):
         from openTunWindows import OpenTunWindows
         return OpenTunWindows()
         
@@ -164,3 +169,15 @@ class OpenTun(eventBusClient.eventBusClient):
         Creates the thread to read messages arriving from the TUN interface
         '''
         raise NotImplementedError('subclass must implement')
+
+class OpenTunNull(OpenTun):
+    '''
+    OpenTun which does not open a TUN interface, and drops the packets to
+    the Internet.
+    '''
+    
+    def _createTunIf(self):
+        return None
+    
+    def _v6ToInternet_notif(self,sender,signal,data):
+        pass
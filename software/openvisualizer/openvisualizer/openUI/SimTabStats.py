@@ -22,6 +22,9 @@ class SimTabStats(SimTab.SimTab):
         self.numEvents = Tkinter.Label(self)
         self.numEvents.grid(row=1,column=0)
         
+        self.simSpeed = Tkinter.Label(self)
+        self.simSpeed.grid(row=2,column=0)
+        
         self.after(self.UPDATEPERIOD,self._updateGui)
     
     #======================== public ==========================================
@@ -34,6 +37,12 @@ class SimTabStats(SimTab.SimTab):
         self.durationRunning.configure(text=temp)
         temp = 'numEvents = {0}'.format(self.engine.timeline.getStats().getNumEvents())
         self.numEvents.configure(text=temp)
+        simSpeed = self.engine.getSimSpeed()
+        if simSpeed is None:
+            temp = 'simSpeed = -'
+        else:
+            temp = 'simSpeed = {0:.2f} simulated s/s'.format(simSpeed)
+        self.simSpeed.configure(text=temp)
         
         # reschedule next update
         self.after(self.UPDATEPERIOD,self._updateGui)
\ No newline at end of file
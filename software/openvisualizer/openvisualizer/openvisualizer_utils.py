@@ -3,9 +3,58 @@
 #  
 # Released under the BSD 3-Clause license as published at the link below.
 # https://openwsn.atlassian.net/wiki/display/OW/License
+import binascii
 import traceback
 import threading
 
+#===== tables
+
+# BYTEINVERSE[b] is byte b with its bit order reversed
+BYTEINVERSE   = tuple(int('{0:08b}'.format(b)[::-1],2) for b in range(256))
+
+# the same, for str.translate()
+BITREVERSE    = ''.join(chr(b) for b in BYTEINVERSE)
+
+# C implementation of the (non-reflected) CCITT CRC, used to compute the
+# (reflected) FCS over bit-reversed bytes. None falls back to FCS16TAB.
+crcHqx        = getattr(binascii,'crc_hqx',None)
+
+# reflected CRC-16 ITU-T (polynomial 0x8408)
+FCS16TAB      = (
+    0x0000, 0x1189, 0x2312, 0x329b, 0x4624, 0x57ad, 0x6536, 0x74bf,
+    0x8c48, 0x9dc1, 0xaf5a, 0xbed3, 0xca6c, 0xdbe5, 0xe97e, 0xf8f7,
+    0x1081, 0x0108, 0x3393, 0x221a, 0x56a5, 0x472c, 0x75b7, 0x643e,
+    0x9cc9, 0x8d40, 0xbfdb, 0xae52, 0xdaed, 0xcb64, 0xf9ff, 0xe876,
+    0x2102, 0x308b, 0x0210, 0x1399, 0x6726, 0x76af, 0x4434, 0x55bd,
+    0xad4a, 0xbcc3, 0x8e58, 0x9fd1, 0xeb6e, 0xfae7, 0xc87c, 0xd9f5,
+    0x3183, 0x200a, 0x1291, 0x0318, 0x77a7, 0x662e, 0x54b5, 0x453c,
+    0xbdcb, 0xac42, 0x9ed9, 0x8f50, 0xfbef, 0xea66, 0xd8fd, 0xc974,
+    0x4204, 0x538d, 0x6116, 0x709f, 0x0420, 0x15a9, 0x2732, 0x36bb,
+    0xce4c, 0xdfc5, 0xed5e, 0xfcd7, 0x8868, 0x99e1, 0xab7a, 0xbaf3,
+    0x5285, 0x430c, 0x7197, 0x601e, 0x14a1, 0x0528, 0x37b3, 0x263a,
+    0xdecd, 0xcf44, 0xfddf, 0xec56, 0x98e9, 0x8960, 0xbbfb, 0xaa72,
+    0x6306, 0x728f, 0x4014, 0x519d, 0x2522, 0x34ab, 0x0630, 0x17b9,
+    0xef4e, 0xfec7, 0xcc5c, 0xddd5, 0xa96a, 0xb8e3, 0x8a78, 0x9bf1,
+    0x7387, 0x620e, 0x5095, 0x411c, 0x35a3, 0x242a, 0x16b1, 0x0738,
+    0xffcf, 0xee46, 0xdcdd, 0xcd54, 0xb9eb, 0xa862, 0x9af9, 0x8b70,
+    0x8408, 0x9581, 0xa71a, 0xb693, 0xc22c, 0xd3a5, 0xe13e, 0xf0b7,
+    0x0840, 0x19c9, 0x2b52, 0x3adb, 0x4e64, 0x5fed, 0x6d76, 0x7cff,
+    0x9489, 0x8500, 0xb79b, 0xa612, 0xd2ad, 0xc324, 0xf1bf, 0xe036,
+    0x18c1, 0x0948, 0x3bd3, 0x2a5a, 0x5ee5, 0x4f6c, 0x7df7, 0x6c7e,
+    0xa50a, 0xb483, 0x8618, 0x9791, 0xe32e, 0xf2a7, 0xc03c, 0xd1b5,
+    0x2942, 0x38cb, 0x0a50, 0x1bd9, 0x6f66, 0x7eef, 0x4c74, 0x5dfd,
+    0xb58b, 0xa402, 0x9699, 0x8710, 0xf3af, 0xe226, 0xd0bd, 0xc134,
+    0x39c3, 0x284a, 0x1ad1, 0x0b58, 0x7fe7, 0x6e6e, 0x5cf5, 0x4d7c,
+    0xc60c, 0xd785, 0xe51e, 0xf497, 0x8028, 0x91a1, 0xa33a, 0xb2b3,
+    0x4a44, 0x5bcd, 0x6956, 0x78df, 0x0c60, 0x1de9, 0x2f72, 0x3efb,
+    0xd68d, 0xc704, 0xf59f, 0xe416, 0x90a9, 0x8120, 0xb3bb, 0xa232,
+    0x5ac5, 0x4b4c, 0x79d7, 0x685e, 0x1ce1, 0x0d68, 0x3ff3, 0x2e7a,
+    0xe70e, 0xf687, 0xc41c, 0xd595, 0xa12a, 0xb0a3, 0x8238, 0x93b1,
+    0x6b46, 0x7acf, 0x4854, 0x59dd, 0x2d62, 0x3ceb, 0x0e70, 0x1ff9,
+    0xf78f, 0xe606, 0xd49d, 0xc514, 0xb1ab, 0xa022, 0x92b9, 0x8330,
+    0x7bc7, 0x6a4e, 0x58d5, 0x495c, 0x3de3, 0x2c6a, 0x1ef1, 0x0f78
+)
+
 def buf2int(buf):
     '''
     Converts some consecutive bytes of a buffer into an integer. 
@@ -78,16 +127,8 @@ def hex2buf(s):
 
 def calculateCRC(payload):  
     
-    checksum       = [0x00]*2
-    
-    checksum       = _oneComplementSum(payload,checksum)
+    checksum       = _complement(_foldCarries(_sumWords(payload)))
     
-    checksum[0]   ^= 0xFF
-    checksum[1]   ^= 0xFF
-
-    checksum[0]   = int(checksum[0])
-    checksum[1]   = int(checksum[1])
-
     return checksum
 
 def calculatePseudoHeaderCRC(src,dst,length,nh,payload):
@@ -99,101 +140,143 @@ def calculatePseudoHeaderCRC(src,dst,length,nh,payload):
     * http://en.wikipedia.org/wiki/User_Datagram_Protocol#IPv6_PSEUDO-HEADER
     '''
     
-    checksum       = [0x00]*2
-    
     #compute pseudo header crc
-    checksum       = _oneComplementSum(src,checksum)
-    checksum       = _oneComplementSum(dst,checksum)
-    checksum       = _oneComplementSum(length,checksum)
-    checksum       = _oneComplementSum(nh,checksum)
-    checksum       = _oneComplementSum(payload,checksum)
+    total          = _sumWords(src)
+    total         += _sumWords(dst)
+    total         += _sumWords(length)
+    total         += _sumWords(nh)
+    total         += _sumWords(payload)
     
-    checksum[0]   ^= 0xFF
-    checksum[1]   ^= 0xFF
-
-    checksum[0]   = int(checksum[0])
-    checksum[1]   = int(checksum[1])
+    checksum       = _complement(_foldCarries(total))
 
     return checksum
 
+def updateCRC(checksum,oldField,newField):
+    '''
+    Update a checksum returned by calculateCRC or calculatePseudoHeaderCRC
+    after oldField was replaced by newField in the checksummed data, without
+    summing the rest of the data again (RFC1624, eqn. 3).
+    
+    Both fields have the same length and start on a 16-bit boundary of the
+    field they are part of, e.g. a header field.
+    
+    :param checksum: [in] The checksum, 2 bytes MSB first.
+    :param oldField: [in] The bytes that were checksummed.
+    :param newField: [in] The bytes replacing them.
+    
+    :returns: The updated checksum, 2 bytes MSB first.
+    '''
+    assert len(oldField)==len(newField)
+    
+    numWords       = (len(oldField)+1)/2
+    
+    total          = 0xFFFF ^ (checksum[0] << 8 | checksum[1])    # ~HC
+    total         += 0xFFFF*numWords - _sumWords(oldField)         # ~m
+    total         += _sumWords(newField)                           # m'
+    
+    return _complement(_foldCarries(total))
+
 def _oneComplementSum(field,checksum):
-        
-    sum            = 0xFFFF & (checksum[0] << 8 | checksum[1])
-    i              = len(field)
-    while i > 1:
-        sum       += 0xFFFF & (field[-i] << 8 | (field[-i+1]))
-        i         -= 2
-    if i:
-        sum       += (0xFF & field[-1]) << 8
-    while sum >> 16:
-        sum        = (sum & 0xFFFF) + (sum >> 16)
-    
-    checksum[0]    = (sum >> 8) & 0xFF
-    checksum[1]    = sum & 0xFF
+    
+    total          = 0xFFFF & (checksum[0] << 8 | checksum[1])
+    total         += _sumWords(field)
+    total          = _foldCarries(total)
+    
+    checksum[0]    = (total >> 8) & 0xFF
+    checksum[1]    = total & 0xFF
     
     return checksum
 
+def _sumWords(field):
+    '''
+    Sum the 16-bit big-endian words of field, without folding the carries. An
+    odd trailing byte is padded with zero.
+    
+    The bytes at even and odd offsets are summed separately, which adds all
+    words in two calls to the built-in sum rather than one word per iteration.
+    '''
+    if isinstance(field,(str,memoryview)):
+        field      = bytearray(field)
+    return (sum(field[0::2]) << 8) + sum(field[1::2])
+
+def _foldCarries(total):
+    while total >> 16:
+        total      = (total & 0xFFFF) + (total >> 16)
+    return total
+
+def _complement(total):
+    return [
+        (total >> 8) ^ 0xFF,
+        (total & 0xFF) ^ 0xFF,
+    ]
+
 def byteinverse(b):
-    # TODO: speed up through lookup table
-    rb = 0
-    for pos in range(8):
-        if b&(1<<pos)!=0:
-            bitval = 1
-        else:
-            bitval = 0
-        rb |= bitval<<(7-pos)
-    return rb
+    return BYTEINVERSE[b]
 
 def calculateFCS(rpayload):
+    '''
+    Calculate the IEEE802.15.4 FCS of a frame: the CRC-16 ITU-T, reflected,
+    with initial value 0x0000.
+    
+    Uses binascii's C implementation of the CRC over bit-reversed bytes when
+    available, one lookup in FCS16TAB per byte otherwise.
+    
+    :param rpayload: [in] The frame, a list of bytes, str or bytearray.
+    
+    :returns: The FCS, 2 bytes in transmission order.
+    '''
+    if crcHqx:
+        return _fcsFromCrcHqx(crcHqx(toStr(rpayload).translate(BITREVERSE),0x0000))
     
-    payload = []
-    for b in rpayload:        
-        payload += [byteinverse(b)]
-    
-    FCS16TAB  = (
-        0x0000, 0x1021, 0x2042, 0x3063, 0x4084, 0x50a5, 0x60c6, 0x70e7,
-        0x8108, 0x9129, 0xa14a, 0xb16b, 0xc18c, 0xd1ad, 0xe1ce, 0xf1ef,
-        0x1231, 0x0210, 0x3273, 0x2252, 0x52b5, 0x4294, 0x72f7, 0x62d6,
-        0x9339, 0x8318, 0xb37b, 0xa35a, 0xd3bd, 0xc39c, 0xf3ff, 0xe3de,
-        0x2462, 0x3443, 0x0420, 0x1401, 0x64e6, 0x74c7, 0x44a4, 0x5485,
-        0xa56a, 0xb54b, 0x8528, 0x9509, 0xe5ee, 0xf5cf, 0xc5ac, 0xd58d,
-        0x3653, 0x2672, 0x1611, 0x0630, 0x76d7, 0x66f6, 0x5695, 0x46b4,
-        0xb75b, 0xa77a, 0x9719, 0x8738, 0xf7df, 0xe7fe, 0xd79d, 0xc7bc,
-        0x48c4, 0x58e5, 0x6886, 0x78a7, 0x0840, 0x1861, 0x2802, 0x3823,
-        0xc9cc, 0xd9ed, 0xe98e, 0xf9af, 0x8948, 0x9969, 0xa90a, 0xb92b,
-        0x5af5, 0x4ad4, 0x7ab7, 0x6a96, 0x1a71, 0x0a50, 0x3a33, 0x2a12,
-        0xdbfd, 0xcbdc, 0xfbbf, 0xeb9e, 0x9b79, 0x8b58, 0xbb3b, 0xab1a,
-        0x6ca6, 0x7c87, 0x4ce4, 0x5cc5, 0x2c22, 0x3c03, 0x0c60, 0x1c41,
-        0xedae, 0xfd8f, 0xcdec, 0xddcd, 0xad2a, 0xbd0b, 0x8d68, 0x9d49,
-        0x7e97, 0x6eb6, 0x5ed5, 0x4ef4, 0x3e13, 0x2e32, 0x1e51, 0x0e70,
-        0xff9f, 0xefbe, 0xdfdd, 0xcffc, 0xbf1b, 0xaf3a, 0x9f59, 0x8f78,
-        0x9188, 0x81a9, 0xb1ca, 0xa1eb, 0xd10c, 0xc12d, 0xf14e, 0xe16f,
-        0x1080, 0x00a1, 0x30c2, 0x20e3, 0x5004, 0x4025, 0x7046, 0x6067,
-        0x83b9, 0x9398, 0xa3fb, 0xb3da, 0xc33d, 0xd31c, 0xe37f, 0xf35e,
-        0x02b1, 0x1290, 0x22f3, 0x32d2, 0x4235, 0x5214, 0x6277, 0x7256,
-        0xb5ea, 0xa5cb, 0x95a8, 0x8589, 0xf56e, 0xe54f, 0xd52c, 0xc50d,
-        0x34e2, 0x24c3, 0x14a0, 0x0481, 0x7466, 0x6447, 0x5424, 0x4405,
-        0xa7db, 0xb7fa, 0x8799, 0x97b8, 0xe75f, 0xf77e, 0xc71d, 0xd73c,
-        0x26d3, 0x36f2, 0x0691, 0x16b0, 0x6657, 0x7676, 0x4615, 0x5634,
-        0xd94c, 0xc96d, 0xf90e, 0xe92f, 0x99c8, 0x89e9, 0xb98a, 0xa9ab,
-        0x5844, 0x4865, 0x7806, 0x6827, 0x18c0, 0x08e1, 0x3882, 0x28a3,
-        0xcb7d, 0xdb5c, 0xeb3f, 0xfb1e, 0x8bf9, 0x9bd8, 0xabbb, 0xbb9a,
-        0x4a75, 0x5a54, 0x6a37, 0x7a16, 0x0af1, 0x1ad0, 0x2ab3, 0x3a92,
-        0xfd2e, 0xed0f, 0xdd6c, 0xcd4d, 0xbdaa, 0xad8b, 0x9de8, 0x8dc9,
-        0x7c26, 0x6c07, 0x5c64, 0x4c45, 0x3ca2, 0x2c83, 0x1ce0, 0x0cc1,
-        0xef1f, 0xff3e, 0xcf5d, 0xdf7c, 0xaf9b, 0xbfba, 0x8fd9, 0x9ff8,
-        0x6e17, 0x7e36, 0x4e55, 0x5e74, 0x2e93, 0x3eb2, 0x0ed1, 0x1ef0
-    )
     crc     = 0x0000
-    for b in payload:
-        crc = ((crc<<8)&0xffff) ^ FCS16TAB[((crc>>8)^b) & 0xff]
+    for b in bytearray(rpayload):
+        crc = (crc>>8) ^ FCS16TAB[(crc^b) & 0xff]
     
     returnVal = [
-        byteinverse(crc>>8),
-        byteinverse(crc&0xff)
+        crc & 0xff,
+        crc>>8,
     ]
     return returnVal
 
+def calculateFCSBatch(rpayloads):
+    '''
+    Calculate the FCS of each frame in a list, as calculateFCS.
+    
+    All frames are converted and bit-reversed in a single pass.
+    
+    :returns: A list with the FCS of each frame, in the same order.
+    '''
+    if not crcHqx:
+        return [calculateFCS(p) for p in rpayloads]
+    
+    frames    = [toStr(p) for p in rpayloads]
+    revFrames = ''.join(frames).translate(BITREVERSE)
+    
+    returnVal = []
+    start     = 0
+    for f in frames:
+        end   = start+len(f)
+        returnVal += [_fcsFromCrcHqx(crcHqx(revFrames[start:end],0x0000))]
+        start = end
+    return returnVal
+
+def _fcsFromCrcHqx(crc):
+    # crc_hqx ran over bit-reversed bytes, reverse the bits of the result
+    return [
+        BYTEINVERSE[crc>>8],
+        BYTEINVERSE[crc&0xff],
+    ]
+
+def toStr(buf):
+    '''
+    Return buf (str, bytearray, list of ints or memoryview) as a str.
+    '''
+    if isinstance(buf,str):
+        return buf
+    if isinstance(buf,memoryview):
+        return buf.tobytes()
+    return str(bytearray(buf))
+
 def formatCriticalMessage(error):
     returnVal  = []
     returnVal += ['Error:']
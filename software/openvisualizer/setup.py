@@ -81,7 +81,7 @@ setup(
                         'openvisualizer.openLbr', 'openvisualizer.openTun', 
                         'openvisualizer.openType', 'openvisualizer.openUI',
                         'openvisualizer.RPL', 'openvisualizer.SimEngine', 'openvisualizer.remoteConnectorServer',
-                        'openvisualizer.JRC'],
+                        'openvisualizer.JRC', 'openvisualizer.liveUpdates'],
     scripts          = appdirGlob('openVisualizer*.py'),
     package_dir      = {'': '.', 'openvisualizer': 'openvisualizer'},
     # Copy simdata files by extension so don't copy .gitignore in that directory.